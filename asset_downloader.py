@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Asset Downloader - Concurrent in-process download of campaign assets
+Streams every image, video and audio output into the campaign directory
+in fixed-size chunks and verifies sizes, before Replicate URLs expire
+"""
+
+import base64
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from http_client import PooledClient, shared_client
+from campaign_journal import atomic_write_json
+
+DEFAULT_SUFFIX = {'image': '.png', 'video': '.mp4', 'audio': '.wav'}
+
+
+@dataclass
+class DownloadResult:
+    """Outcome of fetching one asset"""
+    source: str
+    path: str
+    size: int = 0
+    expected: Optional[int] = None
+    error: Optional[str] = None
+    seconds: float = 0.0
+    skipped: bool = False  # Already on disk, nothing fetched
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def asset_filename(name: str, source: Any, kind: str = 'image') -> str:
+    """`name` plus the source's extension (image_1.png, video.mp4, ...)"""
+    url = str(getattr(source, 'url', source))
+    if url.startswith('data:'):
+        suffix = '.' + url[5:].split(';', 1)[0].split(',', 1)[0].split('/')[-1]
+    else:
+        suffix = Path(urlparse(url).path).suffix
+    return f"{name}{suffix if len(suffix) > 1 else DEFAULT_SUFFIX.get(kind, '.bin')}"
+
+
+def link_or_copy(src: str, dest: Path):
+    """Hardlink src to dest (same filesystem), else copy it"""
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copyfile(src, dest)
+
+
+class AssetDownloader:
+    """
+    Fetch assets concurrently over the shared keep-alive client.
+
+    Sources may be URLs, data: URIs, FileOutput objects or local paths
+    (prediction cache hits); local files are linked or copied, never
+    fetched. Bodies stream in chunk_size pieces, so memory stays flat
+    for large MP4/WAV outputs. Every file is written to a
+    `.part` sibling and renamed only after its size checks out, so a
+    crash never leaves a truncated asset behind.
+    """
+
+    def __init__(self, client: Optional[PooledClient] = None, max_workers: int = 8,
+                 chunk_size: int = 1024 * 1024, retries: int = 3, timeout: float = 120.0):
+        self.client = client
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self.timeout = timeout
+
+    def fetch(self, source: Any, dest: Path) -> DownloadResult:
+        """Download one source to dest, retrying transient failures"""
+        dest = Path(dest)
+        started = time.time()
+        result = DownloadResult(str(getattr(source, 'url', source)), str(dest))
+        for attempt in range(self.retries + 1):
+            try:
+                result.size, result.expected = self._fetch(source, dest)
+                result.error = None
+                break
+            except Exception as e:
+                result.error = str(e)
+                if attempt < self.retries:
+                    time.sleep(min(8.0, 0.5 * 2 ** attempt))
+        result.seconds = time.time() - started
+        return result
+
+    def _fetch(self, source: Any, dest: Path) -> Tuple[int, Optional[int]]:
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(dest.name + '.part')
+        url = str(getattr(source, 'url', source))
+        try:
+            if os.path.isfile(url):
+                expected = os.path.getsize(url)
+                link_or_copy(url, tmp)
+            elif url.startswith('data:'):
+                data = base64.b64decode(url.split(',', 1)[1])
+                expected = len(data)
+                tmp.write_bytes(data)
+            else:
+                http = (self.client or shared_client()).http
+                with http.stream('GET', url, timeout=self.timeout) as response:
+                    response.raise_for_status()
+                    length = response.headers.get('Content-Length')
+                    encoded = response.headers.get('Content-Encoding', 'identity') != 'identity'
+                    expected = int(length) if length and not encoded else None
+                    with open(tmp, 'wb') as f:
+                        for chunk in response.iter_bytes(self.chunk_size):
+                            f.write(chunk)
+            size = tmp.stat().st_size
+            if expected is not None and size != expected:
+                raise IOError(f"size mismatch for {dest.name}: {size} != {expected}")
+            os.replace(tmp, dest)
+            return size, expected
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    def fetch_all(self, items: List[Tuple[Any, Path]], skip_existing: bool = False) -> List[DownloadResult]:
+        """Download (source, dest) pairs concurrently, preserving order"""
+        if not items:
+            return []
+
+        def fetch(item):
+            source, dest = item
+            if skip_existing and Path(dest).is_file():
+                return DownloadResult(str(getattr(source, 'url', source)), str(dest),
+                                      size=Path(dest).stat().st_size, skipped=True)
+            return self.fetch(source, dest)
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items)),
+                                thread_name_prefix='asset-download') as pool:
+            return list(pool.map(fetch, items))
+
+    def download_campaign(self, results: Dict[str, Any], campaign_dir: Path) -> List[DownloadResult]:
+        """
+        Download every asset in a campaign results dict into campaign_dir,
+        recording each file's name as `local_path` (images) or
+        `video_path` / `audio_path`. Files already saved when their
+        prediction finished are kept as they are.
+        """
+        campaign_dir = Path(campaign_dir)
+        items, targets = [], []
+        for n, image in enumerate(results.get('images', []), 1):
+            if image.get('url'):
+                stem = image.get('type') or f"image_{image.get('index', n)}"
+                name = asset_filename(stem, image['url'])
+                items.append((image['url'], campaign_dir / name))
+                targets.append((image, 'local_path', name))
+        for kind in ('video', 'audio'):
+            if results.get(kind):
+                name = asset_filename(kind, results[kind], kind)
+                items.append((results[kind], campaign_dir / name))
+                targets.append((results, f'{kind}_path', name))
+
+        downloads = self.fetch_all(items, skip_existing=True)
+        for (record, field, name), download in zip(targets, downloads):
+            if download.ok:
+                record[field] = name
+        return downloads
+
+
+def main():
+    """Download the assets of saved campaigns: asset_downloader.py <campaign_dir>..."""
+    if len(sys.argv) < 2 or sys.argv[1] in ('-h', '--help'):
+        print("Usage: python asset_downloader.py creative_outputs/<campaign>...")
+        return
+
+    downloader = AssetDownloader()
+    for campaign_dir in map(Path, sys.argv[1:]):
+        metadata_path = campaign_dir / 'campaign_metadata.json'
+        with open(metadata_path) as f:
+            metadata = json.load(f)
+
+        downloads = downloader.download_campaign(metadata, campaign_dir)
+        atomic_write_json(metadata_path, metadata)
+
+        for download in downloads:
+            mark = '✅' if download.ok else f'❌ {download.error}'
+            print(f"   {Path(download.path).name}: {download.size:,} bytes {mark}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Asset Store - Content-addressed blob store with hardlinked views
+Every unique file is stored once under its SHA-256; by-model, by-date and
+by-campaign directories are hardlink (or symlink) views over the blobs,
+so disk use scales with unique assets rather than copies
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class AssetStore:
+    """
+    Blobs live at <root>/blobs/<ab>/<sha256>; nothing else is stored.
+
+    Views are plain directory trees whose files are hardlinks to blobs
+    (symlinks when `link='symlink'` or across filesystems), so existing
+    tools keep reading by-model/... paths while each byte exists once.
+    """
+
+    def __init__(self, root: str = './.asset_store', link: str = 'hardlink'):
+        self.root = Path(root)
+        self.blob_dir = self.root / 'blobs'
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.link_mode = link
+        self.stats = {'stored': 0, 'deduplicated': 0, 'bytes_saved': 0}
+
+    def blob_path(self, digest: str) -> Path:
+        return self.blob_dir / digest[:2] / digest
+
+    def has(self, digest: Optional[str]) -> bool:
+        return bool(digest) and self.blob_path(digest).is_file()
+
+    def put_file(self, path: Path, digest: Optional[str] = None, move: bool = False) -> str:
+        """
+        Store a file's content and return its digest. With move=True the
+        file is consumed (renamed into the store when it is new).
+        """
+        path = Path(path)
+        digest = digest or file_sha256(path)
+        blob = self.blob_path(digest)
+        if blob.is_file():
+            self.stats['deduplicated'] += 1
+            self.stats['bytes_saved'] += blob.stat().st_size
+            if move:
+                path.unlink()
+            return digest
+
+        blob.parent.mkdir(exist_ok=True)
+        tmp = blob.with_name(blob.name + '.tmp')
+        if move:
+            try:
+                os.replace(path, tmp)
+            except OSError:
+                shutil.copyfile(path, tmp)
+                path.unlink()
+        else:
+            try:
+                os.link(path, tmp)
+            except OSError:
+                shutil.copyfile(path, tmp)
+        os.chmod(tmp, 0o444)  # Blobs are shared by every view: never edit in place
+        os.replace(tmp, blob)
+        self.stats['stored'] += 1
+        return digest
+
+    def put_stream(self, chunks: Iterable[bytes]) -> str:
+        """Store streamed content, hashing as it is written"""
+        digest = hashlib.sha256()
+        fd, tmp = tempfile.mkstemp(dir=self.blob_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    f.write(chunk)
+            return self.put_file(Path(tmp), digest.hexdigest(), move=True)
+        finally:
+            Path(tmp).unlink(missing_ok=True)
+
+    def link(self, digest: str, view_path: Path) -> Path:
+        """Create (or replace) view_path as a view of a stored blob"""
+        blob = self.blob_path(digest)
+        view_path = Path(view_path)
+        view_path.parent.mkdir(parents=True, exist_ok=True)
+        if view_path.exists() and self._is_view_of(view_path, blob):
+            return view_path
+
+        tmp = view_path.with_name(f".{view_path.name}.link")
+        tmp.unlink(missing_ok=True)
+        if self.link_mode == 'hardlink':
+            try:
+                os.link(blob, tmp)
+            except OSError:
+                os.symlink(os.path.abspath(blob), tmp)
+        else:
+            os.symlink(os.path.abspath(blob), tmp)
+        os.replace(tmp, view_path)
+        return view_path
+
+    @staticmethod
+    def _is_view_of(path: Path, blob: Path) -> bool:
+        try:
+            return os.path.samefile(path, blob)
+        except OSError:
+            return False
+
+    def ingest(self, path: Path) -> str:
+        """Store a file and turn it into a view of its blob in place"""
+        path = Path(path)
+        digest = self.put_file(path)
+        self.link(digest, path)
+        return digest
+
+    def ingest_tree(self, root: Path) -> Dict[str, str]:
+        """Ingest every regular file under root; returns {path: digest}"""
+        digests = {}
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+            for name in filenames:
+                path = Path(dirpath) / name
+                if name.startswith('.') or path.is_symlink() or name.endswith('.part'):
+                    continue
+                if path.suffix == '.zip':
+                    continue
+                digests[str(path)] = self.ingest(path)
+        return digests
+
+    def ingest_zip(self, zip_path: Path, view_dir: Optional[Path] = None,
+                   prune: bool = False) -> Dict[str, str]:
+        """
+        Store every member of a zip and expose it under view_dir (the zip's
+        name without .zip by default, so riffusion.zip fills riffusion/).
+        With prune=True the zip is deleted once all of its members are in
+        the store.
+        """
+        zip_path = Path(zip_path)
+        view_dir = Path(view_dir) if view_dir else zip_path.with_suffix('')
+        prefix = zip_path.stem + '/'
+        digests = {}
+        with zipfile.ZipFile(zip_path) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                with archive.open(info) as member:
+                    digest = self.put_stream(iter(lambda: member.read(1024 * 1024), b''))
+                name = info.filename
+                if name.startswith(prefix):
+                    name = name[len(prefix):]
+                self.link(digest, view_dir / name)
+                digests[info.filename] = digest
+        if prune:
+            zip_path.unlink()
+        return digests
+
+    def gc(self, view_roots: Iterable[Path] = ()) -> int:
+        """
+        Delete blobs nothing points at: no extra hardlinks and no symlink
+        under view_roots. Returns bytes freed.
+        """
+        symlinked = set()
+        for root in view_roots:
+            for dirpath, _, filenames in os.walk(root):
+                for name in filenames:
+                    path = Path(dirpath) / name
+                    if path.is_symlink():
+                        symlinked.add(os.path.realpath(path))
+        freed = 0
+        for blob in self.blob_dir.glob('*/*'):
+            if blob.suffix == '.tmp':
+                continue
+            if blob.stat().st_nlink <= 1 and os.path.realpath(blob) not in symlinked:
+                freed += blob.stat().st_size
+                blob.unlink()
+        return freed
+
+    def usage(self) -> Dict[str, int]:
+        blobs = [b for b in self.blob_dir.glob('*/*') if b.suffix != '.tmp']
+        return {'blobs': len(blobs), 'bytes': sum(b.stat().st_size for b in blobs)}
+
+
+def date_views(store: AssetStore, by_model: Path, by_date: Path) -> int:
+    """Link by-model/<model>/<date>_... files into by-date/<date>/"""
+    count = 0
+    for path in by_model.glob('*/*'):
+        if path.is_file() and not path.name.endswith('.part'):
+            date = path.name.split('_', 1)[0]
+            store.link(store.put_file(path), by_date / date / path.name)
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Content-addressed asset store")
+    parser.add_argument('--store', default='./.asset_store', help="Store root")
+    parser.add_argument('--symlink', action='store_true', help="Symlink views instead of hardlinks")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    ingest = sub.add_parser('ingest', help="Deduplicate directories (and zips) in place")
+    ingest.add_argument('paths', nargs='+')
+    ingest.add_argument('--prune-zips', action='store_true',
+                        help="Delete zips once their members are stored")
+    views = sub.add_parser('views', help="Build by-date views from a by-model tree")
+    views.add_argument('root', help="Directory containing by-model/")
+    gc = sub.add_parser('gc', help="Delete unreferenced blobs")
+    gc.add_argument('roots', nargs='*', help="View roots to scan for symlinks")
+    sub.add_parser('usage')
+    args = parser.parse_args()
+
+    store = AssetStore(args.store, link='symlink' if args.symlink else 'hardlink')
+    if args.command == 'ingest':
+        for root in map(Path, args.paths):
+            zips = [root] if root.suffix == '.zip' else sorted(root.rglob('*.zip'))
+            if root.is_dir():
+                print(f"   {root}: {len(store.ingest_tree(root))} files")
+            for zip_path in zips:
+                print(f"   {zip_path}: {len(store.ingest_zip(zip_path, prune=args.prune_zips))} members")
+        print(f"📦 {store.stats['stored']} new blobs, {store.stats['deduplicated']} duplicates "
+              f"({store.stats['bytes_saved'] / 1024 ** 2:.1f} MB saved)")
+    elif args.command == 'views':
+        root = Path(args.root)
+        print(f"📅 {date_views(store, root / 'by-model', root / 'by-date')} files linked by date")
+    elif args.command == 'gc':
+        print(f"🧹 Freed {store.gc(map(Path, args.roots)) / 1024 ** 2:.1f} MB")
+    else:
+        usage = store.usage()
+        print(f"📦 {usage['blobs']} blobs, {usage['bytes'] / 1024 ** 2:.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
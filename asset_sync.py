@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Asset Sync - Resumable, incremental download of Replicate prediction outputs
+Per-file state (etag, size, sha256) lives next to the files, partial
+downloads resume with HTTP Range, and complete files are skipped without
+touching the network
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+from http_client import PooledClient, shared_client
+from asset_store import AssetStore
+from metadata_export import iter_export
+
+STATE_FILE = '.asset-sync-state.json'
+UNFINISHED = ('starting', 'processing')
+
+# The next --since scan starts this long before the last one began, so
+# clock skew against Replicate's created_at can't hide a prediction
+# (complete files are skipped without a request, so overlap is cheap)
+SINCE_OVERLAP = 300
+
+
+def output_urls(output: Any) -> List[str]:
+    """Every http(s) URL in a prediction output, in output order"""
+    if isinstance(output, dict):
+        return [u for value in output.values() for u in output_urls(value)]
+    if isinstance(output, list):
+        return [u for value in output for u in output_urls(value)]
+    if isinstance(output, str) and output.startswith(('http://', 'https://')):
+        return [output]
+    return []
+
+
+def predictions_from_export(metadata_path: str, models: Optional[List[str]] = None,
+                            statuses: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+    """Predictions recorded in a replicate_metadata_*.json (or .jsonl) export, streamed"""
+    return iter_export(metadata_path, models, statuses)
+
+
+def predictions_from_api(client: Optional[PooledClient] = None,
+                         since: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Predictions from the account, newest first, back to `since` (ISO time)"""
+    client = client or shared_client()
+    page = client.predictions.list()
+    while True:
+        for prediction in page.results:
+            if since and (prediction.created_at or '') < since:
+                return
+            yield _record(prediction)
+        if not page.next:
+            return
+        page = client.predictions.list(page.next)
+
+
+def predictions_by_id(ids: List[str],
+                      client: Optional[PooledClient] = None) -> Iterator[Dict[str, Any]]:
+    """Current state of the given predictions; ones the API no longer has come back 'missing'"""
+    client = client or shared_client()
+    for prediction_id in ids:
+        try:
+            prediction = client.predictions.get(prediction_id)
+        except Exception as e:
+            if getattr(e, 'status', None) == 404:
+                yield {'id': prediction_id, 'status': 'missing'}
+            continue
+        yield _record(prediction)
+
+
+def _record(prediction) -> Dict[str, Any]:
+    return {
+        'id': prediction.id,
+        'model': prediction.model,
+        'version': prediction.version,
+        'status': prediction.status,
+        'input': prediction.input or {},
+        'output': prediction.output,
+        'created_at': prediction.created_at,
+    }
+
+
+def _range_total(content_range: str) -> Optional[int]:
+    """Full length from a Content-Range header (bytes 0-9/10, bytes */10)"""
+    total = content_range.rsplit('/', 1)[-1] if '/' in content_range else ''
+    return int(total) if total.isdigit() else None
+
+
+def _slug(text: str, length: int = 50) -> str:
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')[:length] or 'untitled'
+
+
+def target_path(prediction: Dict[str, Any], url: str, n: int) -> Path:
+    """by-model/<model>/<date>_<model>_<prompt-slug>_<id8>[_n].<ext>"""
+    model = (prediction.get('model') or 'unknown').split('/')[-1]
+    date = (prediction.get('created_at') or '')[:10] or 'undated'
+    prompt = prediction.get('prompt_summary') or _slug(
+        str((prediction.get('input') or {}).get('prompt')
+            or (prediction.get('input') or {}).get('prompt_a') or ''))
+    suffix = Path(urlparse(url).path).suffix or '.bin'
+    number = f"_{n + 1}" if n else ''
+    return Path('by-model') / model / f"{date}_{model}_{prompt}_{prediction['id'][:8]}{number}{suffix}"
+
+
+@dataclass
+class SyncFile:
+    """Outcome of syncing one output file"""
+    prediction_id: str
+    url: str
+    path: str
+    action: str = 'skipped'  # skipped, downloaded, resumed, relinked, failed
+    transferred: int = 0
+    error: Optional[str] = None
+
+
+class AssetSync:
+    """
+    Mirror prediction outputs into `dest`, resumably.
+
+    State per prediction and file (dest/.asset-sync-state.json):
+
+        {"path", "etag", "size", "sha256", "complete"}
+
+    A file marked complete whose size still matches is skipped with no
+    request at all. A leftover `.part` file is resumed with
+    `Range: bytes=<offset>-` guarded by `If-Range: <etag>`; a 200 reply
+    (the file changed, or ranges unsupported) restarts it from zero. A
+    416 means the `.part` already holds every byte: it is finished if its
+    size matches the recorded one, else dropped and fetched again.
+
+    With a `store`, finished files move into the content-addressed store
+    and by-model/ and by-date/ become hardlink views, so duplicate
+    outputs cost no extra disk and a deleted view is relinked instead
+    of downloaded again.
+
+    Predictions still starting or processing are remembered under
+    "unfinished" until a later run sees them finish, since a --since scan
+    starting at the last run would never list them again.
+    """
+
+    def __init__(self, dest: str = './replicate_outputs',
+                 client: Optional[PooledClient] = None, max_workers: int = 8,
+                 chunk_size: int = 1024 * 1024, verify: bool = False,
+                 timeout: float = 120.0, store: Optional[AssetStore] = None):
+        self.dest = Path(dest)
+        self.store = store
+        self.client = client
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.verify = verify
+        self.timeout = timeout
+
+        self.state_path = self.dest / STATE_FILE
+        self.state = self._load_state()
+        self._lock = threading.Lock()
+        self._saved_at = 0.0
+
+    def _load_state(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        state.setdefault('version', 1)
+        state.setdefault('predictions', {})
+        state.setdefault('unfinished', {})
+        return state
+
+    def unfinished(self) -> List[str]:
+        """Ids of predictions that were still running at the last sync"""
+        return list(self.state['unfinished'])
+
+    def save_state(self, force: bool = True):
+        """Write state atomically (throttled to once a second unless forced)"""
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._saved_at < 1.0:
+                return
+            self._saved_at = now
+            self.dest.mkdir(parents=True, exist_ok=True)
+            tmp = self.state_path.with_name(STATE_FILE + '.tmp')
+            with open(tmp, 'w') as f:
+                json.dump(self.state, f, indent=1)
+            os.replace(tmp, self.state_path)
+
+    def _entry(self, prediction_id: str, url: str, path: Path) -> Dict[str, Any]:
+        with self._lock:
+            files = self.state['predictions'].setdefault(prediction_id, {}).setdefault('files', {})
+            return files.setdefault(url, {'path': str(path), 'etag': None, 'size': None,
+                                          'sha256': None, 'complete': False})
+
+    def sync(self, predictions: Iterator[Dict[str, Any]]) -> List[SyncFile]:
+        """Bring dest up to date with every succeeded prediction's outputs"""
+        # Stamped before listing: predictions created while this sync runs
+        # are newer than last_run, so the next --since scan still lists them
+        started = datetime.fromtimestamp(time.time() - SINCE_OVERLAP, timezone.utc)
+        work, seen = [], set()
+        unfinished = self.state['unfinished']
+        for prediction in predictions:
+            if prediction['id'] in seen:
+                continue
+            seen.add(prediction['id'])
+            status = prediction.get('status', 'succeeded')
+            if status in UNFINISHED:
+                unfinished[prediction['id']] = prediction.get('created_at')
+                continue
+            unfinished.pop(prediction['id'], None)
+            if status != 'succeeded':
+                continue
+            for n, url in enumerate(output_urls(prediction.get('output'))):
+                path = target_path(prediction, url, n)
+                work.append((prediction['id'], url, path))
+
+        if work:
+            with ThreadPoolExecutor(max_workers=self.max_workers,
+                                    thread_name_prefix='asset-sync') as pool:
+                results = list(pool.map(lambda item: self.sync_file(*item), work))
+        else:
+            results = []
+
+        self.state['last_run'] = started.strftime('%Y-%m-%dT%H:%M:%S.%fZ')  # As created_at
+        self.save_state()
+        return results
+
+    def sync_file(self, prediction_id: str, url: str, relative: Path) -> SyncFile:
+        entry = self._entry(prediction_id, url, relative)
+        path = self.dest / entry['path']
+        result = SyncFile(prediction_id, url, str(path))
+
+        if entry['complete'] and path.is_file() and path.stat().st_size == entry['size']:
+            if not self.verify or self._sha256(path) == entry['sha256']:
+                return result
+        if entry['complete'] and not path.exists() and self.store and self.store.has(entry['sha256']):
+            self._link_views(entry['sha256'], path)
+            result.action = 'relinked'
+            return result
+
+        try:
+            result.action, result.transferred = self._download(url, path, entry)
+        except Exception as e:
+            result.action, result.error = 'failed', str(e)
+        self.save_state(force=result.action == 'failed')
+        return result
+
+    def _download(self, url: str, path: Path, entry: Dict[str, Any]):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        part = path.with_name(path.name + '.part')
+        offset = part.stat().st_size if part.is_file() and entry.get('etag') else 0
+
+        headers = {}
+        if offset:
+            headers = {'Range': f'bytes={offset}-', 'If-Range': entry['etag']}
+
+        http = (self.client or shared_client()).http
+        with http.stream('GET', url, headers=headers, timeout=self.timeout) as response:
+            if response.status_code == 416 and offset:
+                # Nothing past offset: a crash after the last chunk but
+                # before the rename left a complete .part behind
+                total = _range_total(response.headers.get('Content-Range', ''))
+                restart = offset != entry.get('size') or total not in (None, offset)
+            else:
+                response.raise_for_status()
+                restart = False
+                if response.status_code != 206:
+                    offset = 0
+                etag = response.headers.get('ETag')
+                length = response.headers.get('Content-Length')
+                total = int(length) + offset if length else None
+                total = _range_total(response.headers.get('Content-Range', '')) or total
+
+                with self._lock:
+                    changed = entry.get('etag') != etag
+                    entry.update(etag=etag, size=total, complete=False, sha256=None)
+                if changed:
+                    self.save_state()  # etag must be on disk before bytes are
+
+                transferred = 0
+                with open(part, 'ab' if offset else 'wb') as f:
+                    for chunk in response.iter_bytes(self.chunk_size):
+                        f.write(chunk)
+                        transferred += len(chunk)
+
+        if restart:
+            part.unlink()
+            return self._download(url, path, entry)
+        if response.status_code == 416:
+            self._finish(part, path, entry, offset)
+            return 'resumed', 0
+        self._finish(part, path, entry, total)
+        return ('resumed' if offset else 'downloaded'), transferred
+
+    def _finish(self, part: Path, path: Path, entry: Dict[str, Any], total: Optional[int]):
+        """Check a downloaded .part's size, hash it and move it into place"""
+        size = part.stat().st_size
+        if total is not None and size != total:
+            raise IOError(f"incomplete: {size} of {total} bytes")
+        digest = self._sha256(part)
+        if self.store:
+            self.store.put_file(part, digest, move=True)
+            self._link_views(digest, path)
+        else:
+            os.replace(part, path)
+        with self._lock:
+            entry.update(size=size, sha256=digest, complete=True)
+
+    def _link_views(self, digest: str, path: Path):
+        self.store.link(digest, path)
+        date = path.name.split('_', 1)[0]
+        self.store.link(digest, self.dest / 'by-date' / date / path.name)
+
+    @staticmethod
+    def _sha256(path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resumable sync of Replicate outputs")
+    parser.add_argument('export', nargs='?',
+                        help="replicate_metadata_*.json or .jsonl export (default: live API)")
+    parser.add_argument('--dest', default='./replicate_outputs', help="Output directory")
+    parser.add_argument('--since', help="API mode: only predictions created after this ISO time "
+                                        "(default: the previous run; predictions it saw "
+                                        "unfinished are re-checked by id)")
+    parser.add_argument('--model', action='append', help="Only this model (repeatable)")
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--verify', action='store_true', help="Re-hash complete files")
+    parser.add_argument('--no-store', action='store_true',
+                        help="Plain files instead of views over <dest>/.store")
+    args = parser.parse_args()
+
+    store = None if args.no_store else AssetStore(str(Path(args.dest) / '.store'))
+    syncer = AssetSync(args.dest, max_workers=args.workers, verify=args.verify, store=store)
+    if args.export:
+        predictions = predictions_from_export(args.export, args.model)
+    else:
+        predictions = itertools.chain(
+            predictions_by_id(syncer.unfinished()),
+            predictions_from_api(since=args.since or syncer.state.get('last_run')))
+        if args.model:
+            models = set(args.model)
+            predictions = (p for p in predictions
+                           if {p.get('model'), (p.get('model') or '').split('/')[-1]} & models)
+
+    started = time.time()
+    results = syncer.sync(predictions)
+    counts: Dict[str, int] = {}
+    for result in results:
+        counts[result.action] = counts.get(result.action, 0) + 1
+        if result.error:
+            print(f"   ❌ {Path(result.path).name}: {result.error[:80]}")
+    transferred = sum(r.transferred for r in results) / 1024 ** 2
+    summary = ', '.join(f"{n} {action}" for action, n in sorted(counts.items())) or 'nothing to do'
+    print(f"🔄 {summary} ({transferred:.1f} MB in {time.time() - started:.1f}s) -> {args.dest}")
+
+
+if __name__ == "__main__":
+    main()
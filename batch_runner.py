@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Batch Runner - Headless campaign production from a JSONL manifest
+Each manifest line is one create_campaign spec; campaigns run several at
+a time through one shared director (one connection pool, rate governor
+and cache), and a result record per campaign streams to an output JSONL
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, Iterator, Tuple
+
+from campaign_journal import read_journal, repair_tail
+from metrics import CAMPAIGN_BUCKETS
+from mode_system import StudioModes
+
+CAMPAIGN_OPTIONS = {
+    'brief_type', 'quality', 'include_video', 'video_type', 'image_model',
+    'enhance_prompts', 'generate_landing', 'mode', 'product_name', 'product_desc',
+    'concurrent', 'max_workers',
+}
+
+# Campaign IDs name a directory under creative_outputs and a URL path segment
+CAMPAIGN_ID = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+MODES = tuple(StudioModes().list_modes())
+
+
+def read_manifest(path: str) -> Iterator[Tuple[int, Any]]:
+    """
+    (line number, spec) for every non-blank, non-comment manifest line;
+    a line that isn't valid JSON comes back as the ValueError it raised
+    """
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if line and not line.startswith('#'):
+                try:
+                    yield number, json.loads(line)
+                except ValueError as e:
+                    yield number, ValueError(f"invalid JSON: {e}")
+
+
+def completed_lines(output_path: str) -> Dict[int, Dict[str, Any]]:
+    """Latest result record per manifest line from an earlier run"""
+    records = {}
+    try:
+        with open(output_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Line torn by a crash
+                records[record['line']] = record
+    except FileNotFoundError:
+        pass
+    return records
+
+
+def check_spec(spec: Dict[str, Any], briefs=None):
+    """
+    Raise ValueError for anything create_campaign wouldn't accept, or
+    would quietly turn into a product_launch campaign: an unknown mode, a
+    mode without product_name, or a brief_type not in `briefs` (the
+    director's briefs, when given)
+    """
+    if not isinstance(spec, dict):
+        raise ValueError("spec must be a JSON object")
+    unknown = set(spec) - CAMPAIGN_OPTIONS - {'id'}
+    if unknown:
+        raise ValueError(f"unknown options: {', '.join(sorted(unknown))}")
+    if 'id' in spec and not (isinstance(spec['id'], str) and CAMPAIGN_ID.match(spec['id'])):
+        raise ValueError("id must be 1-64 letters, digits, '_' or '-'")
+    if spec.get('mode') is not None:
+        if spec['mode'] not in MODES:
+            raise ValueError(f"unknown mode {spec['mode']!r} (one of: {', '.join(MODES)})")
+        if not spec.get('product_name'):
+            raise ValueError("mode needs product_name")
+    if briefs is not None and spec.get('brief_type') is not None \
+            and spec['brief_type'] not in briefs:
+        raise ValueError(f"unknown brief_type {spec['brief_type']!r} "
+                         f"(one of: {', '.join(briefs)})")
+
+
+def _missing_assets(director, options: Dict[str, Any], results: Dict[str, Any]) -> list:
+    missing = []
+    if not results.get('audio'):
+        missing.append('audio')
+    if options.get('include_video') and not results.get('video'):
+        missing.append('video')
+    if 'mode' not in results:
+        brief = director.briefs.get(options.get('brief_type'), director.briefs['product_launch'])
+        expected = len(brief['prompts'])
+    else:
+        expected = 3
+    if len(results['images']) < expected:
+        missing.append(f"images ({len(results['images'])}/{expected})")
+    return missing
+
+
+def run_campaign(director, spec: Dict[str, Any], campaign_id: str,
+                 resume: bool = False) -> Dict[str, Any]:
+    """
+    Create one campaign from a spec and return its result record
+    (status succeeded / partial / failed). With resume=True a campaign
+    that already has a journal is finished from it instead.
+    """
+    record = {'id': campaign_id, 'spec': spec}
+    metrics = director.metrics
+    running = metrics.gauge('creative_campaigns_running', "Campaigns in progress")
+    running.inc()
+    started = time.time()
+    try:
+        check_spec(spec, director.briefs)
+        options = {k: v for k, v in spec.items() if k != 'id'}
+        options.setdefault('concurrent', True)
+
+        if resume and read_journal(director.output_dir / campaign_id):
+            results = director.resume_campaign(campaign_id, options.get('max_workers'))
+            record['resumed'] = True
+        else:
+            results = director.create_campaign(campaign_id=campaign_id, **options)
+
+        missing = _missing_assets(director, options, results)
+        record.update(
+            status='partial' if missing else 'succeeded',
+            missing=missing,
+            campaign_dir=str(director._campaign_dir(results)),
+            images=len(results['images']),
+            video=bool(results.get('video')),
+            audio=bool(results.get('audio')),
+        )
+    except Exception as e:
+        record.update(status='failed', error=f"{type(e).__name__}: {e}")
+    record['seconds'] = round(time.time() - started, 2)
+    running.dec()
+    metrics.counter('creative_campaigns_total', "Finished campaigns, by status").inc(
+        status=record['status'])
+    metrics.histogram('creative_campaign_seconds', "Seconds per finished campaign",
+                      CAMPAIGN_BUCKETS).observe(time.time() - started)
+    return record
+
+
+class BatchRunner:
+    """
+    Run manifest specs with at most `concurrency` campaigns in flight.
+
+    Campaign IDs are derived from the manifest (`"id"` or
+    <manifest>_<line>), so a rerun with resume=True skips lines that
+    already succeeded and finishes interrupted or partial campaigns from
+    their journals instead of starting them over.
+    """
+
+    def __init__(self, director=None, concurrency: int = 4):
+        if director is None:
+            from creative_director import CreativeDirector
+            director = CreativeDirector()
+        self.director = director
+        self.concurrency = concurrency
+        self._write_lock = threading.Lock()
+        self.stats = {'succeeded': 0, 'partial': 0, 'failed': 0, 'skipped': 0, 'resumed': 0}
+
+    def run(self, manifest: str, output: str, resume: bool = False) -> Dict[str, int]:
+        done = completed_lines(output) if resume else {}
+        prefix = Path(manifest).stem
+        work, rejected, lines = [], [], {}
+        for number, spec in read_manifest(manifest):
+            # Bad lines fail on their own, before anything runs; an id is
+            # claimed by its first line, since two campaigns can't share
+            # a directory and journal
+            try:
+                if isinstance(spec, ValueError):
+                    raise spec
+                check_spec(spec, self.director.briefs)
+                campaign_id = spec.get('id') or f"{prefix}_{number:05d}"
+                if campaign_id in lines:
+                    raise ValueError(f"duplicate id {campaign_id!r} (line {lines[campaign_id]})")
+                lines[campaign_id] = number
+            except ValueError as e:
+                rejected.append(self._rejected(number, spec, e))
+                continue
+            if done.get(number, {}).get('status') == 'succeeded':
+                self.stats['skipped'] += 1
+                continue
+            work.append((number, spec, campaign_id))
+
+        if resume:
+            repair_tail(Path(output))  # New records must not glue onto a torn one
+        started = time.time()
+        with open(output, 'a' if resume else 'w', encoding='utf-8') as out, \
+                ThreadPoolExecutor(max_workers=self.concurrency,
+                                   thread_name_prefix='batch') as pool:
+            for record in rejected:
+                self._write(out, record)
+            futures = [pool.submit(self.run_one, *item, resume=resume) for item in work]
+            for future in as_completed(futures):
+                self._write(out, future.result())
+        self.stats['seconds'] = round(time.time() - started, 1)
+        return self.stats
+
+    def run_one(self, number: int, spec: Dict[str, Any], campaign_id: str,
+                resume: bool = False) -> Dict[str, Any]:
+        """Create (or finish) one campaign and return its result record"""
+        record = {'line': number, **run_campaign(self.director, spec, campaign_id, resume)}
+        self._count(record['status'])
+        if record.get('resumed'):
+            self._count('resumed')
+        return record
+
+    def _rejected(self, number: int, spec: Any, error: ValueError) -> Dict[str, Any]:
+        """Result record for a manifest line that can't be run at all"""
+        self._count('failed')
+        self.director.metrics.counter('creative_campaigns_total',
+                                      "Finished campaigns, by status").inc(status='failed')
+        return {'line': number, 'id': spec.get('id') if isinstance(spec, dict) else None,
+                'spec': None if isinstance(spec, ValueError) else spec,
+                'status': 'failed', 'error': f"ValueError: {error}", 'seconds': 0.0}
+
+    def _count(self, key: str):
+        with self._write_lock:
+            self.stats[key] += 1
+
+    def _write(self, out, record: Dict[str, Any]):
+        with self._write_lock:
+            out.write(json.dumps(record, default=str) + '\n')
+            out.flush()
+            os.fsync(out.fileno())
+        mark = {'succeeded': '✅', 'partial': '⚠️', 'failed': '❌'}[record['status']]
+        print(f"[batch] {mark} line {record['line']} {record['id']} "
+              f"({record['seconds']:.1f}s){' - ' + record['error'] if 'error' in record else ''}",
+              file=sys.stderr, flush=True)
+
+
+def _print_latencies(director):
+    latency = director._latency
+    for labels, cells in sorted(latency.series().items()):
+        p50, p95 = latency.quantile(0.5, cells), latency.quantile(0.95, cells)
+        print(f"[batch] {dict(labels).get('model')}: {sum(cells[:-1])} predictions, "
+              f"p50 {p50:.1f}s, p95 {p95:.1f}s", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a JSONL manifest of campaigns headlessly")
+    parser.add_argument('manifest', help="One create_campaign spec (JSON object) per line")
+    parser.add_argument('-o', '--output', help="Result records (default: <manifest>.results.jsonl)")
+    parser.add_argument('-c', '--concurrency', type=int, default=4,
+                        help="Campaigns in flight at once")
+    parser.add_argument('--workers', type=int, help="Jobs in flight per campaign")
+    parser.add_argument('--resume', action='store_true',
+                        help="Skip lines that already succeeded; finish interrupted campaigns")
+    parser.add_argument('--engine', action='store_true',
+                        help="Poll predictions from one event loop instead of a thread each")
+    parser.add_argument('--trace', action='store_true',
+                        help="Record per-stage spans to <campaign>/trace.json")
+    parser.add_argument('--metrics-port', type=int,
+                        help="Serve Prometheus metrics at :PORT/metrics while running")
+    parser.add_argument('--metrics-file',
+                        help="Write Prometheus metrics here when done (textfile collector)")
+    args = parser.parse_args()
+
+    from creative_director import CreativeDirector
+    from tracing import Tracer
+    engine = None
+    if args.engine:
+        from prediction_engine import PredictionEngine
+        engine = PredictionEngine()
+    director = CreativeDirector(max_workers=args.workers or 8, engine=engine,
+                                tracer=Tracer() if args.trace else None)
+
+    server = None
+    if args.metrics_port is not None:
+        from metrics import serve
+        server = serve(director.metrics, '0.0.0.0', args.metrics_port)
+
+    output = args.output or str(Path(args.manifest).with_suffix('.results.jsonl'))
+    runner = BatchRunner(director, concurrency=args.concurrency)
+    stats = runner.run(args.manifest, output, resume=args.resume)
+    if engine:
+        engine.stop()
+    if args.metrics_file:
+        director.metrics.write(args.metrics_file)
+    if server:
+        server.shutdown()
+    _print_latencies(director)
+    summary = ', '.join(f"{n} {key}" for key, n in stats.items() if n and key != 'seconds')
+    print(f"[batch] {summary or 'nothing to do'} in {stats['seconds']}s -> {output}",
+          file=sys.stderr)
+    return 0 if not stats['failed'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
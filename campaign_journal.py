@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Campaign Journal - Append-only, crash-safe record of a campaign in progress
+Every finished job is appended to <campaign>/campaign_journal.jsonl as it
+completes (fsyncs batched in the background); the final metadata is
+written with an atomic rename, so a crash never leaves a torn file
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+JOURNAL_FILE = 'campaign_journal.jsonl'
+
+
+class CampaignAbandoned(RuntimeError):
+    """The campaign was handed to another worker; this run must stop writing"""
+
+
+def atomic_write_json(path: Path, data: Any, indent: int = 2):
+    """Write JSON to a temp file, fsync it and rename it over path"""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=indent, default=str)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    try:
+        dir_fd = os.open(path.parent, os.O_RDONLY)
+    except OSError:
+        return  # Directories can't be opened on Windows
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def read_journal(campaign_dir: Path) -> List[Dict[str, Any]]:
+    """Events recorded for a campaign, oldest first (torn lines are skipped)"""
+    events = []
+    try:
+        with open(Path(campaign_dir) / JOURNAL_FILE, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return events
+
+
+def repair_tail(path: Path):
+    """
+    Cut a line torn by a crash off the end of a JSONL file, so the next
+    append starts on a line of its own. A last line that's complete but
+    for its newline gets the newline.
+    """
+    try:
+        f = open(path, 'rb+')
+    except FileNotFoundError:
+        return
+    with f:
+        size = f.seek(0, os.SEEK_END)
+        if not size:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b'\n':
+            return
+        start, pos = 0, size
+        while pos > 0:  # Find the start of the last line, 64 KiB at a time
+            step = min(pos, 64 * 1024)
+            pos -= step
+            f.seek(pos)
+            newline = f.read(step).rfind(b'\n')
+            if newline >= 0:
+                start = pos + newline + 1
+                break
+        f.seek(start)
+        try:
+            json.loads(f.read())
+            f.write(b'\n')
+        except ValueError:
+            f.truncate(start)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class CampaignJournal:
+    """
+    JSONL event log for one campaign directory.
+
+    record() appends and flushes a line immediately; a background thread
+    fsyncs at most every `sync_interval` seconds, so a burst of completed
+    jobs costs one fsync instead of one each. sync() forces durability.
+    """
+
+    def __init__(self, campaign_dir: Path, sync_interval: float = 0.2):
+        self.campaign_dir = Path(campaign_dir)
+        self.campaign_dir.mkdir(parents=True, exist_ok=True)
+        self.path = self.campaign_dir / JOURNAL_FILE
+        self.sync_interval = sync_interval
+        self.syncs = 0
+
+        # Job fingerprints recorded so far ({job name: fingerprint}), so
+        # dependents can hash over what they were built from
+        self.fingerprints: Dict[str, str] = {}
+
+        repair_tail(self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._dirty = False
+        self._closed = False
+        self.abandoned = False
+        self._syncer = threading.Thread(target=self._sync_loop, daemon=True,
+                                        name='journal-sync')
+        self._syncer.start()
+
+    def record(self, event: str, **fields):
+        """Append one event ({"t", "event", **fields})"""
+        line = json.dumps({'t': round(time.time(), 3), 'event': event, **fields}, default=str)
+        with self._lock:
+            if self._closed:
+                return
+            self._file.write(line + '\n')
+            self._file.flush()
+            if not self._dirty:
+                self._dirty = True
+                self._wake.notify()
+
+    def _sync_loop(self):
+        while True:
+            with self._lock:
+                while not self._dirty and not self._closed:
+                    self._wake.wait()
+                if self._closed:
+                    return
+            time.sleep(self.sync_interval)  # Let the batch fill up
+            self.sync()
+
+    def sync(self):
+        """fsync everything recorded so far"""
+        with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            fd = self._file.fileno()
+            self.syncs += 1
+        os.fsync(fd)
+
+    def snapshot(self, metadata: Dict[str, Any], name: str = 'campaign_metadata.json') -> Path:
+        """Atomically write the final metadata and mark the campaign finished"""
+        if self.abandoned:
+            raise CampaignAbandoned(f"{self.campaign_dir} was abandoned")
+        path = self.campaign_dir / name
+        atomic_write_json(path, metadata)
+        self.record('finished', metadata=name)
+        self.sync()
+        return path
+
+    def abandon(self):
+        """Stop recording for good: another worker owns the campaign now"""
+        self.abandoned = True
+        self.close()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wake.notify()
+        self._syncer.join()
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
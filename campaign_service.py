@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+Campaign Service - Long-running campaign worker pool behind an HTTP API
+One warm process (imports, studio modes, connection pool, rate governor
+and cache built once) pulls jobs from the durable SQLite queue, so each
+request costs only its predictions. Worker nodes on other hosts join
+with --join and lease jobs over the same API
+
+    POST   /campaigns          enqueue a create_campaign spec (or a list)
+    GET    /campaigns          recent jobs (?status=queued&limit=50)
+    GET    /campaigns/<id>     status and result record of one job
+    DELETE /campaigns/<id>     cancel a job that hasn't started
+    GET    /health             worker and queue counts
+    GET    /metrics            Prometheus metrics
+
+    POST   /leases                   claim a job (long-polls up to "wait" s)
+    POST   /leases/<id>/heartbeat    renew a lease
+    POST   /leases/<id>/finish       commit a result (409 if the lease was lost)
+"""
+
+import argparse
+import json
+import math
+import os
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from batch_runner import check_spec, run_campaign
+from job_queue import JobQueue, RemoteQueue
+from metrics import CONTENT_TYPE
+from scheduler import Scheduler, priority_class
+
+
+# Statuses a worker may commit through POST /leases/<id>/finish
+FINISHED = ('succeeded', 'partial', 'failed')
+
+
+def check_lease_request(action: str, body: Any):
+    """
+    Raise ValueError for a /leases body the queue can't act on: not an
+    object, a wait or lease that isn't a number of seconds, a missing
+    token, or a finish without a FINISHED status
+    """
+    if not isinstance(body, dict):
+        raise ValueError("body must be a JSON object")
+    for field in ('wait', 'lease'):
+        value = body.get(field)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))
+                                  or not math.isfinite(value) or value < 0):
+            raise ValueError(f"{field} must be a number of seconds")
+    if action == 'claim':
+        return
+    if not isinstance(body.get('token'), str):
+        raise ValueError("token must be a string")
+    if action == 'finish':
+        if body.get('status') not in FINISHED:
+            raise ValueError(f"status must be one of: {', '.join(FINISHED)}")
+        if not isinstance(body.get('result'), (dict, type(None))):
+            raise ValueError("result must be a JSON object")
+        if not isinstance(body.get('error'), (str, type(None))):
+            raise ValueError("error must be a string")
+
+
+class _Server(ThreadingHTTPServer):
+    """Threaded server with a listen backlog sized for bursts"""
+    daemon_threads = True
+    request_queue_size = 256
+
+
+class CampaignService:
+    """
+    HTTP API plus `workers` threads running queued campaigns through one
+    shared CreativeDirector.
+
+    Every campaign runs under a lease, renewed by a heartbeat thread every
+    lease/3 seconds. If a node dies its leases run out and the jobs are
+    claimed again (and finished from their journals where the output
+    directory is shared); a worker that lost its lease abandons the
+    campaign, writing nothing more to its directory, and has its result
+    discarded rather than committed twice. With a RemoteQueue the service
+    is a worker-only node (serve=False) pulling from another host.
+    """
+
+    def __init__(self, director=None, queue: JobQueue = None, workers: int = 4,
+                 host: str = '127.0.0.1', port: int = 8765, poll_interval: float = 1.0,
+                 lease: float = 60.0, serve: bool = True):
+        if director is None:
+            from creative_director import CreativeDirector
+            director = CreativeDirector()
+        self.director = director
+        self.queue = queue or JobQueue(str(director.output_dir / 'queue.db'))
+        self.workers = workers
+        self.host = host
+        self.port = port
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.serve = serve
+        self.remote = isinstance(self.queue, RemoteQueue)
+        self.node = f"{socket.gethostname()}:{os.getpid()}"
+
+        self.stats = {'enqueued': 0, 'finished': 0, 'busy': 0, 'lost': 0}
+        self._held: Dict[str, str] = {}  # job id -> lease token
+        self._held_lock = threading.Lock()  # Guards _held and stats
+        self.started_at = None
+        self._wake = threading.Condition()
+        self._generation = 0  # Bumped on every enqueue, so no wake-up is lost
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._register_metrics()
+
+    def _register_metrics(self):
+        metrics = self.director.metrics
+        metrics.callback('creative_service_workers', "Campaign worker threads",
+                         lambda: self.workers)
+        metrics.callback('creative_service_workers_busy', "Workers running a campaign",
+                         lambda: self.stats['busy'])
+        metrics.callback('creative_service_leases_lost_total',
+                         "Campaigns whose lease ran out before they finished",
+                         lambda: self.stats['lost'], kind='counter')
+        if not self.remote:
+            metrics.callback('creative_queue_jobs', "Queued campaign jobs, by status",
+                             self.queue.counts, label='status')
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        if not self.remote:
+            requeued = self.queue.requeue_expired()
+            if requeued:
+                print(f"♻️  Requeued {requeued} interrupted jobs")
+        self.started_at = time.time()
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._work, args=(f"{self.node}:worker-{n}",),
+                                      name=f"campaign-worker-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        if self.workers:
+            threading.Thread(target=self._heartbeat, name='lease-heartbeat', daemon=True).start()
+        if self.serve:
+            self._server = _Server((self.host, self.port), self._handler())
+            self.port = self._server.server_address[1]
+            threading.Thread(target=self._server.serve_forever, name='campaign-api',
+                             daemon=True).start()
+        return self
+
+    def stop(self, drain: bool = True):
+        """Stop accepting requests; with drain, let running campaigns finish"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self._stopping.set()
+        with self._wake:
+            self._wake.notify_all()
+        if drain:
+            for thread in self._threads:
+                thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def submit(self, spec: Dict[str, Any], client: Optional[str] = None,
+               priority=None) -> Dict[str, Any]:
+        """
+        Validate and enqueue one spec, waking an idle worker. client is the
+        tenant it's fair-shared under; priority a class name ('draft',
+        'standard', 'premium') or number, defaulting to the quality tier.
+        """
+        check_spec(spec, self.director.briefs)
+        priority_class(spec, priority)
+        job = self.queue.enqueue(spec, client=client, priority=priority)
+        with self._held_lock:
+            self.stats['enqueued'] += 1
+        with self._wake:
+            self._generation += 1
+            self._wake.notify()
+        return job
+
+    def health(self) -> Dict[str, Any]:
+        return {'workers': self.workers, 'busy': self.stats['busy'],
+                'uptime': round(time.time() - self.started_at, 1) if self.started_at else 0,
+                'jobs': self.queue.counts()}
+
+    def lease_job(self, worker: str, lease: Optional[float] = None,
+                  wait: float = 0.0) -> Optional[Dict[str, Any]]:
+        """Claim a job from the local queue, waiting up to `wait` seconds for one"""
+        deadline = time.time() + wait
+        while True:
+            with self._wake:
+                generation = self._generation
+            job = self.queue.claim(worker, lease or self.lease)
+            remaining = deadline - time.time()
+            if job or remaining <= 0 or self._stopping.is_set():
+                return job
+            with self._wake:
+                if self._generation == generation:
+                    # Timeout also picks up jobs enqueued by other processes
+                    # and leases that expire meanwhile
+                    self._wake.wait(min(remaining, self.poll_interval))
+
+    def _work(self, worker: str):
+        while not self._stopping.is_set():
+            try:
+                if self.remote:
+                    job = self.queue.claim(worker, self.lease, wait=self.poll_interval)
+                else:
+                    job = self.lease_job(worker, wait=self.poll_interval)
+            except OSError as e:
+                print(f"⚠️  Claim failed ({e}), retrying")
+                self._stopping.wait(self.poll_interval)
+                continue
+            if job is None:
+                continue
+
+            token = job['lease_token']
+            self.director.adopt(job['id'])  # Ours again, even if abandoned here before
+            with self._held_lock:
+                self._held[job['id']] = token
+                self.stats['busy'] += 1
+            try:
+                # A repeat attempt means a node died mid-campaign: finish it
+                # from the journal (when it's reachable) instead of starting over
+                record = run_campaign(self.director, job['spec'], job['id'],
+                                      resume=job['attempts'] > 1)
+            finally:
+                with self._held_lock:
+                    self._held.pop(job['id'], None)
+                    self.stats['busy'] -= 1
+            committed = self._commit(job['id'], token, record)
+            with self._held_lock:
+                self.stats['finished' if committed else 'lost'] += 1
+            if not committed:
+                print(f"⚠️  Lease on {job['id']} was lost; result discarded")
+
+    def _commit(self, job_id: str, token: str, record: Dict[str, Any]) -> bool:
+        for attempt in range(5):
+            try:
+                return self.queue.finish(job_id, token, record['status'], record,
+                                         record.get('error'))
+            except OSError as e:
+                print(f"⚠️  Committing {job_id} failed ({e}), retrying")
+                time.sleep(2 ** attempt)
+        return False
+
+    def _heartbeat(self):
+        while not self._stopping.wait(self.lease / 3):
+            with self._held_lock:
+                held = list(self._held.items())
+            for job_id, token in held:
+                try:
+                    if not self.queue.heartbeat(job_id, token, self.lease):
+                        print(f"⚠️  Lost lease on {job_id}; abandoning it")
+                        with self._held_lock:
+                            self._held.pop(job_id, None)
+                        # Another worker owns its directory and journal now
+                        self.director.abandon(job_id)
+                except OSError as e:
+                    print(f"⚠️  Heartbeat for {job_id} failed ({e})")
+
+    def _handler(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, status: int, body: Any):
+                data = json.dumps(body, default=str).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _job_id(self) -> Optional[str]:
+                parts = urlparse(self.path).path.strip('/').split('/')
+                if len(parts) == 2 and parts[0] == 'campaigns':
+                    return parts[1]
+                return None
+
+            def _lease(self, parts: List[str], body: Dict[str, Any]):
+                if len(parts) == 1:
+                    job = service.lease_job(body.get('worker') or self.client_address[0],
+                                            body.get('lease'), min(body.get('wait') or 0, 30))
+                    if job:
+                        self._send(200, job)
+                    else:
+                        self.send_response(204)
+                        self.end_headers()
+                    return
+                if parts[2] == 'heartbeat':
+                    ok = service.queue.heartbeat(parts[1], body.get('token'), body.get('lease'))
+                else:
+                    ok = service.queue.finish(parts[1], body.get('token'), body.get('status'),
+                                              body.get('result'), body.get('error'))
+                if ok:
+                    self._send(200, {'ok': True})
+                else:
+                    self._send(409, {'error': 'lease lost'})
+
+            def do_POST(self):
+                parts = urlparse(self.path).path.strip('/').split('/')
+                if parts[0] == 'leases':
+                    if len(parts) == 1:
+                        action = 'claim'
+                    elif len(parts) == 3 and parts[2] in ('heartbeat', 'finish'):
+                        action = parts[2]
+                    else:
+                        self._send(404, {'error': 'not found'})
+                        return
+                    try:
+                        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                        check_lease_request(action, body)
+                    except (ValueError, TypeError) as e:
+                        self._send(400, {'error': str(e)})
+                        return
+                    self._lease(parts, body)
+                    return
+                if parts != ['campaigns']:
+                    self._send(404, {'error': 'not found'})
+                    return
+                try:
+                    body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                    requests = []
+                    for spec in body if isinstance(body, list) else [body]:
+                        # Scheduling fields ride along with the spec
+                        spec = dict(spec)
+                        client = spec.pop('client', None) or self.headers.get('X-Client')
+                        priority = spec.pop('priority', None)
+                        check_spec(spec, service.director.briefs)
+                        priority_class(spec, priority)
+                        requests.append((spec, client, priority))
+                except (ValueError, TypeError) as e:
+                    self._send(400, {'error': str(e)})
+                    return
+                jobs = [service.submit(*request) for request in requests]
+                self._send(202, jobs if isinstance(body, list) else jobs[0])
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == '/health':
+                    self._send(200, service.health())
+                elif url.path == '/metrics':
+                    data = service.director.metrics.render().encode()
+                    self.send_response(200)
+                    self.send_header('Content-Type', CONTENT_TYPE)
+                    self.send_header('Content-Length', str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                elif url.path.rstrip('/') == '/campaigns':
+                    query = parse_qs(url.query)
+                    try:
+                        limit = int(query.get('limit', [100])[0])
+                    except ValueError:
+                        self._send(400, {'error': 'limit must be an integer'})
+                        return
+                    self._send(200, service.queue.list(
+                        status=query.get('status', [None])[0], limit=limit))
+                elif self._job_id():
+                    job = service.queue.get(self._job_id())
+                    if job:
+                        self._send(200, job)
+                    else:
+                        self._send(404, {'error': 'no such job'})
+                else:
+                    self._send(404, {'error': 'not found'})
+
+            def do_DELETE(self):
+                job_id = self._job_id()
+                if not job_id or not service.queue.get(job_id):
+                    self._send(404, {'error': 'no such job'})
+                elif service.queue.cancel(job_id):
+                    self._send(200, service.queue.get(job_id))
+                else:
+                    self._send(409, {'error': 'job already started'})
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve campaign production over HTTP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('-w', '--workers', type=int, default=4,
+                        help="Campaigns in flight at once")
+    parser.add_argument('--job-workers', type=int, default=8, help="Jobs in flight per campaign")
+    parser.add_argument('--queue', help="Queue database (default: creative_outputs/queue.db)")
+    parser.add_argument('--join', metavar='URL',
+                        help="Run workers only, leasing jobs from the service at URL")
+    parser.add_argument('--lease', type=float, default=60.0,
+                        help="Seconds a claimed job stays leased without a heartbeat")
+    parser.add_argument('--weight', action='append', default=[], metavar='CLIENT=W',
+                        help="Fair-share weight of a client (default 1)")
+    parser.add_argument('--class-limit', action='append', default=[], metavar='CLASS=N',
+                        help="Most jobs of a priority class running at once, e.g. premium=2")
+    parser.add_argument('--aging', type=float, default=300.0,
+                        help="Seconds of waiting that raise a job one priority class")
+    parser.add_argument('--engine', action='store_true',
+                        help="Poll predictions from one event loop instead of a thread each")
+    parser.add_argument('--trace', action='store_true',
+                        help="Record per-stage spans to <campaign>/trace.json")
+    parser.add_argument('--metrics-port', type=int,
+                        help="Serve Prometheus metrics on their own port (for --join nodes)")
+    args = parser.parse_args()
+
+    from creative_director import CreativeDirector
+    from tracing import Tracer
+    engine = None
+    if args.engine:
+        from prediction_engine import PredictionEngine
+        engine = PredictionEngine()
+    director = CreativeDirector(max_workers=args.job_workers, engine=engine,
+                                tracer=Tracer() if args.trace else None)
+    if args.join:
+        queue = RemoteQueue(args.join)
+    else:
+        scheduler = Scheduler(
+            weights={k: float(v) for k, v in (w.split('=', 1) for w in args.weight)},
+            limits={k: int(v) for k, v in (c.split('=', 1) for c in args.class_limit)},
+            aging=args.aging)
+        queue = JobQueue(args.queue or str(director.output_dir / 'queue.db'),
+                         lease=args.lease, scheduler=scheduler)
+    service = CampaignService(director, queue, workers=args.workers, host=args.host,
+                              port=args.port, lease=args.lease, serve=not args.join).start()
+    if args.metrics_port is not None:
+        from metrics import serve
+        serve(director.metrics, args.host, args.metrics_port)
+    if args.join:
+        print(f"🛰️  Worker node {service.node} leasing from {args.join} ({args.workers} workers)")
+    else:
+        print(f"🛰️  Campaign service at {service.url} ({args.workers} workers)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print("\n⏳ Draining running campaigns...")
+        service.stop()
+        if engine:
+            engine.stop()
+
+
+if __name__ == "__main__":
+    main()
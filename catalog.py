@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Catalog - SQLite index of campaigns, assets and Replicate predictions
+Full-text search over prompts plus indexed model / mode / time filters,
+so finding past outputs doesn't mean walking every metadata file
+"""
+
+import argparse
+import json
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from metadata_export import iter_export
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS campaigns (
+    id TEXT PRIMARY KEY,
+    system TEXT NOT NULL,            -- brief or mode
+    brief_type TEXT,
+    mode TEXT,
+    product TEXT,
+    quality TEXT,
+    created_at REAL NOT NULL,
+    dir TEXT,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS campaigns_mode ON campaigns (mode, created_at);
+CREATE INDEX IF NOT EXISTS campaigns_created ON campaigns (created_at);
+
+CREATE TABLE IF NOT EXISTS assets (
+    id INTEGER PRIMARY KEY,
+    campaign_id TEXT NOT NULL REFERENCES campaigns (id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,              -- image, video, audio
+    name TEXT,
+    model TEXT,
+    model_name TEXT,                 -- last path segment: flux-schnell
+    prompt TEXT,
+    url TEXT,
+    local_path TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS assets_model ON assets (model_name, created_at);
+CREATE INDEX IF NOT EXISTS assets_campaign ON assets (campaign_id);
+CREATE INDEX IF NOT EXISTS assets_created ON assets (created_at);
+
+CREATE TABLE IF NOT EXISTS predictions (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT UNIQUE NOT NULL,
+    model TEXT,
+    model_name TEXT,
+    version TEXT,
+    status TEXT,
+    prompt TEXT,
+    input TEXT,
+    output TEXT,
+    local_paths TEXT,
+    created_at REAL,
+    source TEXT
+);
+CREATE INDEX IF NOT EXISTS predictions_model ON predictions (model_name, created_at);
+CREATE INDEX IF NOT EXISTS predictions_created ON predictions (created_at);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS assets_fts
+    USING fts5(prompt, content='assets', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS assets_ai AFTER INSERT ON assets BEGIN
+    INSERT INTO assets_fts (rowid, prompt) VALUES (new.id, new.prompt);
+END;
+CREATE TRIGGER IF NOT EXISTS assets_ad AFTER DELETE ON assets BEGIN
+    INSERT INTO assets_fts (assets_fts, rowid, prompt) VALUES ('delete', old.id, old.prompt);
+END;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS predictions_fts
+    USING fts5(prompt, content='predictions', content_rowid='rowid');
+CREATE TRIGGER IF NOT EXISTS predictions_ai AFTER INSERT ON predictions BEGIN
+    INSERT INTO predictions_fts (rowid, prompt) VALUES (new.rowid, new.prompt);
+END;
+CREATE TRIGGER IF NOT EXISTS predictions_ad AFTER DELETE ON predictions BEGIN
+    INSERT INTO predictions_fts (predictions_fts, rowid, prompt) VALUES ('delete', old.rowid, old.prompt);
+END;
+CREATE TRIGGER IF NOT EXISTS predictions_au AFTER UPDATE OF prompt ON predictions BEGIN
+    INSERT INTO predictions_fts (predictions_fts, rowid, prompt) VALUES ('delete', old.rowid, old.prompt);
+    INSERT INTO predictions_fts (rowid, prompt) VALUES (new.rowid, new.prompt);
+END;
+'''
+
+
+def model_name(model: Optional[str]) -> Optional[str]:
+    """'black-forest-labs/flux-schnell:abc' -> 'flux-schnell'"""
+    if not model:
+        return None
+    return model.split(':')[0].split('/')[-1]
+
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """Epoch seconds from '7d', '24h', '30m', an ISO date/time or a number"""
+    if value is None:
+        return None
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)([smhdw])', value.strip())
+    if match:
+        unit = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}[match.group(2)]
+        return time.time() - float(match.group(1)) * unit
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+def _prompt(input: Optional[Dict[str, Any]]) -> str:
+    input = input or {}
+    return str(input.get('prompt') or input.get('prompt_a') or input.get('text') or '')
+
+
+def _fts_query(text: str) -> str:
+    """Quote each word so user text can't be parsed as FTS syntax"""
+    return ' '.join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+
+class Catalog:
+    """
+    One SQLite file (WAL mode) holding campaigns, their assets and raw
+    Replicate predictions. Writers go through a lock and one transaction
+    per call, so a campaign is either fully indexed or not at all.
+    """
+
+    def __init__(self, path: str = './creative_outputs/catalog.db'):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = str(path)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('PRAGMA foreign_keys=ON')
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        self._db.close()
+
+    # -- Writing -------------------------------------------------------------
+
+    def record_campaign(self, campaign_dir: Path, metadata: Dict[str, Any]):
+        """Index (or re-index) one campaign and its assets atomically"""
+        campaign_dir = Path(campaign_dir)
+        campaign_id = campaign_dir.name
+        created_at = float(metadata.get('timestamp') or time.time())
+        system = 'mode' if metadata.get('mode') else 'brief'
+
+        assets = []
+        for n, image in enumerate(metadata.get('images', []), 1):
+            assets.append(('image', image.get('type') or f"image_{image.get('index', n)}",
+                           image.get('model') or metadata.get('model'),
+                           image.get('prompt'), image.get('url'), image.get('local_path')))
+        for kind in ('video', 'audio'):
+            if metadata.get(kind):
+                assets.append((kind, kind, metadata.get(f'{kind}_model'), None,
+                               metadata[kind], metadata.get(f'{kind}_path')))
+
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM assets WHERE campaign_id = ?', (campaign_id,))
+            self._db.execute(
+                'INSERT OR REPLACE INTO campaigns '
+                '(id, system, brief_type, mode, product, quality, created_at, dir, metadata) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (campaign_id, system, metadata.get('brief_type'), metadata.get('mode'),
+                 metadata.get('product'), metadata.get('quality'), created_at,
+                 str(campaign_dir), json.dumps(metadata, default=str)))
+            self._db.executemany(
+                'INSERT INTO assets (campaign_id, kind, name, model, model_name, prompt, '
+                'url, local_path, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(campaign_id, kind, name, model, model_name(model), prompt,
+                  str(url) if url else None,
+                  str(campaign_dir / local) if local else None, created_at)
+                 for kind, name, model, prompt, url, local in assets])
+
+    def record_predictions(self, predictions: Iterable[Dict[str, Any]],
+                           source: Optional[str] = None, batch: int = 1000) -> int:
+        """Upsert prediction records in batched transactions"""
+        count, rows = 0, []
+        for record in predictions:
+            created = record.get('created_at')
+            rows.append((
+                record['id'], record.get('model'), model_name(record.get('model')),
+                record.get('version'), record.get('status'), _prompt(record.get('input')),
+                json.dumps(record.get('input') or {}), json.dumps(record.get('output')),
+                parse_time(created) if created else None, source))
+            if len(rows) >= batch:
+                count += self._upsert_predictions(rows)
+                rows = []
+        if rows:
+            count += self._upsert_predictions(rows)
+        return count
+
+    def _upsert_predictions(self, rows: List[tuple]) -> int:
+        with self._lock, self._db:
+            self._db.executemany(
+                'INSERT INTO predictions (id, model, model_name, version, status, prompt, '
+                'input, output, created_at, source) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (id) DO UPDATE SET status = excluded.status, '
+                'output = excluded.output, prompt = excluded.prompt', rows)
+        return len(rows)
+
+    def record_local_paths(self, paths: Dict[str, List[str]]):
+        """Attach downloaded file paths to predictions ({prediction_id: [path, ...]})"""
+        with self._lock, self._db:
+            self._db.executemany('UPDATE predictions SET local_paths = ? WHERE id = ?',
+                                 [(json.dumps(p), pid) for pid, p in paths.items()])
+
+    def ingest_campaigns(self, output_dir: Path) -> int:
+        """Backfill from creative_outputs/*/campaign_metadata.json"""
+        count = 0
+        for metadata_path in sorted(Path(output_dir).glob('*/campaign_metadata.json')):
+            with open(metadata_path) as f:
+                self.record_campaign(metadata_path.parent, json.load(f))
+            count += 1
+        return count
+
+    def ingest_sync_state(self, sync_dir: Path) -> int:
+        """Attach local files recorded by asset_sync to their predictions"""
+        with open(Path(sync_dir) / '.asset-sync-state.json') as f:
+            state = json.load(f)
+        paths = {pid: [str(Path(sync_dir) / e['path']) for e in p.get('files', {}).values()
+                       if e.get('complete')]
+                 for pid, p in state.get('predictions', {}).items()}
+        self.record_local_paths(paths)
+        return len(paths)
+
+    # -- Queries -------------------------------------------------------------
+
+    def search_assets(self, text: Optional[str] = None, model: Optional[str] = None,
+                      mode: Optional[str] = None, kind: Optional[str] = None,
+                      since: Optional[float] = None, until: Optional[float] = None,
+                      limit: int = 50) -> List[Dict[str, Any]]:
+        """Campaign assets matching every given filter, newest first"""
+        where, args = [], []
+        if text:
+            where.append('a.id IN (SELECT rowid FROM assets_fts WHERE assets_fts MATCH ?)')
+            args.append(_fts_query(text))
+        if model:
+            where.append('a.model_name = ?')
+            args.append(model_name(model))
+        if mode:
+            where.append('c.mode = ?')
+            args.append(mode)
+        if kind:
+            where.append('a.kind = ?')
+            args.append(kind)
+        if since is not None:
+            where.append('a.created_at >= ?')
+            args.append(since)
+        if until is not None:
+            where.append('a.created_at < ?')
+            args.append(until)
+        sql = ('SELECT a.campaign_id, c.mode, c.brief_type, a.kind, a.name, a.model, '
+               'a.prompt, a.url, a.local_path, a.created_at '
+               'FROM assets a JOIN campaigns c ON c.id = a.campaign_id')
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY a.created_at DESC LIMIT ?'
+        with self._lock:
+            return [dict(row) for row in self._db.execute(sql, args + [limit])]
+
+    def search_predictions(self, text: Optional[str] = None, model: Optional[str] = None,
+                           status: Optional[str] = None, since: Optional[float] = None,
+                           until: Optional[float] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Replicate predictions matching every given filter, newest first"""
+        where, args = [], []
+        if text:
+            where.append('rowid IN (SELECT rowid FROM predictions_fts WHERE predictions_fts MATCH ?)')
+            args.append(_fts_query(text))
+        if model:
+            where.append('model_name = ?')
+            args.append(model_name(model))
+        if status:
+            where.append('status = ?')
+            args.append(status)
+        if since is not None:
+            where.append('created_at >= ?')
+            args.append(since)
+        if until is not None:
+            where.append('created_at < ?')
+            args.append(until)
+        sql = ('SELECT id, model, status, prompt, output, local_paths, created_at, source '
+               'FROM predictions')
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY created_at DESC LIMIT ?'
+        with self._lock:
+            return [dict(row) for row in self._db.execute(sql, args + [limit])]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {table: self._db.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                    for table in ('campaigns', 'assets', 'predictions')}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search the campaign/prediction catalog")
+    parser.add_argument('--db', default='./creative_outputs/catalog.db')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    ingest = sub.add_parser('ingest', help="Backfill campaigns, exports and synced files")
+    ingest.add_argument('--campaigns', default='./creative_outputs')
+    ingest.add_argument('--export', nargs='*', default=[],
+                        help="replicate_metadata_*.json or .jsonl exports")
+    ingest.add_argument('--model', action='append', help="Only predictions of this model")
+    ingest.add_argument('--status', action='append', help="Only predictions with this status")
+    ingest.add_argument('--sync-dir', help="asset_sync destination to link local files from")
+
+    for name, help_text in (('assets', "Search campaign assets"),
+                            ('predictions', "Search Replicate predictions")):
+        query = sub.add_parser(name, help=help_text)
+        query.add_argument('text', nargs='?', help="Full-text prompt search")
+        query.add_argument('--model', help="e.g. flux-schnell")
+        query.add_argument('--since', help="7d, 24h, or ISO date")
+        query.add_argument('--until')
+        query.add_argument('--limit', type=int, default=50)
+        query.add_argument('--json', action='store_true')
+        if name == 'assets':
+            query.add_argument('--mode')
+            query.add_argument('--kind', choices=['image', 'video', 'audio'])
+        else:
+            query.add_argument('--status')
+    sub.add_parser('stats')
+    args = parser.parse_args()
+
+    catalog = Catalog(args.db)
+    if args.command == 'ingest':
+        print(f"📇 {catalog.ingest_campaigns(args.campaigns)} campaigns")
+        for export in args.export:
+            records = iter_export(export, args.model, args.status)
+            print(f"📇 {catalog.record_predictions(records, export)} predictions from {export}")
+        if args.sync_dir:
+            print(f"📇 local files for {catalog.ingest_sync_state(args.sync_dir)} predictions")
+        return 0
+    if args.command == 'stats':
+        print(json.dumps(catalog.counts(), indent=2))
+        return 0
+
+    started = time.perf_counter()
+    filters = dict(text=args.text, model=args.model, since=parse_time(args.since),
+                   until=parse_time(args.until), limit=args.limit)
+    if args.command == 'assets':
+        rows = catalog.search_assets(mode=args.mode, kind=args.kind, **filters)
+    else:
+        rows = catalog.search_predictions(status=args.status, **filters)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return 0
+    for row in rows:
+        when = datetime.fromtimestamp(row['created_at']).strftime('%Y-%m-%d %H:%M') if row['created_at'] else '?'
+        where = row.get('local_path') or row.get('local_paths') or row.get('url') or row.get('output')
+        label = row.get('campaign_id') or row['id']
+        print(f"{when}  {model_name(row['model']) or '-':<16} {label:<40} {(row['prompt'] or '')[:50]}")
+        print(f"{'':18}{str(where)[:100]}")
+    print(f"\n{len(rows)} results in {elapsed:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
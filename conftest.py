@@ -0,0 +1,46 @@
+import pytest
+
+from creative_director import CreativeDirector
+from http_client import PooledClient
+from rate_limiter import RateGovernor
+from replicate_standin import ReplicateStandIn
+
+# test_enhanced.py and test_replicate.py are scripts that call the live
+# Replicate API at import; run them directly, not under pytest
+collect_ignore = ['test_enhanced.py', 'test_replicate.py']
+
+
+# Campaign tests run against the local stand-in; a module overrides
+# standin or director_options to change the server or the director
+
+
+@pytest.fixture
+def standin():
+    server = ReplicateStandIn(latency=(0.02, 0.05)).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def client(standin):
+    client = PooledClient(base_url=standin.base_url)
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def director_options():
+    """Extra CreativeDirector arguments, e.g. {'tracer': Tracer()}"""
+    return {}
+
+
+@pytest.fixture
+def director(client, director_options, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('REPLICATE_POLL_INTERVAL', '0.05')
+    director = CreativeDirector(client=client, cache=False, catalog=False,
+                                download_assets=False,
+                                governor=RateGovernor(global_rate=500, global_burst=500),
+                                **director_options)
+    yield director
+    director.governor.close()
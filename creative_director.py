@@ -5,12 +5,31 @@ The synthesis of av-pair and fever-dream-pipeline
 Now with studio-inspired creative modes
 """
 
-import replicate
+import argparse
 import os
-import json
 import time
+import threading
+import contextvars
+import weakref
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
 from pathlib import Path
+from replicate.exceptions import ModelError
+from replicate.helpers import transform_output
+from replicate.identifier import ModelVersionIdentifier
 from mode_system import StudioModes, ReplicateOrchestrator, create_job_schema
+from job_executor import (DAGExecutor, JobResult, fingerprint_jobs, job_fingerprint,
+                          resolve_inputs, stale_jobs)
+from prediction_engine import PredictionEngine
+from http_client import PooledClient, shared_client
+from rate_limiter import RateGovernor
+from prediction_cache import PredictionCache
+from prompt_pipeline import PromptPipeline
+from asset_downloader import AssetDownloader, asset_filename
+from asset_store import AssetStore
+from catalog import Catalog, parse_time
+from campaign_journal import CampaignAbandoned, CampaignJournal, read_journal
+from tracing import TRACE_FILE, Tracer, activate, default_tracer, load_trace, waterfall
+from metrics import Metrics
 
 class CreativeDirector:
     """
@@ -18,10 +37,65 @@ class CreativeDirector:
     Straightforward implementation for easy testing.
     """
 
-    def __init__(self):
+    def __init__(self, max_workers: int = 8, engine: PredictionEngine = None,
+                 governor: RateGovernor = None, cache: PredictionCache = None,
+                 enhance_budget: float = 10.0, client: PooledClient = None,
+                 download_assets: bool = True, store: AssetStore = None,
+                 catalog: Catalog = None, tracer: Tracer = None, metrics: Metrics = None):
         self.output_dir = Path('./creative_outputs')
         self.output_dir.mkdir(exist_ok=True)
 
+        # One keep-alive connection pool for every Replicate call and download
+        self.client = client or shared_client()
+
+        # Concurrent jobs per campaign (independent assets run in parallel)
+        self.max_workers = max_workers
+
+        # Optional non-blocking backend: predictions are polled from one
+        # event loop instead of holding a thread each
+        self.engine = engine
+
+        # Assets are fetched into the campaign directory right after
+        # generation, before Replicate's output URLs expire
+        self.downloader = AssetDownloader(client=self.client) if download_assets else None
+        self._io = None
+        self._io_lock = threading.Lock()
+        self._local_copies = {}  # Expired cached output URL -> stored copy
+
+        # Campaign directories handed to another worker, and the journal
+        # each running campaign writes (so abandon() can close it)
+        self._abandoned = set()
+        self._journals = weakref.WeakValueDictionary()
+
+        # Optional content-addressed store: campaign directories become
+        # hardlink views, so assets shared across campaigns are stored once
+        self.store = store
+
+        # Searchable index of every campaign and asset (catalog=False to
+        # skip indexing)
+        self.catalog = Catalog(str(self.output_dir / 'catalog.db')) if catalog is None else catalog
+
+        # Per-model/global rate limits: throttled calls queue and retry
+        # instead of losing the asset
+        self.governor = governor or RateGovernor()
+
+        # Identical model + input pairs are served from disk (cache=False
+        # to always regenerate)
+        self.cache = PredictionCache(client=self.client) if cache is None else cache
+
+        # Seconds prompt enhancement may wait on the LLM before falling back
+        # to local rule-based enhancement (None = wait indefinitely)
+        self.enhance_budget = enhance_budget
+
+        # Per-stage latency spans, written to <campaign>/trace.json (no-op
+        # unless a Tracer is passed or CREATIVE_TRACE is set)
+        self.tracer = tracer or default_tracer()
+
+        # Running Prometheus counters and histograms, exposed by the batch
+        # runner and the campaign service
+        self.metrics = metrics or Metrics()
+        self._register_metrics()
+
         # Initialize studio modes
         self.studio_modes = StudioModes()
         self.current_mode = None
@@ -113,24 +187,78 @@ class CreativeDirector:
             'premium': {'steps': 50, 'guidance': 15}
         }
 
+    def _register_metrics(self):
+        metrics = self.metrics
+        self._submitted = metrics.counter('creative_predictions_submitted_total',
+                                          "Predictions submitted, by model key")
+        self._succeeded = metrics.counter('creative_predictions_succeeded_total',
+                                          "Predictions that produced an output, by model key")
+        self._failed = metrics.counter('creative_predictions_failed_total',
+                                       "Predictions that failed after retries, by model key")
+        self._in_flight = metrics.gauge('creative_predictions_in_flight',
+                                        "Predictions submitted and not yet finished, by model key")
+        self._latency = metrics.histogram('creative_prediction_seconds',
+                                          "Seconds from submission to output of successful "
+                                          "predictions (including rate-limit waits), by model key")
+        self._cache_lookups = metrics.counter('creative_cache_lookups_total',
+                                              "Prediction cache lookups, by model key and result")
+        self._downloads = metrics.counter('creative_downloads_total',
+                                          "Asset fetches into campaign directories, by status")
+        self._downloaded = metrics.counter('creative_downloaded_bytes_total',
+                                           "Bytes of assets fetched into campaign directories")
+        for field, help in (('requests', "HTTP requests over the shared connection pool"),
+                            ('connections', "Connections opened by the shared pool"),
+                            ('tls_handshakes', "TLS handshakes made by the shared pool")):
+            metrics.callback(f'creative_http_{field}_total', help,
+                             lambda field=field: self.client.connection_stats()[field],
+                             kind='counter')
+
     def create_campaign(self, brief_type: str = None, quality: str = 'standard',
                         include_video: bool = False, video_type: str = 'image2video',
                         image_model: str = None, enhance_prompts: bool = False,
                         generate_landing: bool = False, mode: str = None,
-                        product_name: str = None, product_desc: str = None):
+                        product_name: str = None, product_desc: str = None,
+                        concurrent: bool = False, max_workers: int = None,
+                        campaign_id: str = None):
         """
         Create a complete campaign with images, video, and audio.
         Now supports both legacy briefs and new studio modes.
-        """
 
-        # Use studio mode if specified
-        if mode and product_name:
-            return self._create_mode_campaign(mode, product_name, product_desc or "",
-                                               include_video, generate_landing)
+        With concurrent=True all brief images and the audio are submitted
+        together (up to max_workers at a time) and image2video starts as
+        soon as image 1 arrives. campaign_id names the output directory
+        (default: <brief or mode>_<timestamp>).
+        """
 
-        # Legacy brief-based generation
-        brief = self.briefs.get(brief_type, self.briefs['product_launch'])
-        quality_settings = self.quality_levels.get(quality, self.quality_levels['standard'])
+        root = None
+        try:
+            # Use studio mode if specified
+            if mode and product_name:
+                with self.tracer.span('campaign', mode=mode, product=product_name,
+                                      include_video=include_video) as root:
+                    results = self._create_mode_campaign(mode, product_name,
+                                                         product_desc or "", include_video,
+                                                         generate_landing, campaign_id)
+            else:
+                if brief_type not in self.briefs:
+                    brief_type = 'product_launch'  # Journaled resolved, so resume can find it
+                with self.tracer.span('campaign', brief_type=brief_type, quality=quality,
+                                      include_video=include_video,
+                                      concurrent=concurrent) as root:
+                    results = self._create_brief_campaign(brief_type, quality, include_video,
+                                                          video_type, image_model,
+                                                          enhance_prompts, generate_landing,
+                                                          concurrent, max_workers, campaign_id)
+            self._export_trace(root, results)
+            return results
+        finally:
+            self._discard_trace(root)
+
+    def _create_brief_campaign(self, brief_type, quality, include_video, video_type,
+                               image_model, enhance_prompts, generate_landing, concurrent,
+                               max_workers, campaign_id):
+        """Legacy brief-based generation"""
+        brief = self.briefs[brief_type]
         image_model = image_model or self.default_image
 
         print(f"\n{'='*60}")
@@ -150,173 +278,69 @@ class CreativeDirector:
             'audio': None,
             'timestamp': int(time.time())
         }
-
-        # Optional: Enhance prompts with LLM
-        if enhance_prompts:
-            from creative_enhancer import CreativeEnhancer
-            enhancer = CreativeEnhancer(use_claude=os.getenv('USE_CLAUDE', False))
-            print("\n✨ Enhancing prompts with AI...")
-            enhanced_prompts = []
-            for p in brief['prompts']:
-                enhanced = enhancer.enhance_prompt(p)
-                enhanced_prompts.append(enhanced)
-                print(f"   ✓ Enhanced: {enhanced[:60]}...")
-            brief['prompts'] = enhanced_prompts
-
-        # Generate campaign images
-        print("\n📸 Generating campaign visuals...")
-        for i, prompt in enumerate(brief['prompts'], 1):
-            print(f"   Asset {i}/3: ", end='', flush=True)
-
-            try:
-                # Different models have different parameters
-                if 'flux' in image_model:
-                    input_params = {
-                        "prompt": prompt + ", professional quality, high detail",
-                        "num_outputs": 1,
-                        "aspect_ratio": "1:1",
-                        "output_format": "png",
-                        "output_quality": 95
-                    }
-                else:  # SDXL/Playground
-                    input_params = {
-                        "prompt": prompt + ", professional quality, commercial use",
-                        "negative_prompt": "amateur, low quality, watermark, blurry",
-                        "width": 1024,
-                        "height": 1024,
-                        "num_outputs": 1,
-                        "num_inference_steps": quality_settings['steps'],
-                        "guidance_scale": quality_settings['guidance']
-                    }
-
-                output = replicate.run(
-                    self.models[image_model],
-                    input=input_params
-                )
-
-                if output:
-                    # Handle different output types
-                    if isinstance(output, list):
-                        url = output[0]
-                    elif hasattr(output, 'url'):
-                        url = output.url
-                    else:
-                        url = output
-
-                    # Ensure URL is string
-                    url = str(url) if not isinstance(url, str) else url
-
-                    results['images'].append({
-                        'url': url,
-                        'prompt': prompt,
-                        'index': i
-                    })
-                    print("✅")
-                else:
-                    print("❌")
-
-            except Exception as e:
-                print(f"❌ ({str(e)[:30]}...)")
-
-        # Generate video if requested
-        if include_video:
-            print(f"\n🎥 Generating campaign video ({video_type})...")
-            try:
-                if video_type == 'text2video':
-                    # Direct text-to-video generation with CogVideoX
-                    video_prompt = brief['prompts'][0] + ", high quality video, smooth motion"
-
-                    video_output = replicate.run(
-                        self.models['cogvideox'],
-                        input={
-                            "prompt": video_prompt,
-                            "num_frames": 49,  # ~6 seconds at 8fps
-                            "guidance_scale": 7,
-                            "num_inference_steps": 50 if quality == 'premium' else 25
-                        }
-                    )
-                elif video_type == 'zeroscope':
-                    # Zeroscope for longer videos
-                    video_prompt = brief['prompts'][0] + ", cinematic"
-
-                    video_output = replicate.run(
-                        self.models['zeroscope'],
-                        input={
-                            "prompt": video_prompt,
-                            "width": 1024,
-                            "height": 576,
-                            "num_frames": 24,
-                            "fps": 8
-                        }
-                    )
-                else:  # Default image2video
-                    if not results['images']:
-                        print("   ⚠️ No images to animate, skipping video")
-                        video_output = None
-                    else:
-                        hero_image = results['images'][0]['url']
-                        video_output = replicate.run(
-                            self.models[self.default_video],
-                            input={
-                                "input_image": hero_image,
-                                "video_length": "14_frames",
-                                "sizing_strategy": "maintain_aspect_ratio",
-                                "frames_per_second": 7,
-                                "motion_bucket_id": 127  # Medium motion
-                            }
-                        )
-
-                if video_output:
-                    # Handle FileOutput objects
-                    if hasattr(video_output, 'url'):
-                        results['video'] = video_output.url
-                    elif isinstance(video_output, str):
-                        results['video'] = video_output
+        if campaign_id:
+            results['campaign_id'] = campaign_id
+        journal = self._open_journal(results, {
+            'brief_type': brief_type, 'quality': quality, 'image_model': image_model,
+            'include_video': include_video, 'video_type': video_type,
+            'enhance_prompts': enhance_prompts})
+
+        with journal:  # Closed by _save_campaign, or here if generation raises
+            # Optional: Enhance prompts with LLM (streamed straight into
+            # generation when running concurrently)
+            enhancer = None
+            if enhance_prompts:
+                from creative_enhancer import CreativeEnhancer
+                enhancer = CreativeEnhancer(use_claude=os.getenv('USE_CLAUDE', False),
+                                            engine=self.engine,
+                                            governor=self.governor,
+                                            client=self.client,
+                                            latency_budget=self.enhance_budget)
+            if enhancer and concurrent:
+                with self.tracer.span('generate', streaming=True):
+                    self._run_brief_streaming(enhancer, brief, results, quality, image_model,
+                                              include_video, video_type,
+                                              max_workers or self.max_workers, journal)
+                self._print_enhancement_stats(enhancer)
+            else:
+                if enhancer:
+                    print("\n✨ Enhancing prompts with AI...")
+                    with self.tracer.span('enhance', prompts=len(brief['prompts'])):
+                        enhanced_prompts = enhancer.enhance_prompts(brief['prompts'])
+                    for enhanced in enhanced_prompts:
+                        print(f"   ✓ Enhanced: {enhanced[:60]}...")
+                    self._print_enhancement_stats(enhancer)
+                    brief = {**brief, 'prompts': enhanced_prompts}
+
+                jobs = self._brief_jobs(brief, quality, image_model, include_video, video_type)
+                jobs = {name: self._with_target(name, job, results) for name, job in jobs.items()}
+                journal.record('planned', jobs=jobs)
+
+                with self.tracer.span('generate', jobs=len(jobs)):
+                    if concurrent:
+                        self._run_brief_concurrently(jobs, results, max_workers or self.max_workers,
+                                                     journal)
                     else:
-                        results['video'] = str(video_output)
-                    print("   ✅ Video generated!")
-
-            except Exception as e:
-                print(f"   ❌ Video failed: {e}")
-
-        # Generate campaign audio
-        print("\n🎵 Generating campaign audio...")
-        try:
-            audio_output = replicate.run(
-                self.models[self.default_audio],
-                input={
-                    "prompt_a": brief['audio'],
-                    "denoising": 0.75,
-                    "seed_image_id": "vibes"
-                }
-            )
-
-            if audio_output and isinstance(audio_output, dict):
-                results['audio'] = audio_output.get('audio')
-                print("   ✅ Audio generated!")
-
-        except Exception as e:
-            print(f"   ❌ Audio failed: {e}")
+                        self._run_brief_serially(jobs, results, video_type, journal)
 
-        # Save campaign metadata
-        self._save_campaign(results, brief)
+            # Save campaign metadata
+            campaign_data = self._save_campaign(results, brief, journal)
 
         # Optional: Generate landing page
         if generate_landing:
             from creative_enhancer import CreativeEnhancer
-            enhancer = CreativeEnhancer(use_claude=os.getenv('USE_CLAUDE', False))
+            enhancer = CreativeEnhancer(use_claude=os.getenv('USE_CLAUDE', False),
+                                        engine=self.engine,
+                                        governor=self.governor,
+                                        client=self.client)
             print("\n🌐 Generating landing page...")
 
-            # Load the saved metadata for complete data
-            campaign_dir = self.output_dir / f"{results['brief_type']}_{results['timestamp']}"
-            metadata_path = campaign_dir / 'campaign_metadata.json'
-            with open(metadata_path, 'r') as f:
-                campaign_data = json.load(f)
-
-            html = enhancer.generate_landing_page(campaign_data)
-            landing_path = campaign_dir / 'index.html'
-            with open(landing_path, 'w') as f:
-                f.write(html)
+            campaign_dir = self._campaign_dir(results)
+            with self.tracer.span('landing_page'):
+                html = enhancer.generate_landing_page(campaign_data)
+                landing_path = campaign_dir / 'index.html'
+                with open(landing_path, 'w') as f:
+                    f.write(html)
 
             print(f"   ✅ Landing page: {landing_path}")
             results['landing_page'] = str(landing_path)
@@ -325,7 +349,7 @@ class CreativeDirector:
 
     def _create_mode_campaign(self, mode_name: str, product_name: str,
                               product_desc: str, include_video: bool = True,
-                              generate_landing: bool = False):
+                              generate_landing: bool = False, campaign_id: str = None):
         """
         Create campaign using studio mode system
         """
@@ -333,7 +357,7 @@ class CreativeDirector:
         mode = self.studio_modes.get_mode(mode_name)
         if not mode:
             print(f"❌ Mode '{mode_name}' not found. Using legacy system.")
-            return self.create_campaign('product_launch')
+            return self.create_campaign('product_launch', campaign_id=campaign_id)
 
         self.current_mode = mode
         self.orchestrator = ReplicateOrchestrator(mode)
@@ -358,96 +382,953 @@ class CreativeDirector:
             'audio': None,
             'timestamp': int(time.time())
         }
+        if campaign_id:
+            results['campaign_id'] = campaign_id
+        journal = self._open_journal(results, {'mode': mode_name, 'product_name': product_name,
+                                               'product_desc': product_desc,
+                                               'include_video': include_video})
+
+        with journal:  # Closed by _save_mode_campaign, or here if generation raises
+            # Execute jobs as a dependency graph: stills, text-to-video and
+            # soundtrack run together, image-to-video waits on the hero image
+            jobs = dict(job_schema['jobs'])
+            if not include_video:
+                jobs.pop('hero_video', None)
+            jobs = {name: self._with_target(name, job, results) for name, job in jobs.items()}
+            journal.record('planned', jobs=jobs)
+
+            print("\n📸 Generating campaign assets...")
+            started = time.time()
+            executor = DAGExecutor(self._journaled(journal, self._run_job),
+                                   max_workers=self.max_workers,
+                                   on_complete=self._report_job,
+                                   submit_job=(self._journaled(journal, self._submit_job)
+                                               if self.engine else None))
+            with self.tracer.span('generate', jobs=len(jobs)):
+                job_results = executor.execute(jobs)
+            print(f"   ⏱️  {len(jobs)} jobs in {time.time() - started:.1f}s")
+
+            self._collect_mode_results(jobs, job_results, results)
+
+            # Save campaign with mode metadata
+            campaign_data = self._save_mode_campaign(results, mode, journal)
 
-        # Execute jobs
-        print("\n📸 Generating hero visuals...")
-        for job_name, job_config in job_schema['jobs'].items():
-            if 'image' in job_name:
-                print(f"   {job_name}: ", end='', flush=True)
-                try:
-                    output = replicate.run(
-                        job_config['model'],
-                        input=job_config['input']
-                    )
-
-                    if output:
-                        url = output[0] if isinstance(output, list) else str(output)
-                        results['images'].append({
-                            'url': url,
-                            'type': job_name,
-                            'prompt': job_config['input'].get('prompt', '')
-                        })
-                        print("✅")
-                    else:
-                        print("❌")
-                except Exception as e:
-                    print(f"❌ ({str(e)[:30]}...)")
+        # Generate landing page if requested
+        if generate_landing:
+            from creative_enhancer import CreativeEnhancer
+            enhancer = CreativeEnhancer(engine=self.engine, governor=self.governor,
+                                        client=self.client)
+            print("\n🌐 Generating landing page...")
 
-        # Generate video if requested
-        if include_video and 'hero_video' in job_schema['jobs']:
-            print("\n🎥 Generating campaign video...")
-            try:
-                video_job = job_schema['jobs']['hero_video']
+            campaign_dir = self._campaign_dir(results)
+            with self.tracer.span('landing_page'):
+                html = enhancer.generate_landing_page(campaign_data)
+                landing_path = campaign_dir / 'index.html'
+                with open(landing_path, 'w') as f:
+                    f.write(html)
 
-                # If image-to-video and we have images, use the hero image
-                if 'svd' in video_job['model'] and results['images']:
-                    video_job['input']['input_image'] = results['images'][0]['url']
+            print(f"   ✅ Landing page: {landing_path}")
+            results['landing_page'] = str(landing_path)
 
-                video_output = replicate.run(
-                    video_job['model'],
-                    input=video_job['input']
-                )
+        return results
 
-                if video_output:
-                    results['video'] = str(video_output)
-                    print("   ✅ Video generated!")
-            except Exception as e:
-                print(f"   ❌ Video failed: {e}")
+    def _collect_mode_results(self, jobs, job_results, results):
+        """Fill campaign results from job results, in schema order"""
+        for job_name, job_config in jobs.items():
+            result = job_results[job_name]
+            if not result.ok:
+                continue
+            kind = job_config.get('kind')
+            if kind == 'image':
+                results['images'].append({
+                    'url': result.output,
+                    'type': job_name,
+                    'model': self._model_ref(job_config['model']),
+                    'prompt': job_config['input'].get('prompt', '')
+                })
+            elif kind in ('video', 'audio'):
+                results[kind] = result.output
+                results[f'{kind}_model'] = self._model_ref(job_config['model'])
+
+    def resume_campaign(self, campaign_id: str, max_workers: int = None):
+        """
+        Finish a campaign that stopped part-way, from its journal.
 
-        # Generate audio
-        if 'soundtrack' in job_schema['jobs']:
-            print("\n🎵 Generating campaign soundtrack...")
-            try:
-                audio_job = job_schema['jobs']['soundtrack']
-                audio_output = replicate.run(
-                    audio_job['model'],
-                    input=audio_job['input']
-                )
-
-                if audio_output:
-                    results['audio'] = str(audio_output)
-                    print("   ✅ Soundtrack generated!")
-            except Exception as e:
-                print(f"   ❌ Audio failed: {e}")
+        Finished jobs are reused (their saved files when present),
+        predictions that were still running are re-polled by ID, and only
+        jobs that failed or never started are submitted again.
+        """
+        campaign_dir, events, plan, results = self._load_journal(campaign_id)
+        jobs, outputs, in_flight = self._journal_state(events, plan, results)
+        print(f"\n♻️  Resuming {campaign_id}: {len(outputs)} finished, "
+              f"{len(in_flight)} in flight, {len(jobs) - len(outputs) - len(in_flight)} to run")
+
+        journal = self._journal(campaign_dir)
+        journal.fingerprints.update(self._built_fingerprints(events))
+        journal.record('resumed', finished=sorted(outputs), in_flight=in_flight)
+        return self._finish_campaign(plan, results, jobs, outputs, journal,
+                                     self._journaled(journal, self._resume_job(in_flight)),
+                                     max_workers, 'resume')
+
+    def rebuild_campaign(self, campaign_id: str, dry_run: bool = False,
+                         max_workers: int = None):
+        """
+        Make-style rebuild of an existing campaign: the job schema is
+        rebuilt from the current briefs/modes and fingerprinted (model ref
+        plus inputs, plus the fingerprints of the jobs it consumes); only
+        jobs whose fingerprint changed since the last build, and everything
+        downstream of them, are regenerated. With dry_run=True nothing is
+        submitted. Returns {job name: reason} for the jobs (to be) rebuilt.
+        """
+        campaign_dir, events, plan, results = self._load_journal(campaign_id)
+        built = self._built_fingerprints(events)
+        jobs = self._plan_jobs(plan, results)
+        if plan.get('enhance_prompts'):
+            # LLM-enhanced prompts can't be re-derived: keep the ones built
+            for event in events:
+                if event['event'] == 'job' and event['name'] in jobs and event['kind'] == 'image':
+                    jobs[event['name']] = event['job']
+        fingerprints = fingerprint_jobs(jobs, lambda model: self._resolve_model(model)[1])
+        stale = stale_jobs(jobs, fingerprints, built)
+
+        print(f"\n🔁 {'Dry run: ' if dry_run else ''}rebuilding {len(stale)}/{len(jobs)} jobs "
+              f"of {campaign_id}")
+        for name in jobs:
+            print(f"   {'🔨' if name in stale else '✓ '} {name:<16} {stale.get(name, 'up to date')}")
+        for name in sorted(set(built) - set(jobs)):
+            print(f"   🗑️  {name:<16} no longer in the schema")
+        if dry_run:
+            return stale
+
+        outputs = {}
+        for event in events:
+            if event['event'] == 'job' and event['name'] in jobs and event['name'] not in stale:
+                outputs[event['name']] = self._saved_output(event['job'], event['output'])
+        journal = self._journal(campaign_dir)
+        journal.fingerprints.update({name: fp for name, fp in built.items() if name not in stale})
+        journal.record('rebuild', stale=stale)
+        self._finish_campaign(plan, results, jobs, outputs, journal,
+                              self._journaled(journal, self._run_job), max_workers, 'rebuild')
+        return stale
+
+    def abandon(self, campaign_id: str):
+        """
+        Stop a campaign running here from touching its directory again,
+        e.g. after its lease passed to another worker: its journal stops
+        recording, and new jobs, output saves and the final metadata raise
+        CampaignAbandoned. Predictions already submitted finish unsaved.
+        """
+        campaign_dir = self.output_dir / campaign_id
+        with self._io_lock:
+            self._abandoned.add(str(campaign_dir))
+            journal = self._journals.get(str(campaign_dir))
+        if journal is not None:
+            journal.abandon()
+
+    def adopt(self, campaign_id: str):
+        """Let this process write to an abandoned campaign again (it holds it now)"""
+        with self._io_lock:
+            self._abandoned.discard(str(self.output_dir / campaign_id))
+
+    def _check_abandoned(self, campaign_dir):
+        if str(Path(campaign_dir)) in self._abandoned:
+            raise CampaignAbandoned(f"{campaign_dir} was handed to another worker")
+
+    def _load_journal(self, campaign_id: str):
+        campaign_dir = self.output_dir / campaign_id
+        events = read_journal(campaign_dir)
+        started = next((e for e in events if e['event'] == 'started'), None)
+        if not started or 'plan' not in started:
+            raise ValueError(f"No resumable journal in {campaign_dir}")
+        return campaign_dir, events, started['plan'], {**started['campaign'], 'images': []}
+
+    @staticmethod
+    def _built_fingerprints(events) -> dict:
+        """Fingerprint of each job's latest successful build"""
+        built = {}
+        for event in events:
+            if event['event'] != 'job':
+                continue
+            if event['status'] == 'succeeded' and event.get('fingerprint'):
+                built[event['name']] = event['fingerprint']
+            else:
+                built.pop(event['name'], None)
+        return built
+
+    def _finish_campaign(self, plan, results, jobs, outputs, journal, run_job, max_workers,
+                         run_kind):
+        """Run every job without an output yet, then collect and save the campaign"""
+        def run(name, job):
+            if name in outputs:
+                return outputs[name]
+            return run_job(name, job)
+
+        root = None
+        try:
+            with journal, self.tracer.span('campaign', run=run_kind, mode=plan.get('mode'),
+                                           brief_type=plan.get('brief_type'),
+                                           quality=plan.get('quality')) as root:
+                started_at = time.time()
+                executor = DAGExecutor(run, max_workers=max_workers or self.max_workers,
+                                       on_complete=self._report_job)
+                pending = len(jobs) - len(outputs)
+                with self.tracer.span('generate', jobs=pending):
+                    job_results = executor.execute(jobs)
+                print(f"   ⏱️  {pending} jobs in {time.time() - started_at:.1f}s")
+
+                if 'mode' in plan:
+                    self._collect_mode_results(jobs, job_results, results)
+                    self._save_mode_campaign(results, self.studio_modes.get_mode(plan['mode']),
+                                             journal)
+                else:
+                    self._collect_brief_results(jobs, job_results, results)
+                    self._save_campaign(results, self._plan_brief(plan), journal)
+            self._export_trace(root, results)
+            return results
+        finally:
+            self._discard_trace(root)
+
+    def _journal_state(self, events, plan, results):
+        """
+        Replay journal events into (jobs, outputs of finished jobs,
+        {job name: prediction ID} for predictions never seen finishing)
+        """
+        jobs, outputs, in_flight, recorded = {}, {}, {}, set()
+        for event in events:
+            if event['event'] == 'planned':
+                jobs.update(event['jobs'])
+                recorded.update(event['jobs'])
+            elif event['event'] == 'submitted':
+                jobs[event['name']] = event['job']
+                recorded.add(event['name'])
+                in_flight[event['name']] = event['prediction_id']
+            elif event['event'] == 'job':
+                jobs[event['name']] = event['job']
+                recorded.add(event['name'])
+                in_flight.pop(event['name'], None)
+                if event['status'] == 'succeeded':
+                    outputs[event['name']] = self._saved_output(event['job'], event['output'])
+                else:
+                    outputs.pop(event['name'], None)
+
+        # Jobs that never started (streamed campaigns plan as they go)
+        for name, job in self._plan_jobs(plan, results).items():
+            jobs.setdefault(name, job)
+        missing = [name for name in jobs if name not in recorded
+                   and jobs[name]['kind'] == 'image']
+        if plan.get('enhance_prompts') and missing:
+            from creative_enhancer import CreativeEnhancer
+            enhancer = CreativeEnhancer(use_claude=os.getenv('USE_CLAUDE', False),
+                                        engine=self.engine, governor=self.governor,
+                                        client=self.client, latency_budget=self.enhance_budget)
+            prompts = enhancer.enhance_prompts([jobs[name]['prompt'] for name in missing])
+            for name, prompt in zip(missing, prompts):
+                job = jobs[name]
+                jobs[name] = self._with_target(name, self._image_job(
+                    job['index'], prompt, plan['quality'], plan['image_model']), results)
+        return jobs, outputs, in_flight
+
+    def _plan_jobs(self, plan, results):
+        """Rebuild a campaign's job schema from its journaled parameters"""
+        if 'mode' in plan:
+            jobs = dict(create_job_schema(plan['mode'], plan['product_name'],
+                                          plan['product_desc'])['jobs'])
+            if not plan['include_video']:
+                jobs.pop('hero_video', None)
+        else:
+            jobs = self._brief_jobs(self._plan_brief(plan), plan['quality'],
+                                    plan['image_model'], plan['include_video'],
+                                    plan['video_type'])
+        return {name: self._with_target(name, job, results) for name, job in jobs.items()}
+
+    def _plan_brief(self, plan):
+        """The brief a journaled campaign was built from"""
+        # Older journals recorded brief_type before it defaulted
+        brief_type = plan.get('brief_type') or 'product_launch'
+        if brief_type not in self.briefs:
+            raise ValueError(f"Campaign was built from brief '{brief_type}', "
+                             f"which no longer exists")
+        return self.briefs[brief_type]
+
+    def _resume_job(self, in_flight):
+        """run_job for resumed campaigns: re-attach to a known prediction before resubmitting"""
+        def run(name, job, on_created=None):
+            prediction_id = in_flight.get(name)
+            if prediction_id:
+                output = self._reattach(job, prediction_id)
+                if output:
+                    return output
+            return self._run_job(name, job, on_created)
+        return run
 
-        # Save campaign with mode metadata
-        self._save_mode_campaign(results, mode)
+    def _reattach(self, job, prediction_id):
+        """Output of an earlier prediction, or None if it has to run again"""
+        key, model = self._resolve_model(job['model'])
+        try:
+            if self.engine:
+                output = self.engine.track(prediction_id).result()
+            else:
+                output = self._wait_output(self.client.predictions.get(prediction_id))
+        except Exception as e:
+            print(f"   ↻ {prediction_id}: {str(e)[:60]} - resubmitting")
+            return None
+        return self._finish_output(model, job, output)
+
+    @staticmethod
+    def _saved_output(job, output):
+        """A finished job's file in the campaign directory, if it was saved"""
+        if job.get('save_as'):
+            save_as = Path(job['save_as'])
+            for path in sorted(save_as.parent.glob(save_as.name + '.*')):
+                if not path.name.endswith('.part'):
+                    return str(path.resolve())
+        return output
+
+    def _brief_jobs(self, brief, quality, image_model, include_video, video_type):
+        """Build a job schema for a legacy brief (same shape as create_job_schema)"""
+        jobs = {}
+        for i, prompt in enumerate(brief['prompts'], 1):
+            jobs[f'image_{i}'] = self._image_job(i, prompt, quality, image_model)
+        if include_video:
+            jobs['video'] = self._video_job(brief['prompts'][0], quality, video_type)
+        jobs['audio'] = self._audio_job(brief)
+        return jobs
 
-        # Generate landing page if requested
-        if generate_landing:
-            from creative_enhancer import CreativeEnhancer
-            enhancer = CreativeEnhancer()
-            print("\n🌐 Generating landing page...")
+    def _image_job(self, index, prompt, quality, image_model):
+        quality_settings = self.quality_levels.get(quality, self.quality_levels['standard'])
 
-            campaign_dir = self.output_dir / f"{mode_name}_{product_name}_{results['timestamp']}"
-            metadata_path = campaign_dir / 'campaign_metadata.json'
-            with open(metadata_path, 'r') as f:
-                campaign_data = json.load(f)
+        # Different models have different parameters
+        if 'flux' in image_model:
+            input_params = {
+                "prompt": prompt + ", professional quality, high detail",
+                "num_outputs": 1,
+                "aspect_ratio": "1:1",
+                "output_format": "png",
+                "output_quality": 95
+            }
+        else:  # SDXL/Playground
+            input_params = {
+                "prompt": prompt + ", professional quality, commercial use",
+                "negative_prompt": "amateur, low quality, watermark, blurry",
+                "width": 1024,
+                "height": 1024,
+                "num_outputs": 1,
+                "num_inference_steps": quality_settings['steps'],
+                "guidance_scale": quality_settings['guidance']
+            }
+        return {
+            'model': image_model,
+            'kind': 'image',
+            'index': index,
+            'prompt': prompt,
+            'input': input_params
+        }
 
-            html = enhancer.generate_landing_page(campaign_data)
-            landing_path = campaign_dir / 'index.html'
-            with open(landing_path, 'w') as f:
-                f.write(html)
+    def _video_job(self, prompt, quality, video_type):
+        if video_type == 'text2video':
+            # Direct text-to-video generation with CogVideoX
+            return {
+                'model': 'cogvideox',
+                'kind': 'video',
+                'input': {
+                    "prompt": prompt + ", high quality video, smooth motion",
+                    "num_frames": 49,  # ~6 seconds at 8fps
+                    "guidance_scale": 7,
+                    "num_inference_steps": 50 if quality == 'premium' else 25
+                }
+            }
+        if video_type == 'zeroscope':
+            # Zeroscope for longer videos
+            return {
+                'model': 'zeroscope',
+                'kind': 'video',
+                'input': {
+                    "prompt": prompt + ", cinematic",
+                    "width": 1024,
+                    "height": 576,
+                    "num_frames": 24,
+                    "fps": 8
+                }
+            }
+        # Default image2video animates the first image
+        return {
+            'model': self.default_video,
+            'kind': 'video',
+            'depends_on': ['image_1'],
+            'input_from': {'input_image': 'image_1'},
+            'input': {
+                "video_length": "14_frames",
+                "sizing_strategy": "maintain_aspect_ratio",
+                "frames_per_second": 7,
+                "motion_bucket_id": 127  # Medium motion
+            }
+        }
 
-            print(f"   ✅ Landing page: {landing_path}")
-            results['landing_page'] = str(landing_path)
+    def _audio_job(self, brief):
+        return {
+            'model': self.default_audio,
+            'kind': 'audio',
+            'input': {
+                "prompt_a": brief['audio'],
+                "denoising": 0.75,
+                "seed_image_id": "vibes"
+            }
+        }
 
-        return results
+    def _run_brief_serially(self, jobs, results, video_type, journal=None):
+        """Generate brief assets one at a time"""
+        run_job = self._journaled(journal, self._run_job)
+        image_jobs = [name for name, job in jobs.items() if job['kind'] == 'image']
+
+        print("\n📸 Generating campaign visuals...")
+        for name in image_jobs:
+            job = jobs[name]
+            print(f"   Asset {job['index']}/{len(image_jobs)}: ", end='', flush=True)
+            try:
+                url = run_job(name, job)
+                if url:
+                    results['images'].append({
+                        'url': url,
+                        'model': self._model_ref(job['model']),
+                        'prompt': job['prompt'],
+                        'index': job['index']
+                    })
+                    print("✅")
+                else:
+                    print("❌")
+            except Exception as e:
+                print(f"❌ ({str(e)[:30]}...)")
 
-    def _save_mode_campaign(self, results, mode):
-        """Save mode-based campaign assets"""
-        campaign_dir = self.output_dir / f"{results['mode']}_{results['product']}_{results['timestamp']}"
+        if 'video' in jobs:
+            print(f"\n🎥 Generating campaign video ({video_type})...")
+            job = jobs['video']
+            try:
+                if job.get('input_from') and not results['images']:
+                    print("   ⚠️ No images to animate, skipping video")
+                else:
+                    if job.get('input_from'):
+                        job = {**job, 'input': {**job['input'],
+                                                'input_image': results['images'][0]['url']}}
+                    results['video'] = run_job('video', job)
+                    if results['video']:
+                        results['video_model'] = self._model_ref(job['model'])
+                        print("   ✅ Video generated!")
+            except Exception as e:
+                print(f"   ❌ Video failed: {e}")
+
+        print("\n🎵 Generating campaign audio...")
+        try:
+            results['audio'] = run_job('audio', jobs['audio'])
+            if results['audio']:
+                results['audio_model'] = self._model_ref(jobs['audio']['model'])
+                print("   ✅ Audio generated!")
+        except Exception as e:
+            print(f"   ❌ Audio failed: {e}")
+
+    def _run_brief_concurrently(self, jobs, results, max_workers, journal=None):
+        """Generate all brief assets at once, reporting in index order"""
+        print(f"\n⚡ Generating {len(jobs)} assets concurrently ({max_workers} workers)...")
+        started = time.time()
+        executor = DAGExecutor(self._journaled(journal, self._run_job), max_workers=max_workers,
+                               submit_job=(self._journaled(journal, self._submit_job)
+                                           if self.engine else None))
+        job_results = executor.execute(jobs)
+        print(f"   ⏱️  Finished in {time.time() - started:.1f}s")
+        self._collect_brief_results(jobs, job_results, results)
+
+    def _run_brief_streaming(self, enhancer, brief, results, quality, image_model,
+                             include_video, video_type, max_workers, journal=None):
+        """
+        Enhance and generate at the same time: each prompt is submitted to
+        the image model the moment the LLM finishes it
+        """
+        print(f"\n✨ Streaming enhanced prompts into generation ({max_workers} workers)...")
+        started = time.time()
+        run_job = self._journaled(journal, self._run_job)
+        side = ThreadPoolExecutor(max_workers=2)
+        try:
+            side_jobs = {'audio': (self._with_target('audio', self._audio_job(brief), results),
+                                   time.time())}
+            side_futures = {'audio': side.submit(contextvars.copy_context().run, run_job, 'audio',
+                                                 side_jobs['audio'][0])}
+
+            def start_side(name, job):
+                side_jobs[name] = (job, time.time())
+                side_futures[name] = side.submit(contextvars.copy_context().run, run_job, name, job)
+
+            def generate(index, prompt):
+                video = (self._with_target('video', self._video_job(prompt, quality, video_type),
+                                           results)
+                         if include_video and index == 1 else None)
+                if video and not video.get('input_from'):
+                    start_side('video', video)
+                name = f'image_{index}'
+                output = run_job(name, self._with_target(
+                    name, self._image_job(index, prompt, quality, image_model), results))
+                if video and video.get('input_from') and output:
+                    start_side('video', resolve_inputs(video, {'image_1': output}))
+                return output
+
+            pipeline = PromptPipeline(generate, workers=max_workers, on_complete=self._report_job)
+            streamed = pipeline.run((i + 1, prompt) for i, prompt in
+                                    enhancer.stream_enhanced(brief['prompts']))
+
+            jobs, job_results = {}, {}
+            for index in sorted(streamed):
+                prompt, result = streamed[index]
+                jobs[result.name] = {'kind': 'image', 'index': index, 'prompt': prompt,
+                                     'model': image_model}
+                job_results[result.name] = result
+            if include_video:
+                jobs['video'] = side_jobs.get('video', ({'kind': 'video'},))[0]
+                if 'video' not in side_futures:
+                    job_results['video'] = JobResult('video', 'skipped',
+                                                     error='dependency failed: image_1')
+            jobs['audio'] = side_jobs['audio'][0]
+            for name, future in side_futures.items():
+                job_results[name] = DAGExecutor._collect(future, name, side_jobs[name][1])
+        finally:
+            side.shutdown()
+        print(f"   ⏱️  Finished in {time.time() - started:.1f}s")
+        self._collect_brief_results(jobs, job_results, results)
+
+    def _collect_brief_results(self, jobs, job_results, results):
+        """Fill campaign results from job results, reporting in index order"""
+        print("\n📸 Campaign visuals:")
+        image_jobs = [name for name, job in jobs.items() if job['kind'] == 'image']
+        for name in image_jobs:
+            job, result = jobs[name], job_results[name]
+            if result.ok:
+                results['images'].append({
+                    'url': result.output,
+                    'model': self._model_ref(job['model']),
+                    'prompt': job['prompt'],
+                    'index': job['index']
+                })
+                print(f"   Asset {job['index']}/{len(image_jobs)}: ✅")
+            else:
+                print(f"   Asset {job['index']}/{len(image_jobs)}: ❌ ({str(result.error)[:30]}...)")
+
+        if 'video' in jobs:
+            result = job_results['video']
+            if result.ok:
+                results['video'] = result.output
+                results['video_model'] = self._model_ref(jobs['video']['model'])
+                print("\n🎥 ✅ Video generated!")
+            elif result.status == 'skipped':
+                print("\n🎥 ⚠️ No images to animate, skipping video")
+            else:
+                print(f"\n🎥 ❌ Video failed: {result.error}")
+
+        result = job_results['audio']
+        if result.ok:
+            results['audio'] = result.output
+            results['audio_model'] = self._model_ref(jobs['audio']['model'])
+            print("\n🎵 ✅ Audio generated!")
+        else:
+            print(f"\n🎵 ❌ Audio failed: {result.error}")
+
+    def _resolve_model(self, model: str):
+        """Return (model key, Replicate ref) for a model key or slug"""
+        if model in self.models:
+            return model, self.models[model]
+        for key, ref in self.models.items():
+            if ref == model or ref.split(':')[0] == model:
+                return key, model
+        return model, model
+
+    def _model_ref(self, model: str) -> str:
+        """Replicate ref without version, as recorded in the catalog"""
+        return self._resolve_model(model)[1].split(':')[0]
+
+    def _run_job(self, job_name: str, job: dict, on_created=None):
+        """
+        Run a single schema job and return its output URL.
+        on_created(prediction_id) fires once the prediction exists.
+        """
+        key, model = self._resolve_model(job['model'])
+        with self.tracer.span('job', job=job_name, kind=job.get('kind', 'image'),
+                              model=self._model_ref(model)) as span:
+            cached = self._cached(model, job)
+            span.set(cache='hit' if cached else 'miss')
+            if cached:
+                return cached
+
+            done = self._count_prediction(key)
+            try:
+                if self.engine:
+                    with self.tracer.span('replicate.run'):
+                        output = self.governor.call(key, self.engine.run, model,
+                                                    self._api_input(job['input']),
+                                                    on_created=on_created)
+                else:
+                    output = self.governor.call(key, self._predict, model,
+                                                self._api_input(job['input']), on_created)
+            except Exception as e:
+                done(e)
+                raise
+            done()
+            return self._finish_output(model, job, output)
+
+    def _submit_job(self, job_name: str, job: dict, on_created=None):
+        """Submit a schema job to the prediction engine without blocking"""
+        key, model = self._resolve_model(job['model'])
+        # Ends on whichever thread completes the future, so it's never made current
+        span = self.tracer.span('job', job=job_name, kind=job.get('kind', 'image'),
+                                model=self._model_ref(model))
+        cached = self._cached(model, job)
+        span.set(cache='hit' if cached else 'miss')
+        if cached:
+            future = Future()
+            future.set_result(cached)
+            span.finish()
+            return future
+
+        def finish(output):
+            with activate(span):
+                return self._finish_output(model, job, output)
+
+        call = self.tracer.span('replicate.run', parent=span)
+        counted = self._count_prediction(key)
+        submitted = self.governor.submit(key, lambda: self.engine.submit(
+            model, self._api_input(job['input']), on_created=on_created))
+
+        def predicted(done: Future):
+            call.finish(self._error(done))
+            counted(self._error(done))
+
+        submitted.add_done_callback(predicted)
+        # Saving streams the body to disk: keep it off the engine's loop
+        future = self._then(submitted, finish, self._io_pool() if job.get('save_as') else None)
+        future.add_done_callback(lambda done: span.finish(self._error(done)))
+        return future
+
+    def _count_prediction(self, key: str):
+        """Count a prediction as submitted; returns done(error=None) to call as it ends"""
+        self._submitted.inc(model=key)
+        self._in_flight.inc(model=key)
+        started = time.perf_counter()
+
+        def done(error=None):
+            self._in_flight.dec(model=key)
+            if error is None:
+                self._succeeded.inc(model=key)
+                self._latency.observe(time.perf_counter() - started, model=key)
+            else:
+                self._failed.inc(model=key)
+        return done
+
+    def _predict(self, model: str, input_params: dict, on_created=None):
+        """
+        Blocking prediction like client.run, except the prediction ID is
+        reported as soon as it exists (so a resumed campaign can re-poll it)
+        """
+        owner, name, version = ModelVersionIdentifier.parse(model)
+        with self.tracer.span('replicate.create'):
+            if version:
+                prediction = self.client.predictions.create(version=version, input=input_params)
+            else:
+                prediction = self.client.models.predictions.create(model=(owner, name),
+                                                                   input=input_params)
+        if on_created:
+            on_created(prediction.id)
+        return self._wait_output(prediction)
+
+    def _wait_output(self, prediction):
+        """Wait for a prediction to finish and return its output"""
+        with self.tracer.span('replicate.wait', prediction=prediction.id) as span:
+            if prediction.status not in ('succeeded', 'failed', 'canceled'):
+                prediction.wait()
+            if self.tracer.enabled:
+                self._trace_prediction(prediction, span)
+            if prediction.status != 'succeeded':
+                raise ModelError(prediction)
+        return transform_output(prediction.output, self.client)
+
+    def _trace_prediction(self, prediction, span):
+        """
+        Split Replicate's side of a prediction from its own timestamps:
+        queue (including any cold boot) until started, then inference
+        """
+        created, started, completed = (parse_time(t) if t else None for t in (
+            prediction.created_at, prediction.started_at, prediction.completed_at))
+        metrics = prediction.metrics or {}
+        span.set(status=prediction.status, predict_time=metrics.get('predict_time'))
+        self.tracer.add('replicate.queue', created, started, parent=span)
+        self.tracer.add('replicate.predict', started, completed, parent=span,
+                        predict_time=metrics.get('predict_time'))
+
+    def _cached(self, model: str, job: dict):
+        """
+        Output URL of an identical earlier prediction. Its stored copy is
+        linked into the job's campaign file, and stands in for the URL as
+        a later job's input once the URL has expired.
+        """
+        if not self.cache:
+            return None
+        entry = self.cache.get(model, job['input'])
+        self._cache_lookups.inc(model=self._resolve_model(model)[0],
+                                result='hit' if entry else 'miss')
+        if not entry:
+            return None
+        url, local = self._output_url(entry.output), self._output_url(entry.local_output())
+        if local != url:
+            if job.get('save_as') and self.downloader:
+                save_as = Path(job['save_as'])
+                self.downloader.fetch(local, save_as.with_name(
+                    asset_filename(save_as.name, url, job.get('kind', 'image'))))
+            if self.cache.urls_expired(entry):
+                with self._io_lock:
+                    self._local_copies[url] = local
+                    while len(self._local_copies) > 1024:
+                        del self._local_copies[next(iter(self._local_copies))]
+        return url
+
+    def _finish_output(self, model: str, job: dict, output):
+        """
+        Save a fresh output to the job's campaign file (the one and only
+        fetch of its bytes), record it in the cache, and return its URL
+        """
+        files = {}
+        primary = self._primary_output(output)
+        if primary is not None and job.get('save_as') and self.downloader:
+            save_as = Path(job['save_as'])
+            self._check_abandoned(save_as.parent)
+            dest = save_as.with_name(asset_filename(save_as.name, primary, job.get('kind', 'image')))
+            with self.tracer.span('output.fetch') as span:
+                download = self.downloader.fetch(primary, dest)
+                span.set(bytes=download.size, source=download.source)
+            self._count_downloads([download])
+            if download.ok:
+                files[str(primary)] = download.path
+        if output and self.cache:
+            self.cache.put(model, job['input'], output, files=files)
+        return self._output_url(output)
+
+    def _with_target(self, name: str, job: dict, results: dict) -> dict:
+        """Point a job at its file in the campaign directory"""
+        if not self.downloader:
+            return job
+        stem = name if job.get('kind', 'image') == 'image' else job['kind']
+        return {**job, 'save_as': str(self._campaign_dir(results) / stem)}
+
+    def _open_journal(self, results: dict, plan: dict) -> CampaignJournal:
+        """Start the campaign's journal with what resume_campaign needs to rebuild it"""
+        journal = self._journal(self._campaign_dir(results))
+        journal.record('started', campaign={k: v for k, v in results.items() if k != 'images'},
+                       plan=plan)
+        return journal
+
+    def _journal(self, campaign_dir: Path) -> CampaignJournal:
+        self._check_abandoned(campaign_dir)
+        journal = CampaignJournal(campaign_dir)
+        with self._io_lock:
+            self._journals[str(campaign_dir)] = journal
+        return journal
+
+    def _journaled(self, journal: CampaignJournal, run):
+        """
+        Wrap _run_job/_submit_job so every job's outcome is journaled as it
+        completes, with the fingerprint it was built from
+        """
+        if journal is None:
+            return run
+
+        def record(name, job, fingerprint, output=None, error=None):
+            journal.record('job', name=name, kind=job.get('kind'), model=job.get('model'),
+                           status='succeeded' if output else 'failed', output=output,
+                           error=error, fingerprint=fingerprint, job=job)
+
+        def done(name, job, fingerprint, future):
+            error = self._error(future)
+            record(name, job, fingerprint, None if error else future.result(),
+                   error and str(error))
+
+        def wrapped(name, job):
+            self._check_abandoned(journal.campaign_dir)
+            fingerprint = job_fingerprint(job, journal.fingerprints,
+                                          self._resolve_model(job['model'])[1])
+            journal.fingerprints[name] = fingerprint
+
+            def created(prediction_id):
+                journal.record('submitted', name=name, prediction_id=prediction_id,
+                               fingerprint=fingerprint, job=job)
+            try:
+                output = run(name, job, on_created=created)
+            except Exception as e:
+                record(name, job, fingerprint, error=str(e))
+                raise
+            if isinstance(output, Future):
+                output.add_done_callback(lambda future: done(name, job, fingerprint, future))
+            else:
+                record(name, job, fingerprint, output)
+            return output
+        return wrapped
+
+    def _campaign_dir(self, results: dict) -> Path:
+        if results.get('campaign_id'):
+            return self.output_dir / results['campaign_id']
+        if 'mode' in results:
+            return self.output_dir / f"{results['mode']}_{results['product']}_{results['timestamp']}"
+        return self.output_dir / f"{results['brief_type']}_{results['timestamp']}"
+
+    def _export_trace(self, root, results: dict):
+        """Write a finished campaign's spans to its directory and print the waterfall"""
+        if not self.tracer.enabled or root.parent_id:
+            return
+        campaign_dir = self._campaign_dir(results)
+        path = self.tracer.export(root.trace_id, campaign_dir / TRACE_FILE,
+                                  campaign=campaign_dir.name)
+        if path:
+            print(f"\n🧭 Trace: {path}")
+            print(waterfall(load_trace(path)))
+
+    def _discard_trace(self, root):
+        """Drop a campaign's spans if _export_trace didn't take them (it raised)"""
+        if root is not None and self.tracer.enabled and not root.parent_id:
+            self.tracer.discard(root.trace_id)
+
+    def _io_pool(self) -> ThreadPoolExecutor:
+        with self._io_lock:
+            if self._io is None:
+                self._io = ThreadPoolExecutor(max_workers=self.max_workers,
+                                              thread_name_prefix='asset-save')
+            return self._io
+
+    @staticmethod
+    def _then(future: Future, fn, pool: ThreadPoolExecutor = None) -> Future:
+        """Future of fn(future.result()), run on pool when given"""
+        outer = Future()
+
+        def run(result):
+            try:
+                outer.set_result(fn(result))
+            except Exception as e:
+                outer.set_exception(e)
+
+        def done(inner: Future):
+            if inner.cancelled():
+                outer.cancel()
+                return
+            error = inner.exception()
+            if error is not None:
+                outer.set_exception(error)
+            elif pool:
+                pool.submit(run, inner.result())
+            else:
+                run(inner.result())
+
+        future.add_done_callback(done)
+        return outer
+
+    @staticmethod
+    def _error(future: Future):
+        """A finished future's exception, with cancellation as CancelledError"""
+        return CancelledError() if future.cancelled() else future.exception()
+
+    def _api_input(self, input_params: dict) -> dict:
+        """
+        Upload local files in place of inputs, e.g. the stored copy of a
+        cached hero image whose URL has expired, fed to SVD
+        """
+        api_input = {}
+        for k, v in input_params.items():
+            if isinstance(v, str):
+                with self._io_lock:
+                    v = self._local_copies.get(v, v)
+                if os.path.isabs(v) and os.path.isfile(v):
+                    v = Path(v)
+            api_input[k] = v
+        return api_input
+
+    @staticmethod
+    def _primary_output(output):
+        """The asset a campaign keeps from list/dict model outputs"""
+        if not output:
+            return None
+        if isinstance(output, list):
+            output = output[0]
+        elif isinstance(output, dict):
+            output = output.get('audio') or next(iter(output.values()), None)
+        return output or None
+
+    @classmethod
+    def _output_url(cls, output):
+        """Normalize list/dict/FileOutput model outputs to a URL string"""
+        output = cls._primary_output(output)
+        if hasattr(output, 'url'):
+            output = output.url
+        return str(output) if output else None
+
+    def _download_assets(self, results, campaign_dir, journal=None):
+        """Fetch every asset into campaign_dir, recording local file names"""
+        if not self.downloader:
+            return
+        started = time.time()
+        with self.tracer.span('download') as span:
+            downloads = self.downloader.download_campaign(results, campaign_dir)
+            span.set(files=len(downloads))
+        self._count_downloads(downloads)
+        if not downloads:
+            return
+        fetched = [d for d in downloads if d.ok]
+        size_mb = sum(d.size for d in fetched) / 1024 ** 2
+        print(f"\n⬇️  Downloaded {len(fetched)}/{len(downloads)} assets "
+              f"({size_mb:.1f} MB) in {time.time() - started:.1f}s")
+        for download in downloads:
+            if not download.ok:
+                print(f"   ❌ {Path(download.path).name}: {download.error[:60]}")
+            elif journal:
+                journal.record('downloaded', path=Path(download.path).name, size=download.size,
+                               source=download.source)
+        if self.store:
+            for download in fetched:
+                self.store.ingest(Path(download.path))
+
+    def _count_downloads(self, downloads):
+        for download in downloads:
+            if download.skipped:
+                continue
+            self._downloads.inc(status='ok' if download.ok else 'failed')
+            if download.ok:
+                self._downloaded.inc(download.size)
+
+    def _index_campaign(self, campaign_dir, metadata):
+        """Record the campaign in the catalog (one transaction)"""
+        if not self.catalog:
+            return
+        try:
+            with self.tracer.span('catalog'):
+                self.catalog.record_campaign(campaign_dir, metadata)
+        except Exception as e:
+            print(f"   ⚠️ Catalog update failed: {e}")
+
+    def _print_connection_stats(self):
+        stats = self.client.connection_stats()
+        if stats['requests']:
+            print(f"🔌 HTTP: {stats['requests']} requests over {stats['connections']} "
+                  f"connections ({stats['reuse_ratio']:.0%} reused)")
+
+    @staticmethod
+    def _print_enhancement_stats(enhancer):
+        wins = ', '.join(f"{path} {n}" for path, n in enhancer.stats.items() if n)
+        print(f"   ✨ Enhancement: {wins}")
+
+    def _report_job(self, result):
+        """Print a job's outcome as it completes"""
+        if result.ok:
+            print(f"   {result.name}: ✅ ({result.duration:.1f}s)")
+        elif result.status == 'skipped':
+            print(f"   {result.name}: ⏭️  skipped ({result.error})")
+        else:
+            print(f"   {result.name}: ❌ ({str(result.error)[:30]}...)")
+
+    def _save_mode_campaign(self, results, mode, journal):
+        """Save mode-based campaign assets; returns the metadata written"""
+        campaign_dir = self._campaign_dir(results)
+        self._check_abandoned(campaign_dir)
         campaign_dir.mkdir(exist_ok=True)
+        self._download_assets(results, campaign_dir, journal)
 
         # Enhanced metadata with mode information
         metadata = {
@@ -461,23 +1342,25 @@ class CreativeDirector:
             }
         }
 
-        metadata_path = campaign_dir / 'campaign_metadata.json'
-        with open(metadata_path, 'w') as f:
-            json.dump(metadata, f, indent=2)
+        with self.tracer.span('metadata'):
+            metadata_path = journal.snapshot(metadata)
+            journal.close()
+        self._index_campaign(campaign_dir, metadata)
 
         print(f"\n✨ MODE CAMPAIGN CREATED ✨")
         print(f"📁 Location: {campaign_dir}")
         print(f"🎨 Mode: {mode.config.name}")
         print(f"💾 Metadata: {metadata_path}")
+        self._print_connection_stats()
+        return metadata
 
-    def _save_campaign(self, results, brief):
-        """Save campaign assets and metadata"""
+    def _save_campaign(self, results, brief, journal):
+        """Save campaign assets and metadata; returns the metadata written"""
 
-        campaign_dir = self.output_dir / f"{results['brief_type']}_{results['timestamp']}"
+        campaign_dir = self._campaign_dir(results)
+        self._check_abandoned(campaign_dir)
         campaign_dir.mkdir(exist_ok=True)
-
-        # Save metadata
-        metadata_path = campaign_dir / 'campaign_metadata.json'
+        self._download_assets(results, campaign_dir, journal)
 
         # Convert to serializable format
         serializable_results = {
@@ -489,16 +1372,25 @@ class CreativeDirector:
             'images': [
                 {
                     'url': str(img['url']),
+                    'model': img.get('model'),
                     'prompt': img['prompt'],
-                    'index': img['index']
+                    'index': img['index'],
+                    'local_path': img.get('local_path')
                 } for img in results['images']
             ],
             'video': str(results['video']) if results.get('video') else None,
-            'audio': str(results['audio']) if results['audio'] else None
+            'audio': str(results['audio']) if results['audio'] else None,
+            'video_path': results.get('video_path'),
+            'audio_path': results.get('audio_path'),
+            'video_model': results.get('video_model'),
+            'audio_model': results.get('audio_model')
         }
 
-        with open(metadata_path, 'w') as f:
-            json.dump(serializable_results, f, indent=2)
+        # Atomic: a crash leaves the previous file or the new one, never half
+        with self.tracer.span('metadata'):
+            metadata_path = journal.snapshot(serializable_results)
+            journal.close()
+        self._index_campaign(campaign_dir, serializable_results)
 
         # Display results
         print(f"\n✨ CAMPAIGN CREATED ✨")
@@ -516,6 +1408,8 @@ class CreativeDirector:
             print(f"\n🎵 Audio: {results['audio']}")
 
         print(f"\n💾 Metadata: {metadata_path}")
+        self._print_connection_stats()
+        return serializable_results
 
     def list_briefs(self):
         """List available creative briefs"""
@@ -540,6 +1434,27 @@ class CreativeDirector:
 
 def main():
     """Interactive creative director interface"""
+    parser = argparse.ArgumentParser(description="Creative production pipeline "
+                                                 "(interactive when run without options)")
+    parser.add_argument('--resume', metavar='CAMPAIGN_ID',
+                        help="Finish a campaign that stopped part-way")
+    parser.add_argument('--rebuild', metavar='CAMPAIGN_ID',
+                        help="Regenerate only the jobs whose inputs changed")
+    parser.add_argument('--dry-run', action='store_true', help="With --rebuild: only list them")
+    parser.add_argument('--trace', action='store_true',
+                        help="Record per-stage spans to <campaign>/trace.json")
+    args = parser.parse_args()
+    tracer = Tracer() if args.trace else None
+    try:
+        if args.resume:
+            CreativeDirector(tracer=tracer).resume_campaign(args.resume)
+            return
+        if args.rebuild:
+            CreativeDirector(tracer=tracer).rebuild_campaign(args.rebuild, dry_run=args.dry_run)
+            return
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
 
     print("""
     🎨 CREATIVE PRODUCTION PIPELINE
@@ -547,7 +1462,7 @@ def main():
     Studio-Inspired Creative Modes
     """)
 
-    director = CreativeDirector()
+    director = CreativeDirector(tracer=tracer)
 
     # Ask user to choose system
     print("\nSelect generation system:")
@@ -5,17 +5,67 @@ Using Claude API or Replicate-hosted LLMs
 """
 
 import os
+import re
 import json
-from typing import Dict, List, Optional
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from enhancement_cache import EnhancementCache, shared_cache
+from http_client import PooledClient, shared_client
+from rate_limiter import is_rate_limited, retry_after
+
+LLM_WORKERS = 8
+
+_llm_pool: Optional[ThreadPoolExecutor] = None
+_llm_pool_lock = threading.Lock()
+
+# One slot per worker, held until the call finishes (late or not), so a
+# budgeted call never queues behind calls that already overran theirs
+_llm_slots = threading.BoundedSemaphore(LLM_WORKERS)
+
+_END = object()
+
+
+def _llm_executor() -> ThreadPoolExecutor:
+    """Shared pool for budgeted LLM calls; late calls finish here unobserved"""
+    global _llm_pool
+    with _llm_pool_lock:
+        if _llm_pool is None:
+            _llm_pool = ThreadPoolExecutor(max_workers=LLM_WORKERS,
+                                           thread_name_prefix='llm-race')
+        return _llm_pool
+
 
 class CreativeEnhancer:
     """
     Enhance prompts and generate landing pages using LLMs
     """
 
-    def __init__(self, use_claude: bool = False):
+    def __init__(self, use_claude: bool = False, engine=None, governor=None,
+                 cache: EnhancementCache = None, temperature: float = 0.8,
+                 latency_budget: Optional[float] = None, client: PooledClient = None):
         self.use_claude = use_claude
 
+        # Shared keep-alive client (see http_client)
+        self.client = client or shared_client()
+
+        # Optional PredictionEngine and RateGovernor shared with the director
+        self.engine = engine
+        self.governor = governor
+
+        # Enhancements are memoized per (prompt, style, model, temperature)
+        # across instances (cache=False to always ask the LLM)
+        self.cache = shared_cache() if cache is None else cache
+        self.temperature = temperature
+
+        # Seconds to wait for the LLM before answering with the local
+        # rule-based enhancement; late LLM answers still land in the cache
+        self.latency_budget = latency_budget
+        self.stats = {'cache': 0, 'llm': 0, 'local': 0, 'fallback': 0, 'late': 0}
+        self._stats_lock = threading.Lock()  # Late calls count from pool threads
+
         # Replicate-hosted LLMs (fallback when no Claude API)
         self.llm_models = {
             'llama3': 'meta/meta-llama-3-70b-instruct',
@@ -44,6 +94,10 @@ class CreativeEnhancer:
         """
         Enhance a prompt using Claude or Replicate LLMs
         """
+        cached = self._cached(original_prompt, style)
+        if cached:
+            self._count('cache')
+            return cached
 
         enhancement_prompt = f"""
         Enhance this creative prompt for AI image generation.
@@ -56,39 +110,347 @@ class CreativeEnhancer:
 
         if self.use_claude:
             # Direct Claude API call (user has Claude configured)
-            return self._enhance_with_claude(enhancement_prompt)
+            enhanced, fell_back = self._enhance_with_claude(enhancement_prompt)
+            if fell_back:
+                # Fallbacks are cheap, so they are never cached
+                self._count('fallback')
+                return self._rule_based_enhancement(original_prompt)
         else:
-            # Use Replicate-hosted LLM
-            return self._enhance_with_replicate_llm(enhancement_prompt)
+            # Use Replicate-hosted LLM, within the latency budget
+            try:
+                enhanced = self._complete_within_budget(
+                    enhancement_prompt, 200,
+                    lambda text: self._store(original_prompt, style, text))
+                if enhanced is None:
+                    self._count('local')
+            except Exception:
+                enhanced = None
+                self._count('fallback')
+            if not enhanced:
+                # Fallbacks are cheap, so they are never cached
+                return self._rule_based_enhancement(original_prompt)
+
+        if enhanced:
+            self._count('llm')
+            self._store(original_prompt, style, enhanced)
+        return enhanced
+
+    def enhance_prompts(self, prompts: List[str], style: str = 'cinematic') -> List[str]:
+        """
+        Enhance many prompts with a single LLM request.
 
-    def _enhance_with_claude(self, prompt: str) -> str:
-        """Use Claude API directly (requires ANTHROPIC_API_KEY)"""
+        Cached prompts are answered locally; the rest are sent as one
+        numbered list and the numbered reply is split back apart. Any
+        prompt missing from the reply is enhanced on its own.
+        """
+        enhanced = [self._cached(p, style) for p in prompts]
+        missing = [i for i, e in enumerate(enhanced) if not e]
+        self._count('cache', len(prompts) - len(missing))
+        if not missing:
+            return enhanced
+        if self.use_claude or len(missing) == 1:
+            for i in missing:
+                enhanced[i] = self.enhance_prompt(prompts[i], style)
+            return enhanced
+
+        batch_prompt = self._batch_prompt([prompts[i] for i in missing], style)
+
+        def store_all(text: str):
+            replies = self._split_numbered(text)
+            for n, i in enumerate(missing, 1):
+                if replies.get(n):
+                    self._store(prompts[i], style, replies[n])
+
+        try:
+            text = self._complete_within_budget(batch_prompt, 200 * len(missing), store_all)
+            timed_out = text is None
+        except Exception:
+            text, timed_out = None, False
+            self._count('fallback')
+        if timed_out:
+            # Out of budget: answer everything locally right now
+            self._count('local', len(missing))
+            for i in missing:
+                enhanced[i] = self._rule_based_enhancement(prompts[i])
+            return enhanced
+
+        replies = self._split_numbered(text) if text else {}
+        for n, i in enumerate(missing, 1):
+            if replies.get(n):
+                enhanced[i] = replies[n]
+                self._count('llm')
+                self._store(prompts[i], style, replies[n])
+            else:
+                enhanced[i] = self.enhance_prompt(prompts[i], style)
+        return enhanced
+
+    def stream_enhanced(self, prompts: List[str],
+                        style: str = 'cinematic') -> Iterator[Tuple[int, str]]:
+        """
+        Yield (position, enhanced prompt) as soon as each one is ready.
+
+        Cached prompts come first; the rest share one streamed LLM request
+        and each numbered line is yielded the moment its newline arrives.
+        Anything the stream doesn't deliver is enhanced on its own, or
+        locally once latency_budget has run out (later lines are cached).
+        """
+        missing = []
+        for i, prompt in enumerate(prompts):
+            cached = self._cached(prompt, style)
+            if cached:
+                self._count('cache')
+                yield i, cached
+            else:
+                missing.append(i)
+        if not missing:
+            return
+
+        def store_late(n: int, text: str):
+            if 1 <= n <= len(missing):
+                self._store(prompts[missing[n - 1]], style, text)
+
+        done = set()
+        deadline = (None if self.latency_budget is None
+                    else time.monotonic() + self.latency_budget)
+        if not self.use_claude and len(missing) > 1:
+            try:
+                for n, text in self._stream_within_budget(
+                        self._batch_prompt([prompts[i] for i in missing], style),
+                        200 * len(missing), deadline, store_late):
+                    if 1 <= n <= len(missing) and missing[n - 1] not in done:
+                        i = missing[n - 1]
+                        done.add(i)
+                        self._count('llm')
+                        self._store(prompts[i], style, text)
+                        yield i, text
+            except Exception:
+                self._count('fallback')
+
+        for i in missing:
+            if i in done:
+                continue
+            if deadline is not None and time.monotonic() >= deadline:
+                self._count('local')
+                yield i, self._rule_based_enhancement(prompts[i])
+            else:
+                yield i, self.enhance_prompt(prompts[i], style)
+
+    def _stream_within_budget(self, prompt: str, max_new_tokens: int,
+                              deadline: Optional[float],
+                              on_late: Callable[[int, str], None]) -> Iterator[Tuple[int, str]]:
+        """
+        _stream_numbered, cut off at deadline (time.monotonic()).
+
+        The stream runs on the shared LLM pool; lines arriving after the
+        deadline go to on_late from there. Yields nothing while every
+        worker is busy with late calls. Without a deadline this is a plain
+        _stream_numbered.
+        """
+        if deadline is None:
+            yield from self._stream_numbered(prompt, max_new_tokens)
+            return
+        if not _llm_slots.acquire(blocking=False):
+            return
+
+        lines: queue.Queue = queue.Queue()
+        lock = threading.Lock()  # Guards cut_off, so no line is both queued and late
+        cut_off = False
+
+        def drain():
+            try:
+                for n, text in self._stream_numbered(prompt, max_new_tokens):
+                    with lock:
+                        if not cut_off:
+                            lines.put((n, text))
+                            continue
+                    self._count('late')
+                    on_late(n, text)
+            except Exception as e:
+                lines.put(e)
+            finally:
+                lines.put(_END)
+
+        try:
+            future = _llm_executor().submit(drain)
+        except BaseException:
+            _llm_slots.release()
+            raise
+        future.add_done_callback(lambda f: _llm_slots.release())
+        try:
+            while True:
+                try:
+                    item = lines.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    return
+                if item is _END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            with lock:
+                cut_off = True
+            # Lines queued but never consumed still reach the cache
+            while True:
+                try:
+                    item = lines.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, tuple):
+                    self._count('late')
+                    on_late(*item)
+
+    def _stream_numbered(self, prompt: str, max_new_tokens: int) -> Iterator[Tuple[int, str]]:
+        """
+        Stream an LLM reply, yielding each complete '1. ...' line. Under a
+        governor a 429 before the first line backs off and retries, as
+        RateGovernor.call does.
+        """
+        model = self.llm_models['llama3']
+        retries = self.governor.max_retries if self.governor else 0
+        for attempt in range(retries + 1):
+            if self.governor:
+                self.governor.acquire(model)
+            started = False
+            try:
+                buffer = ''
+                for event in self.client.stream(model, input={
+                        "prompt": prompt,
+                        "max_new_tokens": max_new_tokens,
+                        "temperature": self.temperature}):
+                    buffer += str(event)
+                    *lines, buffer = buffer.split('\n')
+                    for line in lines:
+                        for reply in self._split_numbered(line).items():
+                            started = True
+                            yield reply
+                yield from self._split_numbered(buffer).items()
+            except Exception as e:
+                if started or attempt == retries or not is_rate_limited(e):
+                    raise
+                self.governor.throttle(model, retry_after(e, attempt))
+                continue
+            finally:
+                if self.governor:
+                    self.governor.release(model)
+            if self.governor:
+                self.governor.recover(model)
+            return
+
+    @staticmethod
+    def _batch_prompt(prompts: List[str], style: str) -> str:
+        numbered = '\n'.join(f"{n}. {p}" for n, p in enumerate(prompts, 1))
+        return f"""
+        Enhance each of these creative prompts for AI image generation.
+        Style: {style}
+
+        {numbered}
+
+        Add rich visual details, lighting, composition, and atmosphere.
+        Keep each under 150 words. Return exactly {len(prompts)} lines,
+        numbered to match, one enhanced prompt per line and nothing else.
+        """
+
+    def _complete_within_budget(self, prompt: str, max_new_tokens: int,
+                                on_late: Callable[[str], None]) -> Optional[str]:
+        """
+        Race the LLM against latency_budget.
+
+        Returns the completion, or None once the budget runs out; the call
+        keeps running and hands its text to on_late when it arrives. Also
+        None, without calling the LLM, while every worker is still busy
+        with late calls. Without a budget this is a plain blocking completion.
+        """
+        if self.latency_budget is None:
+            return self._complete(prompt, max_new_tokens)
+
+        if not _llm_slots.acquire(blocking=False):
+            return None
+        try:
+            future = _llm_executor().submit(self._complete, prompt, max_new_tokens)
+        except BaseException:
+            _llm_slots.release()
+            raise
+        future.add_done_callback(lambda f: _llm_slots.release())
+        try:
+            return future.result(timeout=self.latency_budget)
+        except FutureTimeout:
+            future.add_done_callback(lambda f: self._late(f, on_late))
+            return None
+
+    def _late(self, future: Future, on_late: Callable[[str], None]):
+        if future.exception() is None:
+            self._count('late')
+            on_late(future.result())
+
+    def _count(self, path: str, n: int = 1):
+        with self._stats_lock:
+            self.stats[path] += n
+
+    @staticmethod
+    def _split_numbered(text: str) -> Dict[int, str]:
+        """Parse '1. ...' / '2) ...' lines from an LLM reply"""
+        replies = {}
+        for line in text.splitlines():
+            match = re.match(r'\s*(\d+)\s*[.):-]\s*(.*\S)', line)
+            if match:
+                replies.setdefault(int(match.group(1)), match.group(2).strip())
+        return replies
+
+    def _llm_name(self) -> str:
+        return 'claude' if self.use_claude else self.llm_models['llama3']
+
+    def _cached(self, prompt: str, style: str) -> Optional[str]:
+        if not self.cache:
+            return None
+        return self.cache.get(prompt, style, self._llm_name(), self.temperature)
+
+    def _store(self, prompt: str, style: str, enhanced: str):
+        if self.cache:
+            self.cache.put(prompt, style, self._llm_name(), self.temperature, enhanced)
+
+    def _enhance_with_claude(self, prompt: str) -> Tuple[str, bool]:
+        """Use Claude API directly (requires ANTHROPIC_API_KEY); returns (text, fell back)"""
         try:
             # This would use the actual Claude API
             # For now, return a placeholder
-            return f"[Enhanced via Claude]: {prompt}"
+            return f"[Enhanced via Claude]: {prompt}", False
         except:
             return self._enhance_with_replicate_llm(prompt)
 
-    def _enhance_with_replicate_llm(self, prompt: str) -> str:
-        """Use Replicate-hosted LLM for enhancement"""
-        import replicate
-
+    def _run(self, model: str, input: Dict):
+        """Run a Replicate model, through the prediction engine if one is set"""
+        if self.engine:
+            call, args, kwargs = self.engine.run, (model, input), {}
+        else:
+            call, args, kwargs = self.client.run, (model,), {'input': input}
+
+        if self.governor:
+            return self.governor.call(model, call, *args, **kwargs)
+        return call(*args, **kwargs)
+
+    def _complete(self, prompt: str, max_new_tokens: int) -> str:
+        """One Replicate LLM completion; raises on failure or empty output"""
+        output = self._run(
+            self.llm_models['llama3'],
+            {
+                "prompt": prompt,
+                "max_new_tokens": max_new_tokens,
+                "temperature": self.temperature
+            }
+        )
+        text = (''.join(output) if isinstance(output, list) else str(output or '')).strip()
+        if not text:
+            raise ValueError("LLM returned no output")
+        return text
+
+    def _enhance_with_replicate_llm(self, prompt: str) -> Tuple[str, bool]:
+        """Use Replicate-hosted LLM for enhancement; returns (text, fell back)"""
         try:
-            output = replicate.run(
-                self.llm_models['llama3'],
-                input={
-                    "prompt": prompt,
-                    "max_new_tokens": 200,
-                    "temperature": 0.8
-                }
-            )
-
-            if output:
-                return ''.join(output) if isinstance(output, list) else str(output)
+            return self._complete(prompt, 200), False
         except:
             # Fallback to rule-based enhancement
-            return self._rule_based_enhancement(prompt)
+            return self._rule_based_enhancement(prompt), True
 
     def _rule_based_enhancement(self, prompt: str) -> str:
         """Simple rule-based enhancement as fallback"""
@@ -144,7 +506,7 @@ class CreativeEnhancer:
         for img in data.get('images', []):
             images_html += f'''
             <div class="gallery-item">
-                <img src="{img.get('url', '')}" alt="{img.get('prompt', '')[:50]}">
+                <img src="{img.get('local_path') or img.get('url', '')}" alt="{img.get('prompt', '')[:50]}">
             </div>
             '''
 
@@ -153,7 +515,7 @@ class CreativeEnhancer:
             video_html = f'''
             <div class="video-container">
                 <video controls autoplay muted loop>
-                    <source src="{data['video']}" type="video/mp4">
+                    <source src="{data.get('video_path') or data['video']}" type="video/mp4">
                 </video>
             </div>
             '''
@@ -291,12 +653,10 @@ class CreativeEnhancer:
 
     def transcribe_audio(self, audio_url: str) -> str:
         """Transcribe audio using Whisper on Replicate"""
-        import replicate
-
         try:
-            output = replicate.run(
+            output = self._run(
                 self.audio_models['whisper'],
-                input={
+                {
                     "audio": audio_url,
                     "model": "large-v3",
                     "language": "en",
@@ -312,13 +672,11 @@ class CreativeEnhancer:
 
     def generate_voiceover(self, text: str, voice: str = "narrator") -> str:
         """Generate voiceover using Bark or ElevenLabs via Replicate"""
-        import replicate
-
         try:
             # Try Bark first (free)
-            output = replicate.run(
+            output = self._run(
                 self.audio_models['bark'],
-                input={
+                {
                     "prompt": text,
                     "voice_preset": voice,
                     "output_full": False
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Enhancement Cache - Memoized LLM prompt enhancements
+In-memory LRU in front of a SQLite tier, so enhancements survive across
+CreativeEnhancer instances and runs
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+
+def enhancement_key(prompt: str, style: str, model: str, temperature: float) -> str:
+    """SHA-256 over everything that changes the LLM's answer"""
+    canonical = json.dumps([prompt.strip(), style, model, float(temperature)])
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class EnhancementCache:
+    """
+    Two-tier cache of enhanced prompts:
+
+        memory  OrderedDict LRU, max_entries
+        disk    .prediction_cache/enhancements.db (None = memory only)
+    """
+
+    def __init__(self, path: Optional[str] = './.prediction_cache/enhancements.db',
+                 max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0}
+        self._memory: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            self._db.execute('''
+                CREATE TABLE IF NOT EXISTS enhancements (
+                    key TEXT PRIMARY KEY,
+                    prompt TEXT NOT NULL,
+                    style TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    temperature REAL NOT NULL,
+                    enhanced TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )''')
+            self._db.commit()
+
+    def get(self, prompt: str, style: str, model: str, temperature: float) -> Optional[str]:
+        key = enhancement_key(prompt, style, model, temperature)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats['hits'] += 1
+                return self._memory[key]
+            row = self._db.execute('SELECT enhanced FROM enhancements WHERE key = ?',
+                                   (key,)).fetchone() if self._db else None
+            if row:
+                self._remember(key, row[0])
+                self.stats['hits'] += 1
+                self.stats['disk_hits'] += 1
+                return row[0]
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, prompt: str, style: str, model: str, temperature: float, enhanced: str):
+        key = enhancement_key(prompt, style, model, temperature)
+        with self._lock:
+            self._remember(key, enhanced)
+            if self._db:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO enhancements '
+                    '(key, prompt, style, model, temperature, enhanced, created_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (key, prompt, style, model, float(temperature), enhanced, time.time()))
+                self._db.commit()
+            self.stats['stores'] += 1
+
+    def _remember(self, key: str, enhanced: str):
+        self._memory[key] = enhanced
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db:
+                self._db.execute('DELETE FROM enhancements')
+                self._db.commit()
+
+
+_shared: Optional[EnhancementCache] = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache() -> EnhancementCache:
+    """Process-wide cache used by every CreativeEnhancer by default"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = EnhancementCache()
+        return _shared
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+HTTP Client - One pooled, keep-alive Replicate client per process
+Director, enhancer, fast generator and engine share its API connection
+pool; output downloads get a second pool without the API token. Trace
+hooks count how often connections are reused
+"""
+
+import asyncio
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import httpx
+import replicate
+from replicate.__about__ import __version__ as replicate_version
+from replicate.client import _build_httpx_client
+
+
+@dataclass
+class HTTPConfig:
+    """Pool sizes and timeouts (seconds) for the shared client"""
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    connect_timeout: float = 5.0
+    read_timeout: float = 30.0
+    write_timeout: float = 30.0
+    pool_timeout: float = 10.0
+    http2: bool = False  # needs the h2 package
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(max_connections=self.max_connections,
+                            max_keepalive_connections=self.max_keepalive_connections,
+                            keepalive_expiry=self.keepalive_expiry)
+
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(self.read_timeout, connect=self.connect_timeout,
+                             read=self.read_timeout, write=self.write_timeout,
+                             pool=self.pool_timeout)
+
+
+class ConnectionStats:
+    """
+    Counts requests against new TCP connections and TLS handshakes, from
+    httpcore trace events. reuse_ratio near 1.0 means keep-alive works.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self.tls_handshakes = 0
+        self._lock = threading.Lock()
+
+    def request(self):
+        with self._lock:
+            self.requests += 1
+
+    def trace(self, event: str, info: dict):
+        if event == 'connection.connect_tcp.complete':
+            with self._lock:
+                self.connections += 1
+        elif event == 'connection.start_tls.complete':
+            with self._lock:
+                self.tls_handshakes += 1
+
+    async def atrace(self, event: str, info: dict):
+        self.trace(event, info)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            reused = max(0, self.requests - self.connections)
+            return {
+                'requests': self.requests,
+                'connections': self.connections,
+                'tls_handshakes': self.tls_handshakes,
+                'reuse_ratio': reused / self.requests if self.requests else 0.0,
+            }
+
+
+class _TracedTransport(httpx.BaseTransport):
+    def __init__(self, transport: httpx.BaseTransport, stats: ConnectionStats):
+        self.transport = transport
+        self.stats = stats
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self.stats.request()
+        request.extensions['trace'] = self.stats.trace
+        return self.transport.handle_request(request)
+
+    def close(self):
+        self.transport.close()
+
+
+class _AsyncTracedTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncBaseTransport, stats: ConnectionStats):
+        self.transport = transport
+        self.stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.stats.request()
+        request.extensions['trace'] = self.stats.atrace
+        return await self.transport.handle_async_request(request)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class PooledClient(replicate.Client):
+    """
+    replicate.Client with explicit pool limits and timeouts.
+
+    The sync pool is shared by every thread. Async pools are kept per
+    event loop, so several PredictionEngines can share one client.
+    Downloads of output and asset URLs go through `http`, a separate
+    pool that never sends the API token to CDN or third-party hosts.
+    """
+
+    def __init__(self, api_token: Optional[str] = None, *,
+                 base_url: Optional[str] = None, config: Optional[HTTPConfig] = None,
+                 **kwargs):
+        self.config = config or HTTPConfig()
+        super().__init__(api_token, base_url=base_url, timeout=self.config.timeout(),
+                         **kwargs)
+        self.connections = ConnectionStats()
+        self._sync: Optional[httpx.Client] = None
+        self._downloads: Optional[httpx.Client] = None
+        self._async: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+        self._build_lock = threading.Lock()
+
+    @property
+    def _client(self) -> httpx.Client:
+        if self._sync is None:
+            with self._build_lock:
+                if self._sync is None:
+                    transport = httpx.HTTPTransport(limits=self.config.limits(),
+                                                    http2=self.config.http2)
+                    self._sync = _build_httpx_client(
+                        httpx.Client, self._api_token, self._base_url, self._timeout,
+                        transport=_TracedTransport(transport, self.connections),
+                        **self._client_kwargs)
+        return self._sync
+
+    @property
+    def _async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._async.get(loop)
+        if client is None:
+            transport = httpx.AsyncHTTPTransport(limits=self.config.limits(),
+                                                 http2=self.config.http2)
+            client = self._async[loop] = _build_httpx_client(
+                httpx.AsyncClient, self._api_token, self._base_url, self._timeout,
+                transport=_AsyncTracedTransport(transport, self.connections),
+                **self._client_kwargs)
+        return client
+
+    @property
+    def http(self) -> httpx.Client:
+        """Pooled httpx client for plain downloads (no Authorization header)"""
+        if self._downloads is None:
+            with self._build_lock:
+                if self._downloads is None:
+                    transport = httpx.HTTPTransport(limits=self.config.limits(),
+                                                    http2=self.config.http2)
+                    self._downloads = httpx.Client(
+                        headers={'User-Agent': f"replicate-python/{replicate_version}"},
+                        timeout=self._timeout, follow_redirects=True,
+                        transport=_TracedTransport(transport, self.connections))
+        return self._downloads
+
+    def connection_stats(self) -> Dict[str, float]:
+        return self.connections.snapshot()
+
+    def close(self):
+        with self._build_lock:
+            for client in (self._sync, self._downloads):
+                if client is not None:
+                    client.close()
+            self._sync = self._downloads = None
+
+
+_shared: Optional[PooledClient] = None
+_shared_lock = threading.Lock()
+
+
+def shared_client() -> PooledClient:
+    """The process-wide client (created on first use)"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = PooledClient()
+        return _shared
+
+
+def configure(config: Optional[HTTPConfig] = None, **kwargs) -> PooledClient:
+    """Replace the process-wide client, e.g. configure(HTTPConfig(max_connections=200))"""
+    global _shared
+    with _shared_lock:
+        previous, _shared = _shared, PooledClient(config=config, **kwargs)
+    if previous:
+        previous.close()
+    return _shared
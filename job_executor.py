@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Job Executor - Dependency-aware concurrent execution of job schemas
+Independent jobs run in parallel; only dependents wait on their inputs
+"""
+
+import contextvars
+import hashlib
+import json
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+
+@dataclass
+class JobResult:
+    """Outcome of a single job in a schema"""
+    name: str
+    status: str  # succeeded, failed, skipped
+    output: Any = None
+    error: Optional[str] = None
+    started_at: float = 0.0
+    finished_at: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 'succeeded'
+
+    @property
+    def duration(self) -> float:
+        return max(0.0, self.finished_at - self.started_at)
+
+
+def job_dependencies(jobs: Dict[str, Dict[str, Any]]) -> Dict[str, List[str]]:
+    """Map each job to the jobs it waits on"""
+    graph = {}
+    for name, job in jobs.items():
+        deps = list(job.get('depends_on', []))
+        for source in job.get('input_from', {}).values():
+            if source not in deps:
+                deps.append(source)
+        graph[name] = deps
+    return graph
+
+
+def topological_order(jobs: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Order jobs so every job comes after its dependencies"""
+    graph = job_dependencies(jobs)
+    order, state = [], {}
+
+    def visit(name, path):
+        if state.get(name) == 'done':
+            return
+        if state.get(name) == 'visiting':
+            raise ValueError(f"Dependency cycle: {' -> '.join(path + [name])}")
+        state[name] = 'visiting'
+        for dep in graph.get(name, []):
+            if dep in graph:
+                visit(dep, path + [name])
+        state[name] = 'done'
+        order.append(name)
+
+    for name in jobs:
+        visit(name, [])
+    return order
+
+
+def job_fingerprint(job: Dict[str, Any], dep_fingerprints: Dict[str, str],
+                    model: Optional[str] = None) -> str:
+    """
+    Hash of everything that determines a job's output: its model ref and
+    input. Inputs piped from other jobs (input_from) hash as those jobs'
+    fingerprints, so a changed hero image changes the video animating it.
+    """
+    piped = job.get('input_from', {})
+    payload = {
+        'model': model or job['model'],
+        'input': {k: v for k, v in job.get('input', {}).items() if k not in piped},
+        'deps': {dep: dep_fingerprints.get(dep) for dep in job_dependencies({'': job})['']},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def fingerprint_jobs(jobs: Dict[str, Dict[str, Any]],
+                     resolve_model: Optional[Callable[[str], str]] = None) -> Dict[str, str]:
+    """Fingerprint every job in a schema (dependencies first)"""
+    fingerprints = {}
+    for name in topological_order(jobs):
+        job = jobs[name]
+        model = resolve_model(job['model']) if resolve_model else None
+        fingerprints[name] = job_fingerprint(job, fingerprints, model)
+    return fingerprints
+
+
+def stale_jobs(jobs: Dict[str, Dict[str, Any]], fingerprints: Dict[str, str],
+               built: Dict[str, str]) -> Dict[str, str]:
+    """
+    Jobs to regenerate, with the reason: no earlier output, a changed
+    fingerprint, or a dependency that is itself being regenerated
+    """
+    graph = job_dependencies(jobs)
+    stale = {}
+    for name in topological_order(jobs):
+        upstream = [dep for dep in graph[name] if dep in stale]
+        if upstream:
+            stale[name] = f"upstream: {', '.join(upstream)}"
+        elif name not in built:
+            stale[name] = 'new'
+        elif built[name] != fingerprints[name]:
+            stale[name] = 'changed'
+    return stale
+
+
+def resolve_inputs(job: Dict[str, Any], outputs: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill `input_from` fields with the outputs of finished dependencies"""
+    if not job.get('input_from'):
+        return job
+    resolved = {**job, 'input': dict(job['input'])}
+    for field, source in job['input_from'].items():
+        resolved['input'][field] = outputs[source]
+    return resolved
+
+
+class DAGExecutor:
+    """
+    Run a job schema as a dependency graph.
+
+    `run_job(name, job)` performs one job and returns its output; a falsy
+    output or an exception marks the job failed, and every job depending
+    on it is skipped.
+
+    Pass `submit_job(name, job) -> Future` instead to hand jobs to a
+    non-blocking backend (see prediction_engine); no worker threads are
+    used then and max_workers is ignored.
+    """
+
+    def __init__(self, run_job: Optional[Callable[[str, Dict[str, Any]], Any]] = None,
+                 max_workers: int = 4,
+                 on_complete: Optional[Callable[[JobResult], None]] = None,
+                 submit_job: Optional[Callable[[str, Dict[str, Any]], Future]] = None):
+        if not (run_job or submit_job):
+            raise ValueError("DAGExecutor needs run_job or submit_job")
+        self.run_job = run_job
+        self.submit_job = submit_job
+        self.max_workers = max_workers
+        self.on_complete = on_complete
+
+    def execute(self, jobs: Dict[str, Dict[str, Any]]) -> Dict[str, JobResult]:
+        """Execute all jobs, returning results keyed by job name"""
+        topological_order(jobs)  # Fail fast on cycles
+        graph = job_dependencies(jobs)
+        results: Dict[str, JobResult] = {}
+        pending = dict(jobs)
+        running = {}
+
+        pool = None if self.submit_job else ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while pending or running:
+                for name in list(pending):
+                    deps = graph[name]
+                    blocked = [d for d in deps if d not in jobs or
+                               (d in results and not results[d].ok)]
+                    if blocked:
+                        del pending[name]
+                        self._finish(results, JobResult(
+                            name, 'skipped',
+                            error=f"dependency failed: {', '.join(blocked)}"))
+                    elif all(d in results for d in deps):
+                        job = resolve_inputs(pending.pop(name),
+                                             {d: results[d].output for d in deps})
+                        running[self._start(pool, name, job)] = (name, time.time())
+
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, started = running.pop(future)
+                    self._finish(results, self._collect(future, name, started))
+        finally:
+            if pool:
+                pool.shutdown()
+
+        return results
+
+    def _start(self, pool, name: str, job: Dict[str, Any]) -> Future:
+        if pool:
+            # Carry the caller's context (e.g. the current trace span) into the worker
+            return pool.submit(contextvars.copy_context().run, self.run_job, name, job)
+        try:
+            return self.submit_job(name, job)
+        except Exception as e:
+            future = Future()
+            future.set_exception(e)
+            return future
+
+    @staticmethod
+    def _collect(future: Future, name: str, started: float) -> JobResult:
+        try:
+            output = future.result()
+        except Exception as e:
+            return JobResult(name, 'failed', error=str(e),
+                             started_at=started, finished_at=time.time())
+        status = 'succeeded' if output else 'failed'
+        return JobResult(name, status, output=output,
+                         error=None if output else 'no output',
+                         started_at=started, finished_at=time.time())
+
+    def _finish(self, results: Dict[str, JobResult], result: JobResult):
+        results[result.name] = result
+        if self.on_complete:
+            self.on_complete(result)
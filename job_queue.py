@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Job Queue - Durable SQLite queue of campaign jobs
+Enqueued specs survive restarts. Workers - on this host or others - claim
+jobs under time-bounded leases renewed by heartbeat; a job whose lease
+runs out is claimed again, and only the current lease holder can commit
+its result. Which job a claim gets is up to the Scheduler (priority
+class, per-client fair share, shortest expected job first)
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from batch_runner import CAMPAIGN_ID
+from scheduler import Scheduler, job_shape, priority_class, static_cost
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    seq INTEGER PRIMARY KEY,
+    id TEXT UNIQUE NOT NULL,         -- campaign id (output directory name)
+    spec TEXT NOT NULL,              -- create_campaign options as JSON
+    status TEXT NOT NULL,            -- queued, running, succeeded, partial, failed, cancelled
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_token TEXT,                -- fencing token of the current claim
+    lease_expires REAL,
+    client TEXT NOT NULL DEFAULT 'default',
+    priority INTEGER NOT NULL DEFAULT 1,  -- scheduler.PRIORITY_CLASSES
+    shape TEXT,                      -- cost bucket: quality/video
+    cost REAL,                       -- expected seconds
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, seq);
+
+-- Weighted service each client has received (expected seconds / weight)
+CREATE TABLE IF NOT EXISTS clients (
+    name TEXT PRIMARY KEY,
+    served REAL NOT NULL DEFAULT 0
+);
+
+-- Running average duration per job shape, for shortest-job-first
+CREATE TABLE IF NOT EXISTS job_costs (
+    shape TEXT PRIMARY KEY,
+    seconds REAL NOT NULL,
+    samples INTEGER NOT NULL
+);
+'''
+
+# Columns added since the first queue schema, for opening older queue files
+ADDED_COLUMNS = {
+    'lease_token': 'TEXT', 'lease_expires': 'REAL',
+    'client': "TEXT NOT NULL DEFAULT 'default'", 'priority': 'INTEGER NOT NULL DEFAULT 1',
+    'shape': 'TEXT', 'cost': 'REAL',
+}
+
+CLAIMABLE = "(status = 'queued' OR (status = 'running' AND lease_expires < :now))"
+
+
+def _row(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+    if row is None:
+        return None
+    job = dict(row)
+    job['spec'] = json.loads(job['spec'])
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    return job
+
+
+def _worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobQueue:
+    """
+    Campaign jobs in one SQLite file (WAL mode). claim() is a single
+    UPDATE ... RETURNING, so concurrent workers - threads or processes
+    sharing the file - never get the same job.
+
+    Each claim carries a fresh lease token. heartbeat() and finish() only
+    succeed for the token that holds the lease, so a worker that stalled
+    past its lease (and lost the job to another) can't overwrite the
+    result: each job's result is committed exactly once.
+    """
+
+    def __init__(self, path: str = './creative_outputs/queue.db', lease: float = 60.0,
+                 scheduler: Optional[Scheduler] = None):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = str(path)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+        columns = {row[1] for row in self._db.execute('PRAGMA table_info(jobs)')}
+        for column, kind in ADDED_COLUMNS.items():
+            if column not in columns:
+                self._db.execute(f'ALTER TABLE jobs ADD COLUMN {column} {kind}')
+        self._db.execute('CREATE INDEX IF NOT EXISTS jobs_schedule '
+                         'ON jobs (status, priority, client, cost)')
+        self.lease = lease
+        self.scheduler = scheduler or Scheduler()
+        self._lock = threading.Lock()
+
+    def close(self):
+        self._db.close()
+
+    def enqueue(self, spec: Dict[str, Any], job_id: Optional[str] = None,
+                client: Optional[str] = None, priority=None) -> Dict[str, Any]:
+        """
+        Add a job (id defaults to spec['id'] or a fresh one). Enqueuing an
+        id that already exists returns the existing job, so clients can
+        retry a submit safely. priority is a class name or number and
+        defaults to the campaign's quality tier.
+        """
+        job_id = job_id or spec.get('id') or f"job_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+        if not CAMPAIGN_ID.match(str(job_id)):
+            raise ValueError(f"invalid job id: {job_id!r}")
+        client = client or 'default'
+        shape = job_shape(spec)
+        with self._lock, self._db:
+            row = self._db.execute('SELECT seconds FROM job_costs WHERE shape = ? AND samples >= 3',
+                                   (shape,)).fetchone()
+            # A client returning from idle starts level with the busiest
+            # share, rather than cashing in service it didn't use
+            self._db.execute(
+                "INSERT INTO clients (name, served) VALUES (:client, 0) ON CONFLICT DO NOTHING",
+                {'client': client})
+            self._db.execute(
+                "UPDATE clients SET served = MAX(served, COALESCE((SELECT MIN(c.served) FROM "
+                "clients c WHERE c.name != :client AND EXISTS (SELECT 1 FROM jobs j WHERE "
+                "j.client = c.name AND j.status IN ('queued', 'running'))), 0)) "
+                "WHERE name = :client AND NOT EXISTS (SELECT 1 FROM jobs WHERE client = :client "
+                "AND status IN ('queued', 'running'))", {'client': client})
+            self._db.execute(
+                "INSERT OR IGNORE INTO jobs (id, spec, status, created_at, client, priority, "
+                "shape, cost) VALUES (?, ?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, json.dumps(spec), time.time(), client, priority_class(spec, priority),
+                 shape, row[0] if row else static_cost(spec)))
+        return self.get(job_id)
+
+    def claim(self, worker: Optional[str] = None,
+              lease: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Lease the job the scheduler picks among claimable ones - queued, or
+        running under a lease that has expired - and return it with its
+        lease_token (None if nothing may run)
+        """
+        now = time.time()
+        with self._lock, self._db:
+            # Hold the write lock from reading candidates to claiming one,
+            # so processes sharing the file never pick the same job
+            self._db.execute('BEGIN IMMEDIATE')
+            groups = {(row['priority'], row['client']): dict(row) for row in self._db.execute(
+                f"SELECT seq AS shortest_seq, priority, client, MIN(cost) FROM jobs "
+                f"WHERE {CLAIMABLE} GROUP BY priority, client", {'now': now})}
+            for row in self._db.execute(
+                    f"SELECT seq, priority, client, MIN(created_at) AS oldest FROM jobs "
+                    f"WHERE {CLAIMABLE} GROUP BY priority, client", {'now': now}):
+                groups[row['priority'], row['client']].update(oldest_seq=row['seq'],
+                                                               oldest=row['oldest'])
+            if not groups:
+                return None
+            running = dict(self._db.execute(
+                "SELECT priority, COUNT(*) FROM jobs WHERE status = 'running' "
+                "AND lease_expires >= ? GROUP BY priority", (now,)).fetchall())
+            served = dict(self._db.execute('SELECT name, served FROM clients').fetchall())
+            choice = self.scheduler.pick(groups.values(), running, served, now)
+            if choice is None:
+                return None
+            rows = self._db.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, "
+                "started_at = ?, lease_token = ?, lease_expires = ? WHERE seq = ? RETURNING *",
+                (worker or _worker_name(), now, uuid.uuid4().hex, now + (lease or self.lease),
+                 choice['seq'])).fetchall()
+            job = _row(rows[0])
+            self._db.execute('UPDATE clients SET served = served + ? WHERE name = ?',
+                             ((job['cost'] or 0) / self.scheduler.weight(job['client']),
+                              job['client']))
+        return job
+
+    def heartbeat(self, job_id: str, token: str, lease: Optional[float] = None) -> bool:
+        """Extend a lease; False means it was lost and the job belongs to another worker"""
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND lease_token = ? "
+                "AND status = 'running'", (time.time() + (lease or self.lease), job_id, token))
+        return cursor.rowcount == 1
+
+    def finish(self, job_id: str, token: str, status: str,
+               result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> bool:
+        """Commit a result if token still holds the lease (False = discarded)"""
+        with self._lock, self._db:
+            rows = self._db.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ?, "
+                "lease_expires = NULL WHERE id = ? AND lease_token = ? AND status = 'running' "
+                "RETURNING shape, finished_at - started_at",
+                (status, time.time(), json.dumps(result, default=str) if result else None,
+                 error, job_id, token)).fetchall()
+            if rows and status == 'succeeded' and rows[0][0]:
+                # Moving average (weight 0.2) of how long this shape takes
+                self._db.execute(
+                    "INSERT INTO job_costs (shape, seconds, samples) VALUES (?, ?, 1) "
+                    "ON CONFLICT (shape) DO UPDATE SET seconds = seconds * 0.8 + "
+                    "excluded.seconds * 0.2, samples = samples + 1", tuple(rows[0]))
+        return bool(rows)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that hasn't started yet"""
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? "
+                "WHERE id = ? AND status = 'queued'", (time.time(), job_id))
+        return cursor.rowcount == 1
+
+    def requeue_expired(self) -> int:
+        """Put running jobs whose lease ran out back on the queue"""
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = 'queued', lease_token = NULL, lease_expires = NULL "
+                "WHERE status = 'running' AND (lease_expires IS NULL OR lease_expires < ?)",
+                (time.time(),))
+        return cursor.rowcount
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return _row(self._db.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone())
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recent jobs first, optionally with one status"""
+        sql, args = 'SELECT * FROM jobs', []
+        if status:
+            sql += ' WHERE status = ?'
+            args.append(status)
+        sql += ' ORDER BY seq DESC LIMIT ?'
+        with self._lock:
+            return [_row(row) for row in self._db.execute(sql, args + [limit])]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {row[0]: row[1] for row in
+                    self._db.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status')}
+
+
+class RemoteQueue:
+    """
+    Worker-side view of a queue served by another host's campaign service
+    (POST /leases ...), for nodes that don't share the SQLite file.
+    claim() long-polls: the server holds the request until a job arrives
+    or `wait` seconds pass.
+    """
+
+    def __init__(self, url: str, timeout: float = 30.0):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def _post(self, path: str, body: Dict[str, Any], timeout: Optional[float] = None):
+        request = urllib.request.Request(
+            self.url + path, data=json.dumps(body, default=str).encode(), method='POST',
+            headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=timeout or self.timeout) as response:
+                data = response.read()
+                return response.status, json.loads(data) if data else None
+        except urllib.error.HTTPError as e:
+            if e.code == 409:
+                return e.code, None
+            raise
+
+    def claim(self, worker: Optional[str] = None, lease: Optional[float] = None,
+              wait: float = 0.0) -> Optional[Dict[str, Any]]:
+        status, job = self._post('/leases', {'worker': worker or _worker_name(),
+                                             'lease': lease, 'wait': wait},
+                                 timeout=self.timeout + wait)
+        return job if status == 200 else None
+
+    def heartbeat(self, job_id: str, token: str, lease: Optional[float] = None) -> bool:
+        status, _ = self._post(f'/leases/{job_id}/heartbeat', {'token': token, 'lease': lease})
+        return status == 200
+
+    def finish(self, job_id: str, token: str, status: str,
+               result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> bool:
+        code, _ = self._post(f'/leases/{job_id}/finish', {'token': token, 'status': status,
+                                                          'result': result, 'error': error})
+        return code == 200
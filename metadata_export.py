@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Metadata Export - Streaming reader/writer for replicate_metadata_* exports
+Yields prediction records one at a time from the nested JSON export (or
+its JSONL variant), so memory stays flat no matter how large the export
+"""
+
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Set, TextIO
+
+_decoder = json.JSONDecoder()
+_TOKEN = re.compile(r'\S')
+_DELIMITER = re.compile(r'[,\]}\s]')
+
+
+class _Cursor:
+    """
+    Incremental walk over one JSON document. Containers are entered one
+    token at a time; leaf values (a single prediction record, say) are
+    decoded whole with raw_decode, so only the current record and a
+    read-ahead chunk are ever held in memory.
+    """
+
+    def __init__(self, f: TextIO, chunk_size: int = 64 * 1024):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+
+    def _fill(self) -> bool:
+        data = self.f.read(self.chunk_size)
+        if not data:
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character"""
+        while True:
+            match = _TOKEN.search(self.buf, self.pos)
+            if match:
+                self.pos = match.start()
+                return self.buf[self.pos]
+            self.pos = len(self.buf)
+            if not self._fill():
+                raise ValueError("unexpected end of export")
+
+    def take(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"expected {char!r}, found {self.buf[self.pos:self.pos + 20]!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode the next complete value"""
+        if self.peek() not in '"{[':
+            # Numbers and literals may continue in the next chunk ('0.' + '75')
+            while not _DELIMITER.search(self.buf, self.pos) and self._fill():
+                pass
+        while True:
+            try:
+                value, self.pos = _decoder.raw_decode(self.buf, self.pos)
+                return value
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+
+    def skip(self):
+        """
+        Consume the next value. Objects are walked key by key; array
+        elements (one record each) are decoded and dropped.
+        """
+        char = self.peek()
+        if char == '{':
+            for _ in self.members():
+                self.skip()
+        elif char == '[':
+            for _ in self.elements():
+                self.value()
+        else:
+            self.value()
+
+    def members(self) -> Iterator[str]:
+        """Yield an object's keys; the caller consumes each value"""
+        self.take('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.take(':')
+            yield key
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self.take('}')
+            return
+
+    def elements(self) -> Iterator[None]:
+        """Step through an array; the caller consumes each element"""
+        self.take('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield None
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self.take(']')
+            return
+
+
+def _model_matches(model: Optional[str], models: Set[str]) -> bool:
+    if not model:
+        return False
+    ref = model.split(':')[0]
+    return ref in models or ref.split('/')[-1] in models
+
+
+def _document_records(path: str) -> Iterator[Dict[str, Any]]:
+    # raw_predictions (full API records, with outputs) follows the summary
+    # predictions_by_model, so a key-only first pass picks the source
+    with open(path, encoding='utf-8') as f:
+        cursor = _Cursor(f)
+        keys = []
+        for key in cursor.members():
+            keys.append(key)
+            cursor.skip()
+    source = 'raw_predictions' if 'raw_predictions' in keys else 'predictions_by_model'
+
+    with open(path, encoding='utf-8') as f:
+        cursor = _Cursor(f)
+        for key in cursor.members():
+            if key != source or cursor.peek() not in '[{':
+                cursor.skip()
+            elif source == 'raw_predictions':
+                for _ in cursor.elements():
+                    yield cursor.value()
+            else:
+                for model in cursor.members():
+                    for _ in cursor.elements():
+                        yield {'model': model, **cursor.value()}
+
+
+def _jsonl_records(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_export(path: str, models: Optional[Iterable[str]] = None,
+                statuses: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Prediction records from an export (.json document or .jsonl), one at a
+    time. `models` matches owner/name or the bare name ('flux-schnell');
+    `statuses` matches the status field ('succeeded', 'failed', ...).
+    """
+    models = set(models) if models else None
+    statuses = set(statuses) if statuses else None
+    records = _jsonl_records(path) if Path(path).suffix == '.jsonl' else _document_records(path)
+    for record in records:
+        if models and not _model_matches(record.get('model'), models):
+            continue
+        if statuses and record.get('status') not in statuses:
+            continue
+        yield record
+
+
+def write_jsonl(records: Iterable[Dict[str, Any]], path: str, append: bool = False) -> int:
+    """
+    Write records one per line. With append=True, records whose id is
+    already in the file are skipped, so re-exporting overlapping ranges
+    never duplicates. Returns the number of records written.
+    """
+    seen = set()
+    if append and Path(path).exists():
+        seen = {record.get('id') for record in _jsonl_records(path)}
+    written = 0
+    with open(path, 'a' if append else 'w', encoding='utf-8') as f:
+        for record in records:
+            if record.get('id') in seen:
+                continue
+            seen.add(record.get('id'))
+            f.write(json.dumps(record, separators=(',', ':')) + '\n')
+            written += 1
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Filter and convert Replicate metadata exports")
+    parser.add_argument('exports', nargs='+', help="replicate_metadata_*.json or .jsonl files")
+    parser.add_argument('--model', action='append', help="Keep only this model (repeatable)")
+    parser.add_argument('--status', action='append', help="Keep only this status (repeatable)")
+    parser.add_argument('-o', '--output', help="Write matching records to this JSONL file")
+    parser.add_argument('--append', action='store_true', help="Append new records to --output")
+    args = parser.parse_args()
+
+    def records():
+        for export in args.exports:
+            yield from iter_export(export, args.model, args.status)
+
+    if args.output:
+        written = write_jsonl(records(), args.output, append=args.append)
+        print(f"📝 {written} records -> {args.output}")
+        return 0
+
+    counts: Dict[str, Dict[str, int]] = {}
+    for record in records():
+        by_status = counts.setdefault(record.get('model') or 'unknown', {})
+        by_status[record.get('status')] = by_status.get(record.get('status'), 0) + 1
+    for model, by_status in sorted(counts.items()):
+        summary = ', '.join(f"{n} {status}" for status, n in sorted(by_status.items(), key=str))
+        print(f"   {model}: {summary}")
+    print(f"📊 {sum(sum(s.values()) for s in counts.values())} predictions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Metrics - Counters, gauges and histograms in Prometheus text format
+Every thread updates its own shard of the values without taking a lock;
+a scrape sums the shards. Served at /metrics by the campaign service, and
+by the batch runner with --metrics-port or --metrics-file
+"""
+
+import bisect
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds: a fast image is ~1s, a premium video several minutes
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300, 600)
+CAMPAIGN_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    if not labels:
+        return ()
+    if len(labels) == 1:
+        return tuple(labels.items())
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels: Labels, extra: str = '') -> str:
+    pairs = [f'{k}="{_escape(str(v))}"' for k, v in labels]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value: float) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _merge(into: Dict, shard: Dict):
+    for key, value in shard.items():
+        if isinstance(value, list):
+            cells = into.get(key)
+            if cells is None:
+                into[key] = list(value)
+            else:
+                for i, n in enumerate(value):
+                    cells[i] += n
+        else:
+            into[key] = into.get(key, 0) + value
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, registry: 'Metrics', name: str, help: str):
+        self.registry = registry
+        self.name = name
+        self.help = help
+
+    def samples(self, values: Dict[Labels, Any]) -> List[str]:
+        return [f"{self.name}{_format_labels(labels)} {_number(value)}"
+                for labels, value in sorted(values.items())]
+
+
+class Counter(_Metric):
+    """Monotonic total; inc(1, model='flux_schnell')"""
+    kind = 'counter'
+
+    def inc(self, value: float = 1, **labels):
+        try:
+            shard = self.registry._local.shard
+        except AttributeError:
+            shard = self.registry._shard()
+        key = (self.name, _labels(labels))
+        shard[key] = shard.get(key, 0) + value
+
+
+class Gauge(Counter):
+    """
+    Value that goes up and down. Only relative changes are sharded, so
+    inc() and dec() may happen on different threads; for absolute values
+    read at scrape time use Metrics.callback()
+    """
+    kind = 'gauge'
+
+    def dec(self, value: float = 1, **labels):
+        self.inc(-value, **labels)
+
+
+class Histogram(_Metric):
+    """Bucketed observations (cumulative buckets, _sum and _count on export)"""
+    kind = 'histogram'
+
+    def __init__(self, registry: 'Metrics', name: str, help: str, buckets=LATENCY_BUCKETS):
+        super().__init__(registry, name, help)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        try:
+            shard = self.registry._local.shard
+        except AttributeError:
+            shard = self.registry._shard()
+        key = (self.name, _labels(labels))
+        cells = shard.get(key)
+        if cells is None:
+            # One count per bucket plus +Inf, then the running sum
+            cells = shard[key] = [0] * (len(self.buckets) + 2)
+        cells[bisect.bisect_left(self.buckets, value)] += 1
+        cells[-1] += value
+
+    def series(self) -> Dict[Labels, List[float]]:
+        """Merged per-bucket counts (last cell: sum) for every label set"""
+        return {labels: cells for (name, labels), cells in self.registry.collect().items()
+                if name == self.name}
+
+    def quantile(self, q: float, cells: List[float]) -> Optional[float]:
+        """Estimate a quantile from bucket counts, as Prometheus' histogram_quantile does"""
+        counts = cells[:-1]
+        total = sum(counts)
+        if not total:
+            return None
+        rank, seen = q * total, 0
+        for i, n in enumerate(counts):
+            if seen + n >= rank and n:
+                if i == len(self.buckets):
+                    return float(self.buckets[-1])
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / n
+            seen += n
+        return float(self.buckets[-1])
+
+    def samples(self, values: Dict[Labels, Any]) -> List[str]:
+        lines = []
+        for labels, cells in sorted(values.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + ('+Inf',), cells[:-1]):
+                cumulative += n
+                le = f'le="{bound if bound == "+Inf" else _number(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_number(cells[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class _Callback(_Metric):
+    """Value read at scrape time: a number, or {label value: number}"""
+
+    def __init__(self, registry: 'Metrics', name: str, help: str, fn: Callable,
+                 kind: str = 'gauge', label: Optional[str] = None):
+        super().__init__(registry, name, help)
+        self.fn = fn
+        self.kind = kind
+        self.label = label
+
+    def read(self) -> Dict[Labels, float]:
+        try:
+            value = self.fn()
+        except Exception:
+            return {}
+        if isinstance(value, dict):
+            return {((self.label, str(k)),): v for k, v in value.items()}
+        return {(): value}
+
+
+class Metrics:
+    """
+    Registry of named metrics. Updates go to a dict owned by the calling
+    thread (a lock is taken once per thread, to register its shard);
+    collect() sums live shards and folds those of finished threads into
+    one retired total, so short-lived worker pools don't pile up shards.
+    A scrape racing an update may only see it on the next scrape.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._local = threading.local()
+        self._shards: List[Tuple[threading.Thread, Dict]] = []
+        self._retired: Dict = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._register(Counter(self, name, help))
+
+    def gauge(self, name: str, help: str) -> Gauge:
+        return self._register(Gauge(self, name, help))
+
+    def histogram(self, name: str, help: str, buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(self, name, help, buckets))
+
+    def callback(self, name: str, help: str, fn: Callable, kind: str = 'gauge',
+                 label: Optional[str] = None):
+        """Metric computed by fn() on every scrape (queue depth, pool stats)"""
+        with self._lock:
+            self._metrics[name] = _Callback(self, name, help, fn, kind, label)
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"{metric.name} already registered as a {existing.kind}")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def _shard(self) -> Dict:
+        """Register the calling thread's shard (its first update only)"""
+        shard = self._local.shard = {}
+        with self._lock:
+            self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def collect(self) -> Dict[Tuple[str, Labels], Any]:
+        """Current value of every (metric name, labels) series"""
+        with self._lock:
+            live = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    live.append((thread, shard))
+                else:
+                    _merge(self._retired, shard)
+            self._shards = live
+            totals: Dict = {}
+            _merge(totals, self._retired)
+        for thread, shard in live:
+            _merge(totals, shard.copy())
+        return totals
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        series: Dict[str, Dict[Labels, Any]] = {}
+        for (name, labels), value in self.collect().items():
+            series.setdefault(name, {})[labels] = value
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        lines = []
+        for name, metric in metrics:
+            values = metric.read() if isinstance(metric, _Callback) else series.get(name, {})
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.samples(values))
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str) -> Path:
+        """Write render() atomically, for node_exporter's textfile collector"""
+        path = Path(path)
+        tmp = path.with_name(path.name + '.tmp')
+        tmp.write_text(self.render())
+        os.replace(tmp, path)
+        return path
+
+
+def serve(metrics: Metrics, host: str = '127.0.0.1', port: int = 9464) -> ThreadingHTTPServer:
+    """Serve GET /metrics from a daemon thread; returns the server (shutdown() to stop)"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0].rstrip('/') != '/metrics':
+                self.send_error(404)
+                return
+            data = metrics.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    return server
@@ -236,6 +236,7 @@ class ReplicateOrchestrator:
         if "flux" in model:
             return {
                 "model": model,
+                "kind": "image",
                 "input": {
                     "prompt": params["prompt"],
                     "num_outputs": 1,
@@ -249,6 +250,7 @@ class ReplicateOrchestrator:
         elif "seedream" in model or "ideogram" in model:
             return {
                 "model": model,
+                "kind": "image",
                 "input": {
                     "prompt": params["prompt"],
                     "negative_prompt": params["negative_prompt"],
@@ -262,6 +264,7 @@ class ReplicateOrchestrator:
         else:  # SDXL fallback
             return {
                 "model": "stability-ai/sdxl",
+                "kind": "image",
                 "input": {
                     "prompt": params["prompt"],
                     "negative_prompt": params["negative_prompt"],
@@ -282,6 +285,7 @@ class ReplicateOrchestrator:
             # Text-to-video
             return {
                 "model": model,
+                "kind": "video",
                 "input": {
                     "prompt": params["prompt"],
                     "num_frames": params["num_frames"],
@@ -294,6 +298,7 @@ class ReplicateOrchestrator:
             # Image-to-video
             return {
                 "model": model,
+                "kind": "video",
                 "input": {
                     "input_image": image_url,
                     "video_length": "25_frames",
@@ -306,6 +311,7 @@ class ReplicateOrchestrator:
             # Zeroscope or AnimateDiff fallback
             return {
                 "model": "anotherjesse/zeroscope-v2-xl",
+                "kind": "video",
                 "input": {
                     "prompt": params["prompt"],
                     "width": 1024,
@@ -323,6 +329,7 @@ class ReplicateOrchestrator:
         if "musicgen" in model:
             return {
                 "model": "meta/musicgen",
+                "kind": "audio",
                 "input": {
                     "prompt": params["prompt"],
                     "duration": params["duration"],
@@ -334,6 +341,7 @@ class ReplicateOrchestrator:
         else:  # Riffusion fallback
             return {
                 "model": "riffusion/riffusion",
+                "kind": "audio",
                 "input": {
                     "prompt_a": params["prompt"],
                     "denoising": 0.75,
@@ -352,6 +360,17 @@ def create_job_schema(mode_name: str, product_name: str, product_desc: str) -> D
 
     orchestrator = ReplicateOrchestrator(mode)
 
+    # Image-to-video modes animate the hero image, so the video job
+    # waits on it; text-to-video runs alongside the stills
+    if "svd" in mode.config.preferred_models["video"]:
+        hero_video = orchestrator.prepare_video_job(image_url="{hero_image}")
+        hero_video["depends_on"] = ["hero_image"]
+        hero_video["input_from"] = {"input_image": "hero_image"}
+    else:
+        hero_video = orchestrator.prepare_video_job(
+            prompt=f"{product_name} cinematic reveal, {product_desc}"
+        )
+
     # Build the complete job schema
     job = {
         "meta": {
@@ -373,9 +392,7 @@ def create_job_schema(mode_name: str, product_name: str, product_desc: str) -> D
                 f"{product_name} in use, lifestyle photography, {product_desc}",
                 aspect_ratio="4:3"
             ),
-            "hero_video": orchestrator.prepare_video_job(
-                prompt=f"{product_name} cinematic reveal, {product_desc}"
-            ),
+            "hero_video": hero_video,
             "soundtrack": orchestrator.prepare_audio_job(
                 f"product launch music for {product_name}, {mode.config.audio_character}"
             )
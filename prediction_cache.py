@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Prediction Cache - Content-addressed cache of Replicate results
+Keyed by a canonical hash of the model ref + normalized input; stores the
+output URLs and the downloaded bytes (Replicate URLs expire), with size-
+and age-based eviction
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+from http_client import PooledClient, shared_client
+from asset_downloader import link_or_copy
+
+
+def _normalize(value: Any) -> Any:
+    """Canonical form for hashing: sorted keys, lists for tuples, 1.0 -> 1"""
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if hasattr(value, 'url'):
+        return value.url
+    return value
+
+
+def cache_key(model: str, input: Dict[str, Any]) -> str:
+    """
+    SHA-256 over the model ref and normalized input. An unversioned ref
+    (owner/name) names whatever version is latest, so its key doesn't
+    change when the model does; see PredictionCache.unversioned_max_age
+    """
+    canonical = json.dumps({'model': model, 'input': _normalize(input)},
+                           sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _urls(output: Any):
+    """Every URL (or FileOutput) inside a model output"""
+    if isinstance(output, dict):
+        for value in output.values():
+            yield from _urls(value)
+    elif isinstance(output, (list, tuple)):
+        for value in output:
+            yield from _urls(value)
+    elif hasattr(output, 'url'):
+        yield output
+    elif isinstance(output, str) and output.startswith(('http://', 'https://')):
+        yield output
+
+
+def _swap(output: Any, files: Dict[str, str]) -> Any:
+    """Replace URLs in an output with their cached local paths"""
+    if isinstance(output, dict):
+        return {k: _swap(v, files) for k, v in output.items()}
+    if isinstance(output, list):
+        return [_swap(v, files) for v in output]
+    if isinstance(output, str) and output in files and os.path.exists(files[output]):
+        return files[output]
+    return output
+
+
+@dataclass
+class CacheEntry:
+    """A cached prediction result"""
+    key: str
+    model: str
+    output: Any
+    files: Dict[str, str] = field(default_factory=dict)
+    created_at: float = 0.0
+
+    def local_output(self) -> Any:
+        """Output with URLs swapped for downloaded copies where available"""
+        return _swap(self.output, self.files)
+
+    def has_files(self) -> bool:
+        """True if every URL in the output has a downloaded copy on disk"""
+        return all(os.path.exists(self.files.get(str(url), '')) for url in _urls(self.output))
+
+
+class PredictionCache:
+    """
+    SQLite index plus a blob directory:
+
+        .prediction_cache/index.db
+        .prediction_cache/blobs/<key>_<n>.<ext>
+
+    put() records the output immediately and downloads its files on a
+    small background pool, so callers on an event loop never block.
+    Replicate's delivery URLs expire after about an hour (url_ttl): past
+    that an entry whose bytes weren't stored is a miss.
+
+    Entries for unversioned refs (e.g. black-forest-labs/flux-schnell)
+    expire after unversioned_max_age instead of max_age, since an update
+    to the model would otherwise keep serving the old version's outputs.
+    """
+
+    def __init__(self, cache_dir: str = './.prediction_cache',
+                 max_bytes: int = 2 * 1024 ** 3, max_age: float = 7 * 86400,
+                 store_bytes: bool = True, download_workers: int = 4,
+                 client: Optional[PooledClient] = None, url_ttl: float = 3600,
+                 unversioned_max_age: float = 86400):
+        self.cache_dir = Path(cache_dir)
+        self.blob_dir = self.cache_dir / 'blobs'
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.unversioned_max_age = min(max_age, unversioned_max_age)
+        self.url_ttl = url_ttl
+        self.store_bytes = store_bytes
+        self.download_workers = download_workers
+        self.client = client
+
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.cache_dir / 'index.db'), check_same_thread=False)
+        self._db.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                output TEXT NOT NULL,
+                files TEXT NOT NULL DEFAULT '{}',
+                size INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )''')
+        self._db.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)')
+        self._db.commit()
+        self._downloads = ThreadPoolExecutor(max_workers=download_workers,
+                                             thread_name_prefix='cache-download')
+
+    def get(self, model: str, input: Dict[str, Any]) -> Optional[CacheEntry]:
+        """Return the fresh entry for (model, input), or None"""
+        key = cache_key(model, input)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                'SELECT model, output, files, created_at FROM entries WHERE key = ?',
+                (key,)).fetchone()
+            entry = CacheEntry(key, row[0], json.loads(row[1]), json.loads(row[2]), row[3]) if row else None
+            if entry and now - entry.created_at <= self._max_age(model) and (
+                    now - entry.created_at <= self.url_ttl or entry.has_files()):
+                self._db.execute('UPDATE entries SET accessed_at = ? WHERE key = ?', (now, key))
+                self._db.commit()
+                self.stats['hits'] += 1
+                return entry
+            self.stats['misses'] += 1
+            if entry:
+                # Under the lock, and only the entry read: a put() racing
+                # this get must keep its fresh entry
+                self._delete(key, entry.created_at)
+        return None
+
+    def _max_age(self, model: str) -> float:
+        return self.max_age if ':' in model else self.unversioned_max_age
+
+    def put(self, model: str, input: Dict[str, Any], output: Any,
+            files: Optional[Dict[str, str]] = None) -> str:
+        """
+        Cache an output; files are downloaded in the background unless
+        `files` maps their URLs to copies the caller already saved
+        """
+        key = cache_key(model, input)
+        now = time.time()
+        sources = list(_urls(output))
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO entries (key, model, output, files, size, created_at, accessed_at) '
+                'VALUES (?, ?, ?, ?, 0, ?, ?)',
+                (key, model, json.dumps(_normalize(output), default=str), '{}', now, now))
+            self._db.commit()
+            self.stats['stores'] += 1
+        if self.store_bytes and sources:
+            self._downloads.submit(self._store_files, key, sources, files or {})
+        return key
+
+    def flush(self):
+        """Wait for pending background downloads"""
+        self._downloads.shutdown(wait=True)
+        self._downloads = ThreadPoolExecutor(max_workers=self.download_workers,
+                                             thread_name_prefix='cache-download')
+
+    def _store_files(self, key: str, sources, saved: Dict[str, str]):
+        files, size = {}, 0
+        for n, source in enumerate(sources):
+            url = str(getattr(source, 'url', source))
+            suffix = Path(urlparse(url).path).suffix or '.bin'
+            path = self.blob_dir / f"{key}_{n}{suffix}"
+            try:
+                if os.path.isfile(saved.get(url, '')):
+                    path.unlink(missing_ok=True)
+                    link_or_copy(saved[url], path)
+                    size += path.stat().st_size
+                else:
+                    size += self._download(source, path)
+                files[url] = str(path.resolve())
+            except Exception:
+                path.unlink(missing_ok=True)
+        with self._lock:
+            self._db.execute('UPDATE entries SET files = ?, size = ? WHERE key = ?',
+                             (json.dumps(files), size, key))
+            self._db.commit()
+        self.evict()
+
+    def _download(self, source, path: Path) -> int:
+        """Stream a URL or FileOutput to path; returns bytes written"""
+        tmp = path.with_suffix(path.suffix + '.part')
+        try:
+            with open(tmp, 'wb') as f:
+                if hasattr(source, 'url') and hasattr(source, '__iter__'):
+                    for chunk in source:
+                        f.write(chunk)
+                else:
+                    http = (self.client or shared_client()).http
+                    with http.stream('GET', source, timeout=60) as response:
+                        response.raise_for_status()
+                        for chunk in response.iter_bytes(1024 * 1024):
+                            f.write(chunk)
+        except Exception:
+            tmp.unlink(missing_ok=True)
+            raise
+        os.replace(tmp, path)
+        return path.stat().st_size
+
+    def evict(self):
+        """Drop expired entries, then least-recently-used ones over max_bytes"""
+        now = time.time()
+        with self._lock:
+            expired, total, live = [], 0, []
+            for key, model, size, created_at in self._db.execute(
+                    'SELECT key, model, size, created_at FROM entries ORDER BY accessed_at'):
+                if now - created_at > self._max_age(model):
+                    expired.append((key, created_at))
+                else:
+                    total += size
+                    live.append((key, size, created_at))
+            victims = []
+            for key, size, created_at in live:
+                if total <= self.max_bytes:
+                    break
+                victims.append((key, created_at))
+                total -= size
+            for key, created_at in expired + victims:
+                self._delete(key, created_at)
+
+    def urls_expired(self, entry: CacheEntry) -> bool:
+        """True once an entry's output URLs have likely stopped working"""
+        return time.time() - entry.created_at > self.url_ttl
+
+    def _delete(self, key: str, created_at: float):
+        """Drop the entry stored at created_at and its blobs (lock held)"""
+        row = self._db.execute('SELECT files FROM entries WHERE key = ? AND created_at = ?',
+                               (key, created_at)).fetchone()
+        if row is None:
+            return  # Replaced since it was read
+        self._db.execute('DELETE FROM entries WHERE key = ? AND created_at = ?', (key, created_at))
+        self._db.commit()
+        self.stats['evictions'] += 1
+        for path in json.loads(row[0]).values():
+            Path(path).unlink(missing_ok=True)
+
+    def clear(self):
+        with self._lock:
+            self._db.execute('DELETE FROM entries')
+            self._db.commit()
+        shutil.rmtree(self.blob_dir, ignore_errors=True)
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Prediction Engine - Non-blocking Replicate submission and polling
+One asyncio loop tracks every in-flight prediction, so thread count and
+memory stay flat no matter how many predictions a campaign has running
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Optional
+
+import replicate
+from replicate.helpers import transform_output
+from replicate.identifier import ModelVersionIdentifier
+
+from http_client import shared_client
+from rate_limiter import is_rate_limited, is_transient, retry_after
+
+TERMINAL_STATES = ('succeeded', 'failed', 'canceled')
+
+
+class PredictionFailed(Exception):
+    """A prediction finished in the failed or canceled state"""
+
+    def __init__(self, prediction_id: str, status: str, error: Any = None):
+        super().__init__(f"Prediction {prediction_id} {status}: {error}")
+        self.prediction_id = prediction_id
+        self.status = status
+        self.error = error
+
+
+class _Tracked:
+    """Minimal per-prediction polling state"""
+    __slots__ = ('id', 'future', 'status', 'interval', 'next_poll', 'transform', 'errors')
+
+    def __init__(self, prediction_id, future, status, interval, transform):
+        self.id = prediction_id
+        self.future = future
+        self.status = status
+        self.interval = interval
+        self.next_poll = time.monotonic() + interval
+        self.transform = transform
+        self.errors = 0  # Consecutive failed polls
+
+
+class PredictionEngine:
+    """
+    Submit predictions with `predictions.create` and resolve them from a
+    single background event loop.
+
+    Each tick the poller sweeps every prediction that is due in one batch
+    (bounded by max_concurrent_polls). A prediction's interval starts at
+    min_interval and backs off toward max_interval while its status is
+    unchanged, resetting whenever it moves (starting -> processing).
+
+    A poll that fails with a network error, a 5xx or a 429 (after its
+    Retry-After) is retried, up to max_poll_errors times in a row; any
+    other error, such as a 404 for an unknown or expired prediction ID,
+    fails the prediction's future with that error.
+    """
+
+    def __init__(self, client: Optional[replicate.Client] = None,
+                 min_interval: float = 0.5, max_interval: float = 8.0,
+                 backoff: float = 1.5, max_concurrent_polls: int = 16,
+                 webhook=None, webhook_poll_interval: float = 30.0,
+                 max_poll_errors: int = 10):
+        self.client = client or shared_client()
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.max_concurrent_polls = max_concurrent_polls
+        self.max_poll_errors = max_poll_errors
+
+        # With a WebhookReceiver, completions arrive by push and polling
+        # drops to a slow safety net for lost deliveries
+        self.webhook = webhook
+        self.webhook_poll_interval = webhook_poll_interval
+        self._early: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+
+        self.stats = {'submitted': 0, 'succeeded': 0, 'failed': 0, 'polls': 0,
+                      'webhooks': 0}
+        self._tracked: Dict[str, _Tracked] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._lock = threading.Lock()
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def start(self):
+        """Start the event loop thread (idempotent)"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return self
+            ready = threading.Event()
+            self._thread = threading.Thread(target=self._run_loop, args=(ready,),
+                                            name='prediction-engine', daemon=True)
+            self._thread.start()
+            ready.wait()
+            if self.webhook:
+                self.webhook.subscribe(self._on_webhook)
+                self.webhook.start()
+        return self
+
+    def stop(self):
+        """Stop polling; unresolved futures are cancelled"""
+        if self._loop and self._thread:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            for tracked in self._tracked.values():
+                tracked.future.cancel()
+            self._tracked.clear()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tracked)
+
+    # -- submission --------------------------------------------------------
+
+    def submit(self, model: str, input: Dict[str, Any],
+               transform: Optional[Callable[[Any], Any]] = None,
+               on_created: Optional[Callable[[str], None]] = None,
+               **params) -> Future:
+        """
+        Create a prediction without blocking.
+
+        Returns a concurrent.futures.Future resolving to the model output
+        (URLs wrapped as FileOutput, like replicate.run), passed through
+        `transform` if given. `on_created(prediction_id)` is called (on a
+        worker thread, off the engine's loop) as soon as Replicate accepts
+        the prediction, so the ID can be persisted and the prediction
+        re-tracked after a crash; if it raises, the future fails with it.
+        """
+        self.start()
+        future = Future()
+        asyncio.run_coroutine_threadsafe(
+            self._create(model, input, future, transform, params, on_created), self._loop)
+        return future
+
+    def run(self, model: str, input: Dict[str, Any], **params) -> Any:
+        """Blocking convenience wrapper, a drop-in for replicate.run"""
+        return self.submit(model, input, **params).result()
+
+    def track(self, prediction_id: str,
+              transform: Optional[Callable[[Any], Any]] = None) -> Future:
+        """Resolve an already-created prediction by ID"""
+        self.start()
+        future = Future()
+        self._loop.call_soon_threadsafe(
+            self._add, prediction_id, 'starting', future, transform)
+        return future
+
+    async def _create(self, model, input, future, transform, params, on_created=None):
+        if self.webhook:
+            params.setdefault('webhook', self.webhook.url)
+            params.setdefault('webhook_events_filter', ['completed'])
+        try:
+            owner, name, version_id = ModelVersionIdentifier.parse(model)
+            if version_id:
+                prediction = await self.client.predictions.async_create(
+                    version=version_id, input=input, **params)
+            else:
+                prediction = await self.client.models.predictions.async_create(
+                    model=(owner, name), input=input, **params)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+
+        self.stats['submitted'] += 1
+        if on_created:
+            # Journal writes and flushes stay off the loop that polls everything
+            try:
+                await self._loop.run_in_executor(None, on_created, prediction.id)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+                return
+        if prediction.status in TERMINAL_STATES:
+            self._resolve(_Tracked(prediction.id, future, prediction.status, 0, transform),
+                          prediction)
+        else:
+            self._add(prediction.id, prediction.status, future, transform)
+
+    def _add(self, prediction_id, status, future, transform):
+        interval = self.webhook_poll_interval if self.webhook else self.min_interval
+        tracked = _Tracked(prediction_id, future, status, interval, transform)
+        payload = self._early.pop(prediction_id, None)
+        if payload:
+            self._resolve(tracked, self._payload_prediction(payload))
+            return
+        self._tracked[prediction_id] = tracked
+        self._wakeup.set()
+
+    # -- webhooks ----------------------------------------------------------
+
+    def _on_webhook(self, payload: Dict[str, Any]):
+        """Called on the receiver's thread for every completion payload"""
+        if self._loop and payload.get('status') in TERMINAL_STATES:
+            self._loop.call_soon_threadsafe(self._complete, payload)
+
+    def _complete(self, payload: Dict[str, Any]):
+        tracked = self._tracked.get(payload['id'])
+        if tracked:
+            self.stats['webhooks'] += 1
+            self._resolve(tracked, self._payload_prediction(payload))
+        else:
+            # Delivered before predictions.create returned; keep briefly
+            self._early[payload['id']] = payload
+            while len(self._early) > 1024:
+                self._early.popitem(last=False)
+
+    @staticmethod
+    def _payload_prediction(payload: Dict[str, Any]):
+        return SimpleNamespace(id=payload['id'], status=payload.get('status'),
+                               output=payload.get('output'), error=payload.get('error'))
+
+    async def _shutdown(self):
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # -- polling -----------------------------------------------------------
+
+    def _run_loop(self, ready: threading.Event):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._wakeup = asyncio.Event()
+        self._loop.create_task(self._poller())
+        ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    async def _poller(self):
+        semaphore = asyncio.Semaphore(self.max_concurrent_polls)
+
+        async def poll(tracked):
+            async with semaphore:
+                try:
+                    prediction = await self.client.predictions.async_get(tracked.id)
+                except Exception as e:
+                    tracked.errors += 1
+                    if not is_transient(e) or tracked.errors > self.max_poll_errors:
+                        self._fail(tracked, e)
+                        return
+                    self._reschedule(tracked, changed=False)
+                    if is_rate_limited(e):
+                        tracked.next_poll = max(tracked.next_poll, time.monotonic()
+                                                + retry_after(e, tracked.errors - 1))
+                    return
+                tracked.errors = 0
+                self.stats['polls'] += 1
+                if prediction.status in TERMINAL_STATES:
+                    self._resolve(tracked, prediction)
+                else:
+                    self._reschedule(tracked, changed=prediction.status != tracked.status)
+                    tracked.status = prediction.status
+
+        while True:
+            if not self._tracked:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+
+            now = time.monotonic()
+            due = [t for t in self._tracked.values() if t.next_poll <= now]
+            if due:
+                await asyncio.gather(*(poll(t) for t in due))
+
+            if self._tracked:
+                next_poll = min(t.next_poll for t in self._tracked.values())
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(),
+                                           max(0.0, next_poll - time.monotonic()))
+                except asyncio.TimeoutError:
+                    pass
+
+    def _reschedule(self, tracked: _Tracked, changed: bool):
+        if self.webhook:
+            tracked.interval = self.webhook_poll_interval
+        elif changed:
+            tracked.interval = self.min_interval
+        else:
+            tracked.interval = min(self.max_interval, tracked.interval * self.backoff)
+        tracked.next_poll = time.monotonic() + tracked.interval
+
+    def _fail(self, tracked: _Tracked, error: Exception):
+        self._tracked.pop(tracked.id, None)
+        if not tracked.future.done():
+            self.stats['failed'] += 1
+            tracked.future.set_exception(error)
+
+    def _resolve(self, tracked: _Tracked, prediction):
+        self._tracked.pop(tracked.id, None)
+        if tracked.future.done():
+            return
+        if prediction.status == 'succeeded':
+            self.stats['succeeded'] += 1
+            output = transform_output(prediction.output, self.client)
+            try:
+                if tracked.transform:
+                    output = tracked.transform(output)
+            except Exception as e:
+                tracked.future.set_exception(e)
+                return
+            tracked.future.set_result(output)
+        else:
+            self.stats['failed'] += 1
+            tracked.future.set_exception(
+                PredictionFailed(prediction.id, prediction.status, prediction.error))
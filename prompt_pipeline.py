@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Prompt Pipeline - Stream enhanced prompts straight into generation
+A producer thread drains the enhancement stream into a bounded queue and
+workers generate each prompt as soon as it arrives, so enhancing prompt
+N+1 overlaps with generating prompt N
+"""
+
+import contextvars
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+from job_executor import JobResult
+
+_DONE = object()
+
+
+class PromptPipeline:
+    """
+    Producer/consumer pipeline over (index, prompt) pairs.
+
+    `generate(index, prompt)` runs on one of `workers` threads and returns
+    the asset output; a falsy output or an exception marks it failed. The
+    queue holds at most `queue_size` prompts, so a slow generator applies
+    backpressure to the enhancement stream instead of buffering it.
+    """
+
+    def __init__(self, generate: Callable[[int, str], Any], workers: int = 4,
+                 queue_size: int = 4,
+                 on_complete: Callable[[JobResult], None] = None):
+        self.generate = generate
+        self.workers = workers
+        self.queue_size = queue_size
+        self.on_complete = on_complete
+
+    def run(self, prompts: Iterable[Tuple[int, str]]) -> Dict[int, Tuple[str, JobResult]]:
+        """
+        Consume the stream; returns {index: (prompt, result)}. An error
+        from the stream or from on_complete stops every thread and is
+        raised here.
+        """
+        pending: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        results: Dict[int, Tuple[str, JobResult]] = {}
+        lock = threading.Lock()
+        errors = []
+        stop = threading.Event()
+
+        def put(item) -> bool:
+            # Give up once stopped: no worker may be left to take it
+            while not stop.is_set():
+                try:
+                    pending.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def produce():
+            try:
+                for item in prompts:
+                    if not put(item):
+                        return
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                for _ in range(self.workers):
+                    put(_DONE)
+
+        def consume():
+            try:
+                while not stop.is_set():
+                    try:
+                        item = pending.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                    if item is _DONE:
+                        return
+                    index, prompt = item
+                    result = self._generate(index, prompt)
+                    with lock:
+                        results[index] = (prompt, result)
+                    if self.on_complete:
+                        self.on_complete(result)
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+
+        # Each thread runs in a copy of the caller's context (trace spans)
+        threads = [threading.Thread(target=contextvars.copy_context().run, args=(produce,),
+                                    name='prompt-producer', daemon=True)]
+        threads += [threading.Thread(target=contextvars.copy_context().run, args=(consume,),
+                                     name=f'prompt-worker-{n}', daemon=True)
+                    for n in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            raise errors[0]
+        return results
+
+    def _generate(self, index: int, prompt: str) -> JobResult:
+        name, started = f'image_{index}', time.time()
+        try:
+            output = self.generate(index, prompt)
+        except Exception as e:
+            return JobResult(name, 'failed', error=str(e),
+                             started_at=started, finished_at=time.time())
+        return JobResult(name, 'succeeded' if output else 'failed', output=output,
+                         error=None if output else 'no output',
+                         started_at=started, finished_at=time.time())
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Rate Limiter - Per-model and global token buckets with in-flight caps
+Requests queue instead of failing, and 429/Retry-After responses slow the
+affected buckets down so throughput settles at the provider ceiling
+"""
+
+import asyncio
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+
+
+@dataclass
+class ModelLimit:
+    """Limits for one model key (None = unlimited)"""
+    rate: Optional[float] = None       # predictions per second
+    burst: int = 10
+    max_in_flight: Optional[int] = None
+
+
+def http_status(error: Exception) -> Optional[int]:
+    """HTTP status of a replicate or httpx error (None if it has none)"""
+    status = getattr(error, 'status', None)
+    response = getattr(error, 'response', None)
+    if status is None and response is not None:
+        status = getattr(response, 'status_code', None)
+    return status
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """True for HTTP 429 errors from replicate or httpx"""
+    return http_status(error) == 429 or 'throttled' in str(error).lower()
+
+
+def is_transient(error: Exception) -> bool:
+    """Worth retrying: network errors and timeouts, 429 and 5xx responses"""
+    if isinstance(error, (httpx.TransportError, OSError, asyncio.TimeoutError)):
+        return True
+    status = http_status(error)
+    return is_rate_limited(error) or (status is not None and status >= 500)
+
+
+def retry_after(error: Exception, attempt: int = 0) -> float:
+    """Seconds to back off: Retry-After header, API detail text, or exponential"""
+    response = getattr(error, 'response', None)
+    header = response.headers.get('Retry-After') if response is not None else None
+    if header:
+        try:
+            return float(header)
+        except ValueError:
+            pass
+    match = re.search(r'(\d+(?:\.\d+)?)\s*(?:s\b|sec)', str(getattr(error, 'detail', '') or error))
+    if match:
+        return float(match.group(1))
+    return min(60.0, 0.5 * 2 ** attempt)
+
+
+class TokenBucket:
+    """
+    Token bucket that hands out reservations: reserve() takes a token now
+    and returns how long the caller must wait before using it, so waiters
+    queue in arrival order without busy-looping.
+    """
+
+    def __init__(self, rate: Optional[float], burst: int, min_rate: float = 0.05):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._blocked_until - now)
+            if self.rate is None:
+                return wait
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens < 0:
+                wait = max(wait, -self._tokens / self.rate)
+            return wait
+
+    def refund(self):
+        """Return a reserved token that was never used"""
+        with self._lock:
+            if self.rate is not None:
+                self._tokens = min(self.burst, self._tokens + 1)
+
+    def penalize(self, delay: float):
+        """
+        Pause the bucket for `delay` seconds and halve its rate. A burst of
+        429s inside one pause window counts as a single congestion event.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.rate is not None and now >= self._blocked_until:
+                self.rate = max(self.min_rate, self.rate * 0.5)
+            self._blocked_until = max(self._blocked_until, now + delay)
+
+    def recover(self):
+        """Additively grow the rate back toward its configured ceiling"""
+        with self._lock:
+            if self.rate is not None and self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.1)
+
+
+class _ModelState:
+    __slots__ = ('limit', 'bucket', 'in_flight')
+
+    def __init__(self, limit: ModelLimit):
+        self.limit = limit
+        self.bucket = TokenBucket(limit.rate, limit.burst)
+        self.in_flight = 0
+
+
+class RateGovernor:
+    """
+    Gate Replicate calls by model key (the keys of CreativeDirector.models).
+
+    Every call waits for an in-flight slot (per model and global) and a
+    token from both its model bucket and the global bucket. A 429 pauses
+    the buckets for Retry-After, halves their rate, and re-queues the
+    call; successes grow the rate back.
+
+    submit() dispatcher threads exit after dispatcher_idle seconds with
+    nothing queued (the next submission starts a new one); close() stops
+    them now.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, ModelLimit]] = None,
+                 default: Optional[ModelLimit] = None,
+                 global_rate: Optional[float] = 10.0, global_burst: int = 20,
+                 global_max_in_flight: Optional[int] = None,
+                 max_retries: int = 8, dispatcher_idle: float = 30.0):
+        self.limits = dict(limits or {})
+        self.default = default or ModelLimit()
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.global_max_in_flight = global_max_in_flight
+        self.max_retries = max_retries
+        self.dispatcher_idle = dispatcher_idle
+
+        self.in_flight = 0
+        self.stats = {'calls': 0, 'throttled': 0, 'queued_seconds': 0.0}
+        self._models: Dict[str, _ModelState] = {}
+        self._pending: Dict[str, queue.SimpleQueue] = {}  # Per-key submit() queues
+        self._cond = threading.Condition()
+
+    def _state(self, key: str) -> _ModelState:
+        state = self._models.get(key)
+        if state is None:
+            state = self._models.setdefault(
+                key, _ModelState(self.limits.get(key, self.default)))
+        return state
+
+    def acquire(self, key: str, abandon: Optional[threading.Event] = None) -> bool:
+        """
+        Block until `key` may start another prediction. If `abandon` is set
+        first, returns False holding no slot and with its tokens refunded
+        (set it through _wake so a wait for a slot notices).
+        """
+        started = time.monotonic()
+        state = self._state(key)
+        with self._cond:
+            while ((state.limit.max_in_flight and state.in_flight >= state.limit.max_in_flight)
+                   or (self.global_max_in_flight and self.in_flight >= self.global_max_in_flight)):
+                if abandon is not None and abandon.is_set():
+                    return False
+                self._cond.wait()
+            if abandon is not None and abandon.is_set():
+                return False
+            state.in_flight += 1
+            self.in_flight += 1
+        delay = max(state.bucket.reserve(), self.global_bucket.reserve())
+        if delay:
+            if abandon is None:
+                time.sleep(delay)
+            elif abandon.wait(delay):
+                state.bucket.refund()
+                self.global_bucket.refund()
+                self.release(key)
+                return False
+        with self._cond:
+            self.stats['calls'] += 1
+            self.stats['queued_seconds'] += time.monotonic() - started
+        return True
+
+    def release(self, key: str):
+        state = self._state(key)
+        with self._cond:
+            state.in_flight -= 1
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def throttle(self, key: str, delay: float):
+        """Record a 429 for `key`"""
+        with self._cond:
+            self.stats['throttled'] += 1
+        self._state(key).bucket.penalize(delay)
+        self.global_bucket.penalize(delay)
+
+    def recover(self, key: str):
+        self._state(key).bucket.recover()
+        self.global_bucket.recover()
+
+    def call(self, key: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn under the limits for `key`, retrying on 429"""
+        for attempt in range(self.max_retries + 1):
+            self.acquire(key)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if not is_rate_limited(e) or attempt == self.max_retries:
+                    raise
+                self.throttle(key, retry_after(e, attempt))
+                continue
+            finally:
+                self.release(key)
+            self.recover(key)
+            return result
+
+    def submit(self, key: str, factory: Callable[[], Future]) -> Future:
+        """
+        Non-blocking counterpart of call() for prediction_engine futures.
+
+        Submissions queue on a dispatcher thread per model key, which waits
+        for the slot and tokens and then calls factory, so a saturated
+        model never holds up the caller or other models. The in-flight
+        slot is held until the returned future resolves; a 429 re-queues
+        the submission. Cancelling the returned future drops a queued
+        submission without using a slot or token, or cancels the factory's
+        future once dispatched; cancelling the factory's future cancels it.
+        """
+        outer = Future()
+        self._submit(key, factory, outer, 0)
+        return outer
+
+    def close(self):
+        """Stop the submit() dispatchers, cancelling submissions still queued"""
+        with self._cond:
+            pending, self._pending = self._pending, {}
+        for submissions in pending.values():
+            while True:
+                try:
+                    _, outer, _ = submissions.get_nowait()
+                except queue.Empty:
+                    break
+                outer.cancel()
+            submissions.put(None)
+
+    def _submit(self, key: str, factory: Callable[[], Future], outer: Future, attempt: int):
+        with self._cond:  # Held over put() so an idle dispatcher can't exit past it
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = queue.SimpleQueue()
+                threading.Thread(target=self._dispatch, args=(key, pending),
+                                 name=f'rate-limit-{key}', daemon=True).start()
+            pending.put((factory, outer, attempt))
+
+    def _dispatch(self, key: str, pending: queue.SimpleQueue):
+        while True:
+            try:
+                item = pending.get(timeout=self.dispatcher_idle)
+            except queue.Empty:
+                with self._cond:
+                    if pending.empty():
+                        if self._pending.get(key) is pending:
+                            del self._pending[key]
+                        return
+                continue
+            if item is None:  # close()
+                return
+            factory, outer, attempt = item
+            cancelled = threading.Event()
+            outer.add_done_callback(lambda _, cancelled=cancelled: self._wake(cancelled))
+            if not self.acquire(key, abandon=cancelled):
+                continue  # Cancelled while queued or waiting for a slot or token
+            try:
+                inner = factory()
+            except Exception as e:
+                inner = Future()
+                inner.set_exception(e)
+            outer.add_done_callback(
+                lambda done, inner=inner: inner.cancel() if done.cancelled() else None)
+            inner.add_done_callback(
+                lambda future, outer=outer, attempt=attempt: self._settle(
+                    key, factory, outer, attempt, future))
+
+    def _wake(self, event: threading.Event):
+        """Set event and wake acquire() calls waiting for a slot"""
+        event.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def _settle(self, key: str, factory: Callable[[], Future], outer: Future,
+                attempt: int, future: Future):
+        self.release(key)
+        if future.cancelled():
+            outer.cancel()
+            return
+        error = future.exception()
+        if outer.done():
+            return
+        if error is None:
+            self.recover(key)
+            outer.set_result(future.result())
+        elif is_rate_limited(error) and attempt < self.max_retries:
+            self.throttle(key, retry_after(error, attempt))
+            self._submit(key, factory, outer, attempt + 1)
+        else:
+            outer.set_exception(error)
@@ -4,16 +4,30 @@ FAST REPLICATE CURSED CONTENT GENERATOR
 Uses image sequences instead of slow video models
 """
 
-import replicate
 import os
 import json
 import time
 from pathlib import Path
+from prediction_cache import PredictionCache
+from http_client import shared_client
+from asset_downloader import AssetDownloader, asset_filename
 
 class FastCursedGenerator:
     """Fast generation using images + audio only"""
 
-    def __init__(self):
+    def __init__(self, engine=None, cache=None, client=None):
+        # Shared keep-alive client (see http_client)
+        self.client = client or shared_client()
+
+        # Optional PredictionEngine: submits all frames and audio up front
+        self.engine = engine
+
+        # Identical prompts are served from the prediction cache (False = off)
+        self.cache = PredictionCache(client=self.client) if cache is None else cache
+
+        # Outputs are streamed to disk once, as each prediction finishes
+        self.downloader = AssetDownloader(client=self.client)
+
         self.output_dir = Path('/Users/hnsk/Projects/Development/av-pair/replicate_output')
         self.output_dir.mkdir(exist_ok=True)
 
@@ -67,35 +81,53 @@ class FastCursedGenerator:
         print(f"{'='*60}")
 
         theme_data = self.themes.get(theme, self.themes['learning_colors_wrong'])
-        results = {'theme': theme, 'cursedness': cursedness, 'images': [], 'audio': None}
-
-        # Generate 3 key frame images
-        print("\n🖼️ Generating cursed images...")
-        for i, prompt in enumerate(theme_data['prompts'], 1):
-            print(f"   Frame {i}/3: ", end='', flush=True)
+        results = {'theme': theme, 'cursedness': cursedness, 'images': [], 'audio': None,
+                   'files': []}
+        timestamp = int(time.time())
+        stem = f"fast_{theme}_{timestamp}"
 
+        # Build all generation inputs first
+        image_inputs = []
+        for prompt in theme_data['prompts']:
             # Add cursedness modifiers
             if cursedness > 7:
                 prompt += ", surreal, fever dream, uncanny valley, distorted"
             elif cursedness > 4:
                 prompt += ", slightly unsettling, oversaturated colors"
 
+            image_inputs.append({
+                "prompt": prompt + ", YouTube Kids content, 3D render",
+                "negative_prompt": "realistic, adult, dark, scary",
+                "width": 1024,
+                "height": 576,
+                "num_outputs": 1,
+                "num_inference_steps": 20  # Faster inference
+            })
+        audio_input = {
+            "prompt_a": theme_data['audio'],
+            "denoising": 0.75,
+            "seed_image_id": "vibes"
+        }
+
+        # Cache hits skip generation entirely; with an engine every miss is
+        # in flight at once. Results are still collected in frame order
+        image_pending = [self._start(self.models['image'], inp) for inp in image_inputs]
+        audio_pending = self._start(self.models['audio'], audio_input)
+
+        # Generate 3 key frame images
+        print("\n🖼️ Generating cursed images...")
+        for i, input_params in enumerate(image_inputs, 1):
+            print(f"   Frame {i}/3: ", end='', flush=True)
+
             try:
-                output = replicate.run(
-                    self.models['image'],
-                    input={
-                        "prompt": prompt + ", YouTube Kids content, 3D render",
-                        "negative_prompt": "realistic, adult, dark, scary",
-                        "width": 1024,
-                        "height": 576,
-                        "num_outputs": 1,
-                        "num_inference_steps": 20  # Faster inference
-                    }
-                )
+                output, path = self._finish(self.models['image'], input_params,
+                                            image_pending[i - 1], f"{stem}_frame_{i}")
 
                 if output:
                     url = output[0] if isinstance(output, list) else output
-                    results['images'].append(url)
+                    results['images'].append(str(url))
+                    if path:
+                        results['files'].append(path)
                     print("✅")
                 else:
                     print("❌")
@@ -106,38 +138,25 @@ class FastCursedGenerator:
         # Generate audio
         print("\n🎵 Generating cursed audio...")
         try:
-            audio_output = replicate.run(
-                self.models['audio'],
-                input={
-                    "prompt_a": theme_data['audio'],
-                    "denoising": 0.75,
-                    "seed_image_id": "vibes"
-                }
-            )
-
-            if audio_output and isinstance(audio_output, dict):
-                results['audio'] = audio_output.get('audio')
+            audio_output, path = self._finish(self.models['audio'], audio_input,
+                                              audio_pending, f"{stem}_audio", 'audio')
+
+            if audio_output and isinstance(audio_output, dict) and audio_output.get('audio'):
+                results['audio'] = str(audio_output['audio'])
+                if path:
+                    results['files'].append(path)
                 print("   ✅ Audio generated!")
+            else:
+                print("   ❌ Audio failed: no audio in output")
 
         except Exception as e:
             print(f"   ❌ Audio failed: {e}")
 
-        # Save results (handle FileOutput objects)
-        timestamp = int(time.time())
-        metadata_path = self.output_dir / f"fast_{theme}_{timestamp}.json"
-
-        # Convert FileOutput objects to strings
-        serializable_results = {}
-        for key, value in results.items():
-            if isinstance(value, list):
-                serializable_results[key] = [str(v) if hasattr(v, '__dict__') else v for v in value]
-            elif hasattr(value, '__dict__'):
-                serializable_results[key] = str(value)
-            else:
-                serializable_results[key] = value
+        # Save results (outputs were already reduced to URL strings)
+        metadata_path = self.output_dir / f"{stem}.json"
 
         with open(metadata_path, 'w') as f:
-            json.dump(serializable_results, f, indent=2, default=str)
+            json.dump(results, f, indent=2)
 
         # Display results
         print(f"\n✨ PRODUCTION COMPLETE ✨")
@@ -153,6 +172,50 @@ class FastCursedGenerator:
 
         return results
 
+    def _start(self, model, input_params):
+        """Cache entry, engine future, or None (run on demand) for one prediction"""
+        entry = self.cache.get(model, input_params) if self.cache else None
+        if entry:
+            return entry
+        if self.engine:
+            return self.engine.submit(model, input_params)
+        return None
+
+    def _finish(self, model, input_params, pending, save_as, kind='image'):
+        """
+        Resolve a prediction started by _start and stream its primary file
+        to output_dir/<save_as>.<ext>; returns (output, saved path)
+        """
+        # A cache hit keeps its original URLs for the results; only the
+        # download reads the stored copy, which may later be evicted
+        cached = hasattr(pending, 'local_output')
+        if cached:
+            output, local = pending.output, pending.local_output()
+        elif pending is not None:
+            output = local = pending.result()
+        else:
+            output = local = self.client.run(model, input=input_params)
+
+        primary, source = self._primary(output), self._primary(local)
+        path = None
+        if source:
+            dest = self.output_dir / asset_filename(save_as, primary, kind)
+            download = self.downloader.fetch(source, dest)
+            path = download.path if download.ok else None
+
+        if output and self.cache and not cached:
+            self.cache.put(model, input_params, output,
+                           files={str(primary): path} if path else None)
+        return output, path
+
+    @staticmethod
+    def _primary(output):
+        """The file an output is saved as: first image, or the audio track"""
+        primary = output[0] if isinstance(output, list) and output else output
+        if isinstance(primary, dict):
+            primary = primary.get('audio')
+        return primary
+
 
 if __name__ == "__main__":
     print("""
@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+"""
+Replicate Stand-In - Local fake of the predictions API for offline testing
+Completes predictions after a simulated latency, fires completion webhooks
+and serves output files. Payloads follow the replicate_metadata_*.json
+export format
+"""
+
+import hashlib
+import heapq
+import itertools
+import json
+import random
+import threading
+import time
+import urllib.request
+from datetime import datetime, timedelta, timezone
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from metadata_export import iter_export
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def export_payloads(metadata_path: str) -> Iterator[Dict[str, Any]]:
+    """Yield completion payloads for every prediction in a metadata export"""
+    for record in iter_export(metadata_path):
+        yield {
+            'id': record['id'],
+            'model': record.get('model'),
+            'version': record.get('version', ''),
+            'status': record.get('status', 'succeeded'),
+            'input': record.get('input', {}),
+            'output': record.get('output'),
+            'error': record.get('error'),
+            'logs': record.get('logs', ''),
+            'metrics': record.get('metrics', {}),
+            'created_at': record.get('created_at'),
+            'started_at': record.get('started_at', record.get('created_at')),
+            'completed_at': record.get('completed_at', record.get('created_at')),
+            'urls': record.get('urls', {}),
+        }
+
+
+def post_webhook(url: str, payload: Dict[str, Any], timeout: float = 10.0):
+    """POST one completion payload to a webhook URL"""
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode(),
+        headers={'Content-Type': 'application/json'}, method='POST')
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.status
+
+
+def replay_export(metadata_path: str, webhook_url: str, delay: float = 0.0) -> int:
+    """Replay an export's predictions as completion webhooks; returns count sent"""
+    sent = 0
+    for payload in export_payloads(metadata_path):
+        post_webhook(webhook_url, payload)
+        sent += 1
+        if delay:
+            time.sleep(delay)
+    return sent
+
+
+class _Server(ThreadingHTTPServer):
+    """Threaded server with a listen backlog sized for bursts"""
+    daemon_threads = True
+    request_queue_size = 256
+
+
+class ReplicateStandIn:
+    """
+    Threaded HTTP server implementing the parts of the Replicate API the
+    pipeline uses:
+
+        POST /v1/predictions                      (version=...)
+        POST /v1/models/{owner}/{name}/predictions
+        GET  /v1/predictions/{id}
+        POST /v1/predictions/{id}/cancel
+        GET  /files/{name}                        (deterministic bytes, Range)
+        POST /v1/files                            (multipart upload)
+        GET  /v1/files/{id}, /v1/files/{id}/download, DELETE /v1/files/{id}
+
+    Point a client at it with replicate.Client(base_url=standin.base_url).
+    Each prediction succeeds after a latency drawn from `latency`.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 latency: Tuple[float, float] = (0.2, 1.0),
+                 file_size: int = 64 * 1024, fail_rate: float = 0.0,
+                 rate_limit: Optional[float] = None, seed: Optional[int] = None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.file_size = file_size
+        self.fail_rate = fail_rate
+        self.rate_limit = rate_limit  # creates per second before 429s
+        self.stats = {'created': 0, 'gets': 0, 'webhooks': 0, 'file_bytes': 0,
+                      'throttled': 0, 'uploads': 0}
+        self._allowance = rate_limit or 0.0
+        self._allowance_at = time.time()
+
+        self._random = random.Random(seed)
+        self._ids = itertools.count(1)
+        self._predictions: Dict[str, Dict[str, Any]] = {}
+        self._uploads: Dict[str, Tuple[Dict[str, Any], bytes]] = {}
+        self._due = []  # (ready_at, id) heap for webhook delivery
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._running = False
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        self._server = _Server((self.host, self.port), self._handler())
+        self.port = self._server.server_address[1]
+        self._running = True
+        threading.Thread(target=self._server.serve_forever, daemon=True,
+                         name='replicate-standin').start()
+        threading.Thread(target=self._deliver_webhooks, daemon=True,
+                         name='replicate-standin-webhooks').start()
+        return self
+
+    def stop(self):
+        with self._lock:
+            self._running = False
+            self._wakeup.notify_all()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # -- prediction lifecycle ---------------------------------------------
+
+    def throttled(self) -> Optional[float]:
+        """Seconds until the next create is allowed, or None if allowed now"""
+        if not self.rate_limit:
+            return None
+        with self._lock:
+            now = time.time()
+            self._allowance = min(self.rate_limit,
+                                  self._allowance + (now - self._allowance_at) * self.rate_limit)
+            self._allowance_at = now
+            if self._allowance >= 1:
+                self._allowance -= 1
+                return None
+            self.stats['throttled'] += 1
+            return (1 - self._allowance) / self.rate_limit
+
+    def create(self, model: str, version: str, body: Dict[str, Any],
+               wait: float = 0.0) -> Dict[str, Any]:
+        """Create a prediction; with `wait` (Prefer: wait) hold until done"""
+        prediction_id = f"standin{next(self._ids):012d}"
+        ready_at = time.time() + self._random.uniform(*self.latency)
+        record = {
+            'id': prediction_id,
+            'model': model,
+            'version': version,
+            'status': 'starting',
+            'input': body.get('input', {}),
+            'output': None,
+            'error': None,
+            'logs': '',
+            'metrics': {},
+            'created_at': _now_iso(),
+            'started_at': None,
+            'completed_at': None,
+            'urls': {
+                'get': f"{self.base_url}/v1/predictions/{prediction_id}",
+                'cancel': f"{self.base_url}/v1/predictions/{prediction_id}/cancel",
+                'web': f"{self.base_url}/p/{prediction_id}",
+            },
+            '_ready_at': ready_at,
+            '_fails': self._random.random() < self.fail_rate,
+            '_webhook': body.get('webhook'),
+        }
+        with self._lock:
+            self._predictions[prediction_id] = record
+            self.stats['created'] += 1
+            if record['_webhook']:
+                heapq.heappush(self._due, (ready_at, prediction_id))
+                self._wakeup.notify()
+        if wait:
+            time.sleep(max(0.0, min(wait, ready_at - time.time())))
+            with self._lock:
+                return self._public(self._advance(record))
+        return self._public(record)
+
+    @staticmethod
+    def infer_model(body: Dict[str, Any]) -> str:
+        """Guess the model family for version-only submissions from the input"""
+        inputs = body.get('input', {})
+        if 'prompt_a' in inputs:
+            return 'riffusion/riffusion'
+        if 'input_image' in inputs:
+            return 'stability-ai/stable-video-diffusion'
+        if 'num_frames' in inputs:
+            return 'standin/video'
+        return 'standin/image'
+
+    def get(self, prediction_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._predictions.get(prediction_id)
+            self.stats['gets'] += 1
+            return self._public(self._advance(record)) if record else None
+
+    def cancel(self, prediction_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._predictions.get(prediction_id)
+            if record and record['status'] not in ('succeeded', 'failed', 'canceled'):
+                record['status'] = 'canceled'
+                record['completed_at'] = _now_iso()
+            return self._public(record) if record else None
+
+    def upload(self, filename: str, content_type: str, data: bytes,
+               metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Store an uploaded input file; returns its Files API record"""
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            file_id = f"standinfile{next(self._ids):09d}"
+            record = {
+                'id': file_id, 'name': filename, 'content_type': content_type,
+                'size': len(data), 'etag': hashlib.md5(data).hexdigest(),
+                'checksums': {'sha256': hashlib.sha256(data).hexdigest()},
+                'metadata': metadata or {},
+                'created_at': now.isoformat().replace('+00:00', 'Z'),
+                'expires_at': (now + timedelta(days=1)).isoformat().replace('+00:00', 'Z'),
+                'urls': {'get': f"{self.base_url}/v1/files/{file_id}/download"},
+            }
+            self._uploads[file_id] = (record, data)
+            self.stats['uploads'] += 1
+        return record
+
+    def _advance(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Move a record along starting -> processing -> terminal by the clock"""
+        if record['status'] in ('succeeded', 'failed', 'canceled'):
+            return record
+        now = time.time()
+        if now >= record['_ready_at']:
+            record['completed_at'] = _now_iso()
+            record['started_at'] = record['started_at'] or record['completed_at']
+            if record['_fails']:
+                record['status'] = 'failed'
+                record['error'] = 'Stand-in simulated failure'
+            else:
+                record['status'] = 'succeeded'
+                record['output'] = self._output_for(record)
+                record['metrics'] = {'predict_time': round(
+                    record['_ready_at'] - self._created_ts(record), 3)}
+        elif record['status'] == 'starting':
+            record['status'] = 'processing'
+            record['started_at'] = _now_iso()
+        return record
+
+    @staticmethod
+    def _created_ts(record) -> float:
+        created = datetime.strptime(record['created_at'], '%Y-%m-%dT%H:%M:%S.%fZ')
+        return created.replace(tzinfo=timezone.utc).timestamp()
+
+    def _output_for(self, record: Dict[str, Any]) -> Any:
+        model = record['model']
+        base = f"{self.base_url}/files/{record['id']}"
+        if 'riffusion' in model:
+            return {'audio': f"{base}.wav", 'spectrogram': f"{base}.jpg"}
+        if 'llama' in model or 'mixtral' in model or 'claude' in model:
+            text = f"{record['input'].get('prompt', '')}, cinematic lighting, rich detail"
+            return [word + ' ' for word in text.split()]
+        if any(key in model for key in ('video', 'cogvideox', 'zeroscope',
+                                         'animate', 'i2vgen')):
+            return f"{base}.mp4"
+        if 'musicgen' in model:
+            return f"{base}.wav"
+        return [f"{base}.png"]
+
+    @staticmethod
+    def _public(record: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: v for k, v in record.items() if not k.startswith('_')}
+
+    def _deliver_webhooks(self):
+        while True:
+            with self._lock:
+                while self._running and (not self._due or self._due[0][0] > time.time()):
+                    timeout = self._due[0][0] - time.time() if self._due else None
+                    self._wakeup.wait(timeout)
+                if not self._running:
+                    return
+                _, prediction_id = heapq.heappop(self._due)
+                record = self._advance(self._predictions[prediction_id])
+                payload, url = self._public(record), record['_webhook']
+            try:
+                post_webhook(url, payload)
+                self.stats['webhooks'] += 1
+            except Exception:
+                pass
+
+    def file_bytes(self, name: str) -> bytes:
+        """Deterministic content for a served output file"""
+        seed = hashlib.sha256(name.encode()).digest()
+        chunk = seed * (1024 // len(seed))
+        return (chunk * (self.file_size // len(chunk) + 1))[:self.file_size]
+
+    # -- HTTP --------------------------------------------------------------
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _json(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _body(self):
+                length = int(self.headers.get('Content-Length', 0))
+                return json.loads(self.rfile.read(length) or b'{}')
+
+            def _prefer_wait(self) -> float:
+                prefer = self.headers.get('Prefer', '')
+                if not prefer.startswith('wait'):
+                    return 0.0
+                _, _, seconds = prefer.partition('=')
+                return float(seconds or 60)
+
+            def _throttle(self, wait):
+                body = json.dumps({
+                    'title': 'Request was throttled',
+                    'detail': f"Request was throttled. Expected available in {wait:.2f} seconds.",
+                    'status': 429}).encode()
+                self.send_response(429)
+                self.send_header('Content-Type', 'application/problem+json')
+                self.send_header('Retry-After', f"{wait:.2f}")
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                parts = self.path.strip('/').split('/')
+                wait = standin.throttled() if parts[-1] == 'predictions' else None
+                if wait is not None:
+                    self._body()
+                    self._throttle(wait)
+                    return
+                if parts == ['v1', 'files']:
+                    self._upload()
+                elif parts == ['v1', 'predictions']:
+                    body = self._body()
+                    self._json(201, standin.create(standin.infer_model(body),
+                                                   body.get('version', ''), body,
+                                                   wait=self._prefer_wait()))
+                elif len(parts) == 5 and parts[:2] == ['v1', 'models'] and parts[4] == 'predictions':
+                    body = self._body()
+                    self._json(201, standin.create(f"{parts[2]}/{parts[3]}", '', body,
+                                                   wait=self._prefer_wait()))
+                elif len(parts) == 4 and parts[:2] == ['v1', 'predictions'] and parts[3] == 'cancel':
+                    record = standin.cancel(parts[2])
+                    self._json(200 if record else 404, record or {'detail': 'Not found'})
+                else:
+                    self._json(404, {'detail': 'Not found'})
+
+            def do_GET(self):
+                parts = self.path.strip('/').split('/')
+                if len(parts) == 3 and parts[:2] == ['v1', 'predictions']:
+                    record = standin.get(parts[2])
+                    self._json(200 if record else 404, record or {'detail': 'Not found'})
+                elif len(parts) == 2 and parts[0] == 'files':
+                    self._file(parts[1])
+                elif len(parts) in (3, 4) and parts[:2] == ['v1', 'files']:
+                    record, data = standin._uploads.get(parts[2], (None, None))
+                    if record is None or (len(parts) == 4 and parts[3] != 'download'):
+                        self._json(404, {'detail': 'Not found'})
+                    elif len(parts) == 3:
+                        self._json(200, record)
+                    else:
+                        self.send_response(200)
+                        self.send_header('Content-Type', record['content_type'])
+                        self.send_header('Content-Length', str(len(data)))
+                        self.end_headers()
+                        self.wfile.write(data)
+                elif len(parts) == 6 and parts[:2] == ['v1', 'models'] and parts[4] == 'versions':
+                    # replicate.run looks up versioned refs before waiting
+                    self._json(200, {'id': parts[5], 'created_at': '2025-01-01T00:00:00Z',
+                                     'cog_version': '0.9.0', 'openapi_schema': {}})
+                else:
+                    self._json(404, {'detail': 'Not found'})
+
+            def do_DELETE(self):
+                parts = self.path.strip('/').split('/')
+                if len(parts) == 3 and parts[:2] == ['v1', 'files'] and \
+                        standin._uploads.pop(parts[2], None):
+                    self.send_response(204)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                else:
+                    self._json(404, {'detail': 'Not found'})
+
+            def _upload(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = self.rfile.read(length)
+                message = BytesParser(policy=policy.HTTP).parsebytes(
+                    f"Content-Type: {self.headers.get('Content-Type', '')}\r\n\r\n".encode() + body)
+                fields = {part.get_param('name', header='content-disposition'): part
+                          for part in message.iter_parts()} if message.is_multipart() else {}
+                content = fields.get('content')
+                if content is None:
+                    self._json(422, {'detail': 'content is required'})
+                    return
+                metadata = fields.get('metadata')
+                self._json(201, standin.upload(
+                    content.get_filename() or 'file', content.get_content_type(),
+                    content.get_payload(decode=True) or b'',
+                    json.loads(metadata.get_payload(decode=True)) if metadata else None))
+
+            def _file(self, name):
+                data = standin.file_bytes(name)
+                etag = '"' + hashlib.sha256(data).hexdigest()[:32] + '"'
+                start, status = 0, 200
+                range_header = self.headers.get('Range', '')
+                if range_header.startswith('bytes=') and self.headers.get('If-Range', etag) == etag:
+                    start = int(range_header[6:].split('-')[0] or 0)
+                    status = 206
+                if start and start >= len(data):
+                    # Like a CDN: a range past the end is unsatisfiable
+                    self.send_response(416)
+                    self.send_header('Content-Range', f"bytes */{len(data)}")
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body = data[start:]
+                self.send_response(status)
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', etag)
+                self.send_header('Accept-Ranges', 'bytes')
+                if status == 206:
+                    self.send_header('Content-Range',
+                                     f"bytes {start}-{len(data) - 1}/{len(data)}")
+                self.end_headers()
+                # Counted before writing: the client may finish reading first
+                standin.stats['file_bytes'] += len(body)
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Local Replicate stand-in server')
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--replay', metavar='EXPORT_JSON',
+                        help='Replay an export as webhooks instead of serving')
+    parser.add_argument('--webhook', help='Webhook URL for --replay')
+    args = parser.parse_args()
+
+    if args.replay:
+        count = replay_export(args.replay, args.webhook)
+        print(f"✅ Replayed {count} completion payloads to {args.webhook}")
+    else:
+        standin = ReplicateStandIn(port=args.port).start()
+        print(f"🧪 Replicate stand-in at {standin.base_url}")
+        print(f"   export REPLICATE_BASE_URL={standin.base_url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            standin.stop()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Scheduler - Priority classes, weighted fair share and shortest-job-first
+Decides which queued campaign a free worker takes next, so a few premium
+video campaigns can't starve a stream of draft requests
+"""
+
+from typing import Any, Dict, Iterable, Optional
+
+# Lower runs first; drafts are the latency-sensitive class
+PRIORITY_CLASSES = {'draft': 0, 'standard': 1, 'premium': 2}
+
+# Seconds a campaign of each shape takes before there's history to go on
+STATIC_COSTS = {'draft': 15.0, 'standard': 30.0, 'premium': 60.0}
+VIDEO_COST = {'draft': 60.0, 'standard': 120.0, 'premium': 240.0}
+
+
+def priority_class(spec: Dict[str, Any], priority=None) -> int:
+    """Explicit priority (class name or number), else the campaign's quality tier"""
+    if priority is None:
+        priority = spec.get('quality', 'standard')
+    if isinstance(priority, str):
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"unknown priority class: {priority}")
+        return PRIORITY_CLASSES[priority]
+    return int(priority)
+
+
+def job_shape(spec: Dict[str, Any]) -> str:
+    """Cost bucket a campaign falls in: quality tier plus video or not"""
+    quality = spec.get('quality', 'standard')
+    return f"{quality}/{'video' if spec.get('include_video') else 'still'}"
+
+
+def static_cost(spec: Dict[str, Any]) -> float:
+    quality = spec.get('quality', 'standard')
+    cost = STATIC_COSTS.get(quality, STATIC_COSTS['standard'])
+    if spec.get('include_video'):
+        cost += VIDEO_COST.get(quality, VIDEO_COST['standard'])
+    return cost
+
+
+class Scheduler:
+    """
+    Chooses among claimable jobs, grouped by (priority class, client):
+
+    1. Lowest priority class first. A group's class improves by one for
+       every `aging` seconds its oldest job has waited, so heavy classes
+       are delayed but never starved.
+    2. Within the class, the client with the least weighted service so far
+       (expected seconds / weight), i.e. weighted fair queuing.
+    3. Within that client, the shortest expected job - or the oldest one
+       once the group has aged.
+
+    `limits` caps how many jobs of a class may run at once across all
+    workers ({'premium': 2}), keeping capacity free for drafts.
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None,
+                 limits: Optional[Dict[str, int]] = None, aging: float = 300.0):
+        self.weights = weights or {}
+        self.limits = {priority_class({}, name): n for name, n in (limits or {}).items()}
+        self.aging = aging
+
+    def weight(self, client: str) -> float:
+        return self.weights.get(client, 1.0)
+
+    def pick(self, groups: Iterable[Dict[str, Any]], running: Dict[int, int],
+             served: Dict[str, float], now: float) -> Optional[Dict[str, Any]]:
+        """
+        groups: one row per (priority, client) with 'shortest_seq',
+        'oldest_seq' and 'oldest' (enqueue time). Returns the chosen
+        group with 'seq' set, or None if nothing may run.
+        """
+        best, best_key = None, None
+        for group in groups:
+            if running.get(group['priority'], 0) >= self.limits.get(group['priority'], float('inf')):
+                continue
+            boost = int((now - group['oldest']) // self.aging) if self.aging else 0
+            key = (group['priority'] - boost, served.get(group['client'], 0.0), group['oldest'])
+            if best_key is None or key < best_key:
+                best = dict(group, seq=group['oldest_seq'] if boost else group['shortest_seq'])
+                best_key = key
+        return best
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for concurrent asset downloads (against the local Replicate stand-in)
+"""
+
+import base64
+
+import pytest
+
+from asset_downloader import AssetDownloader, asset_filename
+from http_client import PooledClient
+from replicate_standin import ReplicateStandIn
+
+
+@pytest.fixture
+def standin():
+    server = ReplicateStandIn(file_size=200 * 1024).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def downloader(standin):
+    client = PooledClient(base_url=standin.base_url)
+    yield AssetDownloader(client=client, chunk_size=16 * 1024, retries=0)
+    client.close()
+
+
+def test_filenames_keep_the_source_extension():
+    assert asset_filename('image_1', 'https://replicate.delivery/x/out-0.webp') == 'image_1.webp'
+    assert asset_filename('video', 'https://replicate.delivery/x/out', 'video') == 'video.mp4'
+    assert asset_filename('audio', 'data:audio/wav;base64,AAAA', 'audio') == 'audio.wav'
+
+
+def test_fetch_all_streams_every_file_in_order(tmp_path, standin, downloader):
+    names = [f"{n}.png" for n in range(6)]
+    results = downloader.fetch_all([(f"{standin.base_url}/files/{name}", tmp_path / name)
+                                    for name in names])
+    assert [r.path for r in results] == [str(tmp_path / name) for name in names]
+    for name, result in zip(names, results):
+        assert result.ok and result.size == result.expected == 200 * 1024
+        assert (tmp_path / name).read_bytes() == standin.file_bytes(name)
+    assert not list(tmp_path.glob('*.part'))
+
+
+def test_failed_fetch_leaves_no_file(tmp_path, standin, downloader):
+    [result] = downloader.fetch_all([(f"{standin.base_url}/missing/a.png", tmp_path / 'a.png')])
+    assert not result.ok and '404' in result.error
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_local_files_and_data_uris_are_not_fetched(tmp_path, standin, downloader):
+    cached = tmp_path / 'cached.png'
+    cached.write_bytes(b'cached bytes')
+    data = 'data:image/png;base64,' + base64.b64encode(b'inline bytes').decode()
+
+    results = downloader.fetch_all([(str(cached), tmp_path / 'out' / 'a.png'),
+                                    (data, tmp_path / 'out' / 'b.png')])
+    assert all(r.ok for r in results)
+    assert (tmp_path / 'out' / 'a.png').read_bytes() == b'cached bytes'
+    assert (tmp_path / 'out' / 'b.png').read_bytes() == b'inline bytes'
+    assert standin.stats['file_bytes'] == 0
+
+
+def test_download_campaign_records_paths_and_skips_saved_files(tmp_path, standin, downloader):
+    results = {
+        'images': [{'index': 1, 'url': f"{standin.base_url}/files/hero.png"},
+                   {'index': 2, 'url': f"{standin.base_url}/files/detail.webp"}],
+        'video': f"{standin.base_url}/files/clip.mp4",
+    }
+    (tmp_path / 'image_1.png').write_bytes(b'saved on completion')
+
+    downloads = downloader.download_campaign(results, tmp_path)
+    assert [d.skipped for d in downloads] == [True, False, False]
+    assert results['images'][0]['local_path'] == 'image_1.png'
+    assert results['images'][1]['local_path'] == 'image_2.webp'
+    assert results['video_path'] == 'video.mp4'
+    assert (tmp_path / 'image_1.png').read_bytes() == b'saved on completion'
+    assert standin.stats['file_bytes'] == 2 * 200 * 1024
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests for the content-addressed asset store and its hardlinked views
+"""
+
+import os
+import zipfile
+
+import pytest
+
+from asset_store import AssetStore, date_views
+
+
+@pytest.fixture
+def store(tmp_path):
+    return AssetStore(str(tmp_path / 'store'))
+
+
+def test_identical_files_are_stored_once(store, tmp_path):
+    campaign = tmp_path / 'campaign'
+    campaign.mkdir()
+    for name in ('a.png', 'b.png'):
+        (campaign / name).write_bytes(b'same pixels')
+    digests = store.ingest_tree(campaign)
+    assert len(set(digests.values())) == 1
+    assert store.usage()['blobs'] == 1
+    assert store.stats['deduplicated'] == 1 and store.stats['bytes_saved'] == len(b'same pixels')
+
+    # Both paths are now hardlinks of the one blob
+    blob = store.blob_path(digests[str(campaign / 'a.png')])
+    assert os.path.samefile(campaign / 'a.png', blob)
+    assert os.path.samefile(campaign / 'b.png', blob)
+    assert blob.stat().st_nlink == 3
+
+
+def test_ingest_tree_skips_partial_and_hidden_files(store, tmp_path):
+    campaign = tmp_path / 'campaign'
+    campaign.mkdir()
+    (campaign / 'image_1.png').write_bytes(b'done')
+    (campaign / 'video.mp4.part').write_bytes(b'half')
+    (campaign / '.sync_state.json').write_text('{}')
+    assert list(store.ingest_tree(campaign)) == [str(campaign / 'image_1.png')]
+
+
+def test_views_replace_stale_files(store, tmp_path):
+    digest = store.put_stream([b'new ', b'bytes'])
+    view = tmp_path / 'by-model' / 'flux' / 'a.png'
+    view.parent.mkdir(parents=True)
+    view.write_bytes(b'old bytes')
+
+    store.link(digest, view)
+    assert view.read_bytes() == b'new bytes'
+    assert os.path.samefile(view, store.blob_path(digest))
+    assert store.link(digest, view) == view  # Already a view: untouched
+
+
+def test_symlink_views(tmp_path):
+    store = AssetStore(str(tmp_path / 'store'), link='symlink')
+    view = store.link(store.put_stream([b'x']), tmp_path / 'views' / 'a.png')
+    assert view.is_symlink() and view.read_bytes() == b'x'
+
+
+def test_zip_members_become_views(store, tmp_path):
+    zip_path = tmp_path / 'riffusion.zip'
+    with zipfile.ZipFile(zip_path, 'w') as archive:
+        archive.writestr('riffusion/track.wav', b'audio')
+        archive.writestr('riffusion/cover.png', b'same pixels')
+    (tmp_path / 'cover.png').write_bytes(b'same pixels')
+    store.ingest(tmp_path / 'cover.png')
+
+    store.ingest_zip(zip_path, prune=True)
+    assert (tmp_path / 'riffusion' / 'track.wav').read_bytes() == b'audio'
+    assert os.path.samefile(tmp_path / 'riffusion' / 'cover.png', tmp_path / 'cover.png')
+    assert not zip_path.exists()
+    assert store.usage()['blobs'] == 2
+
+
+def test_date_views_link_by_model_files(store, tmp_path):
+    by_model = tmp_path / 'by-model'
+    (by_model / 'flux').mkdir(parents=True)
+    (by_model / 'flux' / '2025-09-29_a.png').write_bytes(b'a')
+    assert date_views(store, by_model, tmp_path / 'by-date') == 1
+    assert os.path.samefile(tmp_path / 'by-date' / '2025-09-29' / '2025-09-29_a.png',
+                            by_model / 'flux' / '2025-09-29_a.png')
+
+
+def test_gc_keeps_blobs_with_views(store, tmp_path):
+    kept = store.link(store.put_stream([b'kept']), tmp_path / 'views' / 'kept.png')
+    symlinked = AssetStore(str(store.root), link='symlink')
+    symlinked.link(store.put_stream([b'symlinked']), tmp_path / 'views' / 'sym.png')
+    orphan = store.link(store.put_stream([b'orphan']), tmp_path / 'views' / 'orphan.png')
+    orphan.unlink()
+
+    assert store.gc([tmp_path / 'views']) == len(b'orphan')
+    assert store.usage()['blobs'] == 2
+    assert kept.read_bytes() == b'kept'
+    assert (tmp_path / 'views' / 'sym.png').read_bytes() == b'symlinked'
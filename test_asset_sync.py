@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Tests for resumable asset sync (against the local Replicate stand-in)
+"""
+
+import os
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from asset_store import AssetStore
+from asset_sync import AssetSync, predictions_from_api
+from http_client import PooledClient
+from replicate_standin import ReplicateStandIn
+
+
+@pytest.fixture
+def standin():
+    server = ReplicateStandIn(file_size=64 * 1024).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def client(standin):
+    client = PooledClient(base_url=standin.base_url)
+    yield client
+    client.close()
+
+
+def predictions(standin, *names):
+    return [{'id': f"pred{n:04d}", 'model': 'black-forest-labs/flux-schnell',
+             'status': 'succeeded', 'created_at': '2025-09-29T12:00:00Z',
+             'input': {'prompt': f"neon city {n}"}, 'output': [f"{standin.base_url}/files/{name}"]}
+            for n, name in enumerate(names)]
+
+
+def crash_before_rename(syncer, result, extra=b''):
+    """Put a synced file back as its .part, as if the rename never happened"""
+    path = result.path
+    os.replace(path, path + '.part')
+    with open(path + '.part', 'ab') as f:
+        f.write(extra)
+    entry = syncer.state['predictions'][result.prediction_id]['files'][result.url]
+    entry['complete'] = False
+    return entry
+
+
+def test_second_sync_skips_without_requests(tmp_path, standin, client):
+    syncer = AssetSync(tmp_path, client=client)
+    assert [r.action for r in syncer.sync(predictions(standin, 'a.png', 'b.png'))] == \
+        ['downloaded', 'downloaded']
+    fetched = standin.stats['file_bytes']
+
+    again = AssetSync(tmp_path, client=client)
+    assert [r.action for r in again.sync(predictions(standin, 'a.png', 'b.png'))] == \
+        ['skipped', 'skipped']
+    assert standin.stats['file_bytes'] == fetched
+
+
+def test_partial_file_resumes_with_range(tmp_path, standin, client):
+    syncer = AssetSync(tmp_path, client=client)
+    [result] = syncer.sync(predictions(standin, 'a.png'))
+    crash_before_rename(syncer, result)
+    os.truncate(result.path + '.part', 1000)
+
+    [resumed] = syncer.sync(predictions(standin, 'a.png'))
+    assert resumed.action == 'resumed'
+    assert resumed.transferred == 64 * 1024 - 1000
+    with open(resumed.path, 'rb') as f:
+        assert f.read() == standin.file_bytes('a.png')
+
+
+def test_complete_part_answered_416_is_finished(tmp_path, standin, client):
+    syncer = AssetSync(tmp_path, client=client)
+    [result] = syncer.sync(predictions(standin, 'a.png'))
+    crash_before_rename(syncer, result)
+    fetched = standin.stats['file_bytes']
+
+    [resumed] = syncer.sync(predictions(standin, 'a.png'))
+    assert (resumed.action, resumed.transferred, resumed.error) == ('resumed', 0, None)
+    assert standin.stats['file_bytes'] == fetched
+    assert not os.path.exists(resumed.path + '.part')
+    with open(resumed.path, 'rb') as f:
+        assert f.read() == standin.file_bytes('a.png')
+    assert [r.action for r in syncer.sync(predictions(standin, 'a.png'))] == ['skipped']
+
+
+def test_oversized_part_answered_416_is_fetched_again(tmp_path, standin, client):
+    syncer = AssetSync(tmp_path, client=client)
+    [result] = syncer.sync(predictions(standin, 'a.png'))
+    crash_before_rename(syncer, result, extra=b'garbage')
+
+    [again] = syncer.sync(predictions(standin, 'a.png'))
+    assert (again.action, again.error) == ('downloaded', None)
+    with open(again.path, 'rb') as f:
+        assert f.read() == standin.file_bytes('a.png')
+
+
+def test_deleted_view_is_relinked_from_the_store(tmp_path, standin, client):
+    store = AssetStore(tmp_path / '.store')
+    syncer = AssetSync(tmp_path, client=client, store=store)
+    [result] = syncer.sync(predictions(standin, 'a.png'))
+    fetched = standin.stats['file_bytes']
+    os.unlink(result.path)
+
+    [relinked] = syncer.sync(predictions(standin, 'a.png'))
+    assert relinked.action == 'relinked'
+    assert standin.stats['file_bytes'] == fetched
+    assert os.path.samefile(relinked.path, store.blob_path(
+        syncer.state['predictions'][result.prediction_id]['files'][result.url]['sha256']))
+
+
+class StubAPI:
+    """client.predictions.list() over an in-memory account, newest first"""
+
+    def __init__(self, standin):
+        self.standin = standin
+        self.account = []
+        self.predictions = self
+
+    def create(self, name):
+        created_at = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+        self.account.insert(0, SimpleNamespace(
+            id=f"pred_{name}", model='black-forest-labs/flux-schnell', version=None,
+            status='succeeded', input={'prompt': name}, created_at=created_at,
+            output=[f"{self.standin.base_url}/files/{name}.png"]))
+
+    def list(self, cursor=None):
+        return SimpleNamespace(results=list(self.account), next=None)
+
+
+def test_prediction_created_mid_sync_is_listed_next_time(tmp_path, standin, client):
+    api = StubAPI(standin)
+    api.create('a')
+
+    def listing():
+        yield from predictions_from_api(api)
+        api.create('b')  # Lands after the listing passed, while downloads run
+
+    syncer = AssetSync(tmp_path, client=client)
+    assert [r.url.rsplit('/', 1)[-1] for r in syncer.sync(listing())] == ['a.png']
+
+    again = AssetSync(tmp_path, client=client)
+    results = again.sync(predictions_from_api(api, since=again.state['last_run']))
+    assert {r.url.rsplit('/', 1)[-1]: r.action for r in results} == {
+        'a.png': 'skipped', 'b.png': 'downloaded'}
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests for the headless batch runner (against the local Replicate stand-in)
+"""
+
+import contextlib
+import io
+import json
+
+import pytest
+
+from batch_runner import BatchRunner, check_spec, completed_lines
+from campaign_journal import JOURNAL_FILE, read_journal
+
+
+def run(director, tmp_path, lines, resume=False):
+    manifest, output = tmp_path / 'spring.jsonl', tmp_path / 'spring.results.jsonl'
+    manifest.write_text(''.join(line + '\n' for line in lines))
+    runner = BatchRunner(director, concurrency=2)
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        stats = runner.run(str(manifest), str(output), resume=resume)
+    return stats, completed_lines(str(output))
+
+
+@pytest.mark.parametrize('spec, message', [
+    ([1, 2], 'JSON object'),
+    ({'colour': 'red'}, 'unknown options'),
+    ({'id': '../up'}, 'id must be'),
+    ({'mode': 'noir', 'product_name': 'Wave'}, 'unknown mode'),
+    ({'mode': 'soft_brutalism'}, 'product_name'),
+    ({'brief_type': 'launch'}, 'unknown brief_type'),
+])
+def test_check_spec_rejects(spec, message):
+    with pytest.raises(ValueError, match=message):
+        check_spec(spec, {'product_launch': {}})
+
+
+def test_check_spec_accepts_modes_and_briefs():
+    check_spec({'mode': 'soft_brutalism', 'product_name': 'Wave', 'id': 'wave_1'})
+    check_spec({'brief_type': 'product_launch'}, {'product_launch': {}})
+
+
+def test_bad_lines_fail_alone(director, standin, tmp_path):
+    stats, records = run(director, tmp_path, [
+        '{"brief_type": "product_launch", "id": "good"}',
+        '{"brief_type": "product_launch", "id": ',
+        '[1, 2]',
+        '"x"',
+        '{"mode": "noir", "product_name": "Wave"}',
+        '{"brief_type": "social_campaign", "id": "good"}',
+    ])
+
+    assert records[1]['status'] == 'succeeded'
+    assert {n: records[n]['status'] for n in range(2, 7)} == dict.fromkeys(range(2, 7), 'failed')
+    assert 'invalid JSON' in records[2]['error']
+    assert 'JSON object' in records[3]['error'] and 'JSON object' in records[4]['error']
+    assert 'unknown mode' in records[5]['error']
+    assert "duplicate id 'good' (line 1)" in records[6]['error']
+    assert (stats['succeeded'], stats['failed']) == (1, 5)
+    assert standin.stats['created'] == 4  # Only the good line ran
+
+
+def test_resume_skips_succeeded_lines_and_finishes_the_rest(director, standin, tmp_path):
+    lines = ['{"brief_type": "product_launch", "id": "one"}',
+             '{"brief_type": "product_launch", "id": "two"}']
+    run(director, tmp_path, lines)
+    assert standin.stats['created'] == 8
+
+    # Crash: "two" had only planned its jobs and has no result record yet
+    journal = director.output_dir / 'two' / JOURNAL_FILE
+    journal.write_text(''.join(json.dumps(e) + '\n' for e in read_journal(journal.parent)
+                               if e['event'] in ('started', 'planned')))
+    output = tmp_path / 'spring.results.jsonl'
+    output.write_text(''.join(line + '\n' for line in output.read_text().splitlines()
+                              if json.loads(line)['id'] == 'one'))
+
+    stats, records = run(director, tmp_path, lines, resume=True)
+    assert (stats['skipped'], stats['resumed'], stats['succeeded']) == (1, 1, 1)
+    assert records[2]['status'] == 'succeeded' and records[2]['resumed']
+    assert standin.stats['created'] == 12
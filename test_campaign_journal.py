@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Tests for the campaign journal and resuming campaigns from it (against
+the local Replicate stand-in)
+"""
+
+import contextlib
+import io
+import json
+
+import pytest
+
+from campaign_journal import JOURNAL_FILE, CampaignJournal, read_journal, repair_tail
+from prediction_engine import PredictionEngine
+
+
+def test_events_round_trip(tmp_path):
+    with CampaignJournal(tmp_path) as journal:
+        journal.record('started', plan={'quality': 'draft'})
+        journal.record('job', name='image_1', status='succeeded', output='a.png')
+    events = read_journal(tmp_path)
+    assert [e['event'] for e in events] == ['started', 'job']
+    assert events[1]['output'] == 'a.png'
+
+
+def test_missing_journal_reads_empty(tmp_path):
+    assert read_journal(tmp_path / 'nope') == []
+
+
+def test_torn_tail_is_cut_before_appending(tmp_path):
+    with CampaignJournal(tmp_path) as journal:
+        journal.record('started')
+    with open(tmp_path / JOURNAL_FILE, 'a') as f:
+        f.write('{"t": 1, "event": "jo')  # Crash mid-write
+
+    with CampaignJournal(tmp_path) as journal:
+        journal.record('job', name='image_1')
+    assert [e['event'] for e in read_journal(tmp_path)] == ['started', 'job']
+
+
+def test_complete_last_line_keeps_its_event(tmp_path):
+    path = tmp_path / JOURNAL_FILE
+    path.write_text('{"event": "started"}\n{"event": "job"}')
+    repair_tail(path)
+    assert path.read_text() == '{"event": "started"}\n{"event": "job"}\n'
+
+
+def test_torn_tail_longer_than_a_scan_step(tmp_path):
+    path = tmp_path / JOURNAL_FILE
+    path.write_text('{"event": "started"}\n{"event": "job", "output": "' + 'x' * 200_000)
+    repair_tail(path)
+    assert path.read_text() == '{"event": "started"}\n'
+
+
+def test_close_stops_the_sync_thread(tmp_path):
+    journal = CampaignJournal(tmp_path, sync_interval=0.01)
+    journal.record('started')
+    journal.close()
+    assert not journal._syncer.is_alive()
+    journal.record('ignored')  # Closed journals drop late records
+    assert len(read_journal(tmp_path)) == 1
+
+
+def quietly(fn, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def rewrite_journal(campaign_dir, keep):
+    """Simulate a crash: keep only the events `keep` accepts, plus a torn line"""
+    path = campaign_dir / JOURNAL_FILE
+    lines = [json.dumps(e) for e in read_journal(campaign_dir) if keep(e)]
+    path.write_text('\n'.join(lines) + '\n{"t": 1, "event": "job", "na')
+
+
+def test_resume_reruns_only_unfinished_jobs(director, standin):
+    quietly(director.create_campaign, 'product_launch', concurrent=True, campaign_id='c1')
+    assert standin.stats['created'] == 4
+    campaign_dir = director.output_dir / 'c1'
+
+    # image_1 finished; image_2 was submitted but not seen finishing;
+    # image_3 and audio never started
+    rewrite_journal(campaign_dir, lambda e: (
+        e['event'] in ('started', 'planned')
+        or (e['event'] == 'submitted' and e['name'] in ('image_1', 'image_2'))
+        or (e['event'] == 'job' and e['name'] == 'image_1')))
+
+    results = quietly(director.resume_campaign, 'c1')
+
+    # image_2 is re-polled by prediction id, image_3 and audio resubmitted
+    assert standin.stats['created'] == 6
+    assert sorted(image['index'] for image in results['images']) == [1, 2, 3]
+    assert results['audio']
+    events = read_journal(campaign_dir)
+    assert events[-1]['event'] == 'finished'
+    assert {e['name'] for e in events if e['event'] == 'job'} == {
+        'image_1', 'image_2', 'image_3', 'audio'}
+
+
+@pytest.mark.parametrize('use_engine', [False, True])
+def test_resume_resubmits_an_expired_prediction(director, standin, use_engine):
+    quietly(director.create_campaign, 'product_launch', concurrent=True, campaign_id='exp')
+    campaign_dir = director.output_dir / 'exp'
+    events = [e for e in read_journal(campaign_dir)
+              if e['event'] != 'finished' and e.get('name') != 'image_2']
+    planned = next(e for e in events if e['event'] == 'planned')
+    # image_2's prediction was submitted, then expired from the API (404)
+    events.append({'t': 1, 'event': 'submitted', 'name': 'image_2',
+                   'prediction_id': 'expired', 'job': planned['jobs']['image_2']})
+    (campaign_dir / JOURNAL_FILE).write_text(''.join(json.dumps(e) + '\n' for e in events))
+
+    engine = PredictionEngine(client=director.client, min_interval=0.05) if use_engine else None
+    if engine:
+        director.engine = engine.start()
+    try:
+        results = quietly(director.resume_campaign, 'exp')
+    finally:
+        if engine:
+            engine.stop()
+
+    assert standin.stats['created'] == 5
+    assert sorted(image['index'] for image in results['images']) == [1, 2, 3]
+
+
+def test_resume_of_a_finished_campaign_submits_nothing(director, standin):
+    quietly(director.create_campaign, 'product_launch', campaign_id='done')
+    quietly(director.resume_campaign, 'done')
+    assert standin.stats['created'] == 4
+
+
+def test_default_brief_is_journaled_resolved(director, standin):
+    quietly(director.create_campaign, None, campaign_id='nb')
+    started = read_journal(director.output_dir / 'nb')[0]
+    assert started['plan']['brief_type'] == 'product_launch'
+    assert quietly(director.rebuild_campaign, 'nb', dry_run=True) == {}
+
+
+def test_rebuild_of_a_retired_brief_is_a_clear_error(director, standin):
+    quietly(director.create_campaign, 'product_launch', campaign_id='old')
+    del director.briefs['product_launch']
+    with pytest.raises(ValueError, match='no longer exists'):
+        quietly(director.rebuild_campaign, 'old', dry_run=True)
+
+
+def test_unknown_campaign_is_not_resumable(director):
+    with pytest.raises(ValueError, match='No resumable journal'):
+        director.resume_campaign('missing')
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Tests for the campaign service HTTP API and remote worker leases (against
+the local Replicate stand-in)
+"""
+
+import contextlib
+import io
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from campaign_service import CampaignService
+from job_queue import JobQueue, RemoteQueue
+
+
+@pytest.fixture
+def service(director, tmp_path):
+    # No local workers: jobs stay queued until a test leases them
+    service = CampaignService(director, JobQueue(str(tmp_path / 'queue.db')), workers=0,
+                              port=0, poll_interval=0.1).start()
+    yield service
+    service.stop()
+
+
+def call(method, url, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            payload = response.read()
+            return response.status, json.loads(payload) if payload else None
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b'null')
+
+
+def test_submit_get_and_cancel(service):
+    status, job = call('POST', f"{service.url}/campaigns",
+                       {'brief_type': 'product_launch', 'id': 'launch_1', 'client': 'acme'})
+    assert status == 202 and job['id'] == 'launch_1' and job['status'] == 'queued'
+    assert call('GET', f"{service.url}/campaigns/launch_1")[1]['client'] == 'acme'
+    assert [j['id'] for j in call('GET', f"{service.url}/campaigns?status=queued")[1]] == ['launch_1']
+
+    status, cancelled = call('DELETE', f"{service.url}/campaigns/launch_1")
+    assert status == 200 and cancelled['status'] == 'cancelled'
+    assert call('GET', f"{service.url}/campaigns/missing")[0] == 404
+
+
+@pytest.mark.parametrize('body, message', [
+    ({'brief_type': 'launch'}, 'unknown brief_type'),
+    ({'mode': 'noir', 'product_name': 'Wave'}, 'unknown mode'),
+    ([{'brief_type': 'product_launch'}, {'colour': 'red'}], 'unknown options'),
+])
+def test_invalid_specs_are_refused_whole(service, body, message):
+    status, error = call('POST', f"{service.url}/campaigns", body)
+    assert status == 400 and message in error['error']
+    assert service.queue.counts() == {}
+
+
+
+@pytest.mark.parametrize('path, body, message', [
+    ('leases', [], 'JSON object'),
+    ('leases', {'wait': 'soon'}, 'wait must be a number'),
+    ('leases', {'lease': -1}, 'lease must be a number'),
+    ('leases/launch_1/heartbeat', {}, 'token must be a string'),
+    ('leases/launch_1/finish', {'token': 'x'}, 'status must be one of'),
+    ('leases/launch_1/finish', {'token': 'x', 'status': 'done'}, 'status must be one of'),
+    ('leases/launch_1/finish', {'token': 'x', 'status': 'failed', 'result': 'oops'},
+     'result must be a JSON object'),
+])
+def test_invalid_lease_requests_are_refused(service, path, body, message):
+    service.submit({'brief_type': 'product_launch', 'id': 'launch_1'})
+    status, error = call('POST', f"{service.url}/{path}", body)
+    assert status == 400 and message in error['error']
+    assert service.queue.get('launch_1')['status'] == 'queued'
+
+
+def test_remote_lease_heartbeat_and_finish(service):
+    remote = RemoteQueue(service.url)
+    assert remote.claim('node-b', lease=30) is None
+
+    service.submit({'brief_type': 'product_launch', 'id': 'launch_1'})
+    job = remote.claim('node-b', lease=30)
+    assert job['id'] == 'launch_1' and job['attempts'] == 1
+    assert remote.heartbeat('launch_1', job['lease_token'], 30)
+
+    assert not remote.finish('launch_1', 'stale-token', 'succeeded', {})
+    assert remote.finish('launch_1', job['lease_token'], 'succeeded', {'status': 'succeeded'})
+    assert service.queue.get('launch_1')['status'] == 'succeeded'
+    assert not remote.heartbeat('launch_1', job['lease_token'], 30)
+
+
+def test_claim_long_polls_until_a_job_arrives(service):
+    remote = RemoteQueue(service.url)
+    threading.Timer(0.2, service.submit, [{'brief_type': 'product_launch', 'id': 'late'}]).start()
+    started = time.monotonic()
+    job = remote.claim('node-b', wait=5)
+    assert job['id'] == 'late'
+    assert 0.15 < time.monotonic() - started < 2
+
+
+def test_worker_node_runs_leased_campaigns(service, director, standin):
+    worker = CampaignService(director, RemoteQueue(service.url), workers=1, serve=False,
+                             poll_interval=0.2)
+    with contextlib.redirect_stdout(io.StringIO()):
+        worker.start()
+        service.submit({'brief_type': 'product_launch', 'id': 'launch_1'})
+        deadline = time.monotonic() + 20
+        while service.queue.get('launch_1')['status'] in ('queued', 'running'):
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        worker.stop()
+
+    assert service.queue.get('launch_1')['status'] == 'succeeded'
+    assert worker.stats['finished'] == 1
+    assert standin.stats['created'] == 4
+
+
+class LosingQueue(RemoteQueue):
+    """A worker's view of the queue in which every heartbeat finds the lease lost"""
+
+    def heartbeat(self, job_id, token, lease=None):
+        return False
+
+
+def test_worker_abandons_a_campaign_whose_lease_is_lost(service, director, monkeypatch):
+    release = threading.Event()
+    run_job = director._run_job
+
+    def held(name, job, **kwargs):
+        release.wait(10)
+        return run_job(name, job, **kwargs)
+
+    monkeypatch.setattr(director, '_run_job', held)
+    worker = CampaignService(director, LosingQueue(service.url), workers=1, serve=False,
+                             poll_interval=0.1, lease=0.6)
+    journal = director.output_dir / 'launch_1' / 'campaign_journal.jsonl'
+    with contextlib.redirect_stdout(io.StringIO()):
+        worker.start()
+        service.submit({'brief_type': 'product_launch', 'id': 'launch_1'})
+        deadline = time.monotonic() + 10
+        while worker.stats['busy'] == 0:
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        while (job := service.queue.claim('node-c', lease=30)) is None:  # Once it expires
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        written = journal.stat().st_size
+
+        release.set()
+        while worker.stats['lost'] == 0:
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        worker.stop()
+
+    assert job['id'] == 'launch_1' and job['attempts'] == 2
+    assert journal.stat().st_size == written
+    assert not (director.output_dir / 'launch_1' / 'campaign_metadata.json').exists()
+    assert service.queue.get('launch_1')['worker'] == 'node-c'
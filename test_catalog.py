@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Tests for the campaign / prediction catalog
+"""
+
+import sqlite3
+
+import pytest
+
+from catalog import Catalog, model_name, parse_time
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = Catalog(str(tmp_path / 'catalog.db'))
+    yield catalog
+    catalog.close()
+
+
+def campaign(prompts, mode='mineral_futurism', timestamp=1_759_000_000):
+    return {
+        'mode': mode, 'product': 'wave', 'timestamp': timestamp,
+        'images': [{'index': n, 'prompt': prompt, 'url': f"https://replicate.delivery/{n}.png",
+                    'model': 'black-forest-labs/flux-schnell', 'local_path': f"image_{n}.png"}
+                   for n, prompt in enumerate(prompts, 1)],
+        'video': 'https://replicate.delivery/v.mp4', 'video_model': 'minimax/video-01',
+    }
+
+
+def test_helpers():
+    assert model_name('black-forest-labs/flux-schnell:abc') == 'flux-schnell'
+    assert parse_time('2025-09-29T00:00:00Z') == 1759104000
+    assert parse_time('1d') == pytest.approx(parse_time('24h'), abs=1)
+
+
+def test_search_filters_by_text_model_and_kind(catalog, tmp_path):
+    catalog.record_campaign(tmp_path / 'wave_1', campaign(['neon city at dusk', 'chrome wave']))
+    catalog.record_campaign(tmp_path / 'salem_2', campaign(['foggy harbor'], mode='salem'))
+
+    [hit] = catalog.search_assets('neon')
+    assert hit['campaign_id'] == 'wave_1' and hit['local_path'] == str(tmp_path / 'wave_1' / 'image_1.png')
+    assert len(catalog.search_assets(model='flux-schnell')) == 3
+    assert [a['name'] for a in catalog.search_assets(kind='video', mode='salem')] == ['video']
+    assert catalog.counts() == {'campaigns': 2, 'assets': 5, 'predictions': 0}
+
+
+@pytest.mark.parametrize('text', ['neon OR', 'neon"', 'NEAR(neon', 'prompt:neon', '-neon', 'neon*'])
+def test_fts_syntax_in_user_text_is_literal(catalog, tmp_path, text):
+    catalog.record_campaign(tmp_path / 'wave_1', campaign(['neon city']))
+    catalog.search_assets(text)  # Must not raise sqlite3.OperationalError
+    catalog.search_predictions(text)
+
+
+def test_reindexing_replaces_assets(catalog, tmp_path):
+    catalog.record_campaign(tmp_path / 'wave_1', campaign(['neon city', 'chrome wave']))
+    catalog.record_campaign(tmp_path / 'wave_1', campaign(['foggy harbor']))
+    assert catalog.search_assets('neon') == []
+    assert len(catalog.search_assets('harbor')) == 1
+    assert catalog.counts()['assets'] == 2
+
+
+def test_failed_reindex_keeps_the_previous_index(catalog, tmp_path):
+    catalog.record_campaign(tmp_path / 'wave_1', campaign(['neon city']))
+    broken = campaign(['chrome wave'])
+    broken['images'][0]['prompt'] = {'not': 'bindable'}
+    with pytest.raises(sqlite3.Error):
+        catalog.record_campaign(tmp_path / 'wave_1', broken)
+
+    assert len(catalog.search_assets('neon')) == 1
+    assert catalog.counts() == {'campaigns': 1, 'assets': 2, 'predictions': 0}
+
+
+def test_predictions_upsert_and_search(catalog):
+    record = {'id': 'p1', 'model': 'black-forest-labs/flux-schnell', 'status': 'processing',
+              'input': {'prompt': 'neon city'}, 'created_at': '2025-09-29T12:00:00Z'}
+    catalog.record_predictions([record], source='export')
+    catalog.record_predictions([{**record, 'status': 'succeeded', 'output': ['a.png']}])
+    catalog.record_local_paths({'p1': ['/assets/a.png']})
+
+    [hit] = catalog.search_predictions('neon', status='succeeded', since=parse_time('2025-09-29'))
+    assert hit['id'] == 'p1' and hit['source'] == 'export'
+    assert hit['local_paths'] == '["/assets/a.png"]'
+    assert catalog.search_predictions(until=parse_time('2025-09-29')) == []
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests for how the creative director runs jobs (against the local
+Replicate stand-in)
+"""
+
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from creative_director import CreativeDirector
+from http_client import PooledClient
+from prediction_cache import PredictionCache
+from prediction_engine import PredictionEngine
+from rate_limiter import RateGovernor
+from replicate_standin import ReplicateStandIn
+
+
+@pytest.fixture
+def standin():
+    server = ReplicateStandIn(latency=(0.05, 0.1), file_size=100 * 1024).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def client(standin):
+    client = PooledClient(base_url=standin.base_url)
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def director(client, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('REPLICATE_POLL_INTERVAL', '0.05')
+    return CreativeDirector(client=client, catalog=False,
+                            cache=PredictionCache(str(tmp_path / 'cache'), client=client),
+                            governor=RateGovernor(global_rate=500, global_burst=500))
+
+
+def image_job(director, tmp_path, prompt='neon city'):
+    job = director._image_job(1, prompt, 'standard', 'flux_schnell')
+    return {**job, 'save_as': str(tmp_path / 'campaign' / 'image_1')}
+
+
+def assert_saved_once(director, standin, tmp_path, output):
+    saved = tmp_path / 'campaign' / 'image_1.png'
+    assert saved.read_bytes() == standin.file_bytes(os.path.basename(output))
+
+    # The cache links the saved copy instead of fetching it again
+    director.cache.flush()
+    [blob] = director.cache.blob_dir.iterdir()
+    assert os.path.samefile(blob, saved)
+    assert standin.stats['file_bytes'] == 100 * 1024
+
+
+def test_run_job_saves_the_output_on_completion(director, standin, tmp_path):
+    output = director._run_job('image_1', image_job(director, tmp_path))
+    assert output.endswith('.png')
+    assert_saved_once(director, standin, tmp_path, output)
+
+
+def test_engine_job_saves_the_output_on_completion(director, standin, client, tmp_path):
+    director.engine = PredictionEngine(client=client)
+    with director.engine:
+        output = director._submit_job('image_1', image_job(director, tmp_path)).result(timeout=10)
+    assert_saved_once(director, standin, tmp_path, output)
+
+
+def test_cached_job_reuses_the_stored_copy(director, standin, tmp_path):
+    first = director._run_job('image_1', image_job(director, tmp_path))
+    director.cache.flush()
+    assert director._run_job('image_1', image_job(director, tmp_path)) == first
+    assert standin.stats['created'] == 1
+    assert standin.stats['file_bytes'] == 100 * 1024
+
+
+def timed_jobs(monkeypatch, director, delays):
+    """Run jobs through a _run_job that holds each job for its delay first;
+    returns {name: (started, finished)} and the peak number running at once"""
+    run_job, times, running = director._run_job, {}, []
+    lock = threading.Lock()
+    peak = [0]
+
+    def held(name, job, **kwargs):
+        with lock:
+            running.append(name)
+            peak[0] = max(peak[0], len(running))
+        started = time.monotonic()
+        try:
+            time.sleep(delays.get(name, 0))
+            return run_job(name, job, **kwargs)
+        finally:
+            with lock:
+                running.remove(name)
+                times[name] = (started, time.monotonic())
+
+    monkeypatch.setattr(director, '_run_job', held)
+    return times, peak
+
+
+def test_concurrent_brief_respects_max_workers(director, monkeypatch, standin):
+    times, peak = timed_jobs(monkeypatch, director, {f'image_{n}': 0.2 for n in (1, 2, 3)})
+    director.create_campaign(brief_type='product_launch', include_video=True,
+                             concurrent=True, max_workers=2, campaign_id='launch_1')
+    assert set(times) == {'image_1', 'image_2', 'image_3', 'video', 'audio'}
+    assert peak[0] == 2
+    assert standin.stats['created'] == 5
+
+
+def test_video_starts_once_image_1_lands(director, monkeypatch):
+    times, _ = timed_jobs(monkeypatch, director, {'image_2': 1.0, 'image_3': 1.0})
+    director.create_campaign(brief_type='product_launch', include_video=True,
+                             concurrent=True, max_workers=8, campaign_id='launch_1')
+    assert times['video'][0] >= times['image_1'][1]
+    assert times['video'][0] < min(times['image_2'][1], times['image_3'][1])
+
+
+def test_images_stay_in_index_order_when_finishing_out_of_order(director, monkeypatch):
+    times, _ = timed_jobs(monkeypatch, director, {'image_1': 0.8, 'image_2': 0.4})
+    results = director.create_campaign(brief_type='product_launch', concurrent=True,
+                                       campaign_id='launch_1')
+    assert times['image_3'][1] < times['image_2'][1] < times['image_1'][1]
+    assert [image['index'] for image in results['images']] == [1, 2, 3]
+
+    metadata = json.loads((director.output_dir / 'launch_1' / 'campaign_metadata.json').read_text())
+    assert [image['index'] for image in metadata['images']] == [1, 2, 3]
+    assert [image['local_path'] for image in metadata['images']] == [
+        f"image_{n}.png" for n in (1, 2, 3)]
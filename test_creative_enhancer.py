@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Tests for prompt enhancement: memoization, batching and the latency
+budget, with a scripted LLM stub in place of Replicate
+"""
+
+import re
+import threading
+import time
+
+import pytest
+
+from creative_enhancer import CreativeEnhancer
+from enhancement_cache import EnhancementCache
+
+
+class StubLLM:
+    """client.run / client.stream answering 'vivid <prompt>' for each prompt asked"""
+
+    def __init__(self, delay=0.0, fail=False, drop=()):
+        self.delay = delay
+        self.fail = fail
+        self.drop = set(drop)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def run(self, model, input):
+        with self._lock:
+            self.calls.append(input['prompt'])
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError('LLM down')
+        numbered = re.findall(r'^\s*(\d+)\. (.*)$', input['prompt'], re.M)
+        if numbered:
+            return [f"{n}. vivid {p}\n" for n, p in numbered if int(n) not in self.drop]
+        return [f"vivid {re.search(r'Original: (.*)', input['prompt']).group(1)}"]
+
+    def stream(self, model, input):
+        yield from self.run(model, input)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return EnhancementCache(str(tmp_path / 'enhancements.db'))
+
+
+def enhancer_for(llm, cache, **kwargs):
+    return CreativeEnhancer(client=llm, cache=cache, **kwargs)
+
+
+def test_enhancements_are_memoized_across_instances(cache, tmp_path):
+    llm = StubLLM()
+    assert enhancer_for(llm, cache).enhance_prompt('neon city') == 'vivid neon city'
+    assert enhancer_for(llm, cache).enhance_prompt('neon city') == 'vivid neon city'
+    assert len(llm.calls) == 1
+
+    # A fresh process reads the disk tier
+    reopened = EnhancementCache(str(tmp_path / 'enhancements.db'))
+    assert enhancer_for(llm, reopened).enhance_prompt('neon city') == 'vivid neon city'
+    assert len(llm.calls) == 1
+    assert reopened.stats['disk_hits'] == 1
+
+
+def test_key_covers_style_and_temperature(cache):
+    llm = StubLLM()
+    enhancer_for(llm, cache).enhance_prompt('neon city')
+    enhancer_for(llm, cache).enhance_prompt('neon city', style='noir')
+    enhancer_for(llm, cache, temperature=0.2).enhance_prompt('neon city')
+    assert len(llm.calls) == 3
+
+
+def test_fallbacks_are_not_cached(cache):
+    enhancer = enhancer_for(StubLLM(fail=True), cache)
+    assert 'highly detailed' in enhancer.enhance_prompt('neon city')
+    assert enhancer.stats['fallback'] == 1
+    assert cache.get('neon city', 'cinematic', enhancer._llm_name(), 0.8) is None
+
+
+def test_batch_sends_only_uncached_prompts_in_one_request(cache):
+    llm = StubLLM()
+    enhancer = enhancer_for(llm, cache)
+    enhancer.enhance_prompt('b')
+
+    assert enhancer.enhance_prompts(['a', 'b', 'c']) == ['vivid a', 'vivid b', 'vivid c']
+    assert len(llm.calls) == 2
+    assert '1. a' in llm.calls[1] and '2. c' in llm.calls[1] and '. b' not in llm.calls[1]
+    assert enhancer.stats['cache'] == 1
+
+
+def test_batch_reply_missing_a_line_enhances_it_alone(cache):
+    llm = StubLLM(drop={2})
+    enhanced = enhancer_for(llm, cache).enhance_prompts(['a', 'b', 'c'])
+    assert enhanced == ['vivid a', 'vivid b', 'vivid c']
+    assert len(llm.calls) == 2
+    assert 'Original: b' in llm.calls[1]
+
+
+def test_stream_yields_cached_prompts_first(cache):
+    llm = StubLLM()
+    enhancer = enhancer_for(llm, cache)
+    enhancer.enhance_prompt('c')
+    assert list(enhancer.stream_enhanced(['a', 'b', 'c'])) == [
+        (2, 'vivid c'), (0, 'vivid a'), (1, 'vivid b')]
+    assert len(llm.calls) == 2
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_slow_llm_falls_back_within_the_budget(cache):
+    llm = StubLLM(delay=0.4)
+    enhancer = enhancer_for(llm, cache, latency_budget=0.05)
+
+    started = time.monotonic()
+    enhanced = enhancer.enhance_prompt('neon city')
+    assert time.monotonic() - started < 0.3
+    assert 'highly detailed' in enhanced
+    assert enhancer.stats['local'] == 1
+
+    # The late answer still lands in the cache for next time
+    wait_for(lambda: cache.get('neon city', 'cinematic', enhancer._llm_name(), 0.8))
+    assert enhancer.enhance_prompt('neon city') == 'vivid neon city'
+    assert enhancer.stats['late'] == 1
+    assert len(llm.calls) == 1
+
+
+def test_fast_llm_answers_within_the_budget(cache):
+    enhancer = enhancer_for(StubLLM(), cache, latency_budget=2.0)
+    assert enhancer.enhance_prompt('neon city') == 'vivid neon city'
+    assert enhancer.stats['llm'] == 1 and enhancer.stats['local'] == 0
+
+
+def test_stream_answers_locally_past_the_deadline(cache):
+    class SlowStream(StubLLM):
+        def stream(self, model, input):
+            for line in self.run(model, input):
+                time.sleep(0.15)
+                yield line
+
+    llm = SlowStream()
+    enhancer = enhancer_for(llm, cache, latency_budget=0.2)
+    started = time.monotonic()
+    streamed = dict(enhancer.stream_enhanced(['a', 'b', 'c']))
+    assert time.monotonic() - started < 0.4
+    assert streamed[0] == 'vivid a'
+    assert 'highly detailed' in streamed[2]
+
+    # Lines after the cut-off are cached as they arrive
+    wait_for(lambda: cache.get('c', 'cinematic', enhancer._llm_name(), 0.8) == 'vivid c')
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Tests for the pooled Replicate client
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from http_client import PooledClient
+
+
+@pytest.fixture
+def echo_server():
+    """Local host that records the headers of every request"""
+    seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            seen.append(dict(self.headers))
+            self.send_response(200)
+            self.send_header('Content-Length', '2')
+            self.end_headers()
+            self.wfile.write(b'ok')
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", seen
+    server.shutdown()
+
+
+def test_downloads_never_send_the_api_token(echo_server):
+    url, seen = echo_server
+    client = PooledClient(api_token='r8_secret', base_url=url)
+    try:
+        assert client.http.get(f"{url}/output.png").content == b'ok'
+        client._client.get('/v1/predictions')
+    finally:
+        client.close()
+    download, api = seen
+    assert 'Authorization' not in download
+    assert api['Authorization'] == 'Bearer r8_secret'
+
+
+def test_download_pool_is_reused_and_traced(echo_server):
+    url, seen = echo_server
+    client = PooledClient(api_token='r8_secret', base_url=url)
+    try:
+        assert client.http is client.http
+        for _ in range(3):
+            client.http.get(f"{url}/a.png")
+        stats = client.connection_stats()
+    finally:
+        client.close()
+    assert stats['requests'] == 3
+    assert stats['connections'] == 1
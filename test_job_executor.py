@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Tests for the dependency-aware job executor
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from job_executor import DAGExecutor, resolve_inputs, stale_jobs, topological_order
+
+
+def test_topological_order_puts_dependencies_first():
+    jobs = {
+        'video': {'depends_on': ['image_1'], 'input_from': {'audio': 'audio'}},
+        'image_1': {},
+        'audio': {},
+    }
+    order = topological_order(jobs)
+    assert order.index('image_1') < order.index('video')
+    assert order.index('audio') < order.index('video')
+
+
+def test_cycle_is_rejected():
+    jobs = {'a': {'depends_on': ['b']}, 'b': {'depends_on': ['a']}}
+    with pytest.raises(ValueError, match='cycle'):
+        DAGExecutor(lambda name, job: name).execute(jobs)
+
+
+def test_dependents_start_after_and_receive_outputs():
+    finished = []
+    lock = threading.Lock()
+
+    def run(name, job):
+        time.sleep(0.05 if name == 'image_1' else 0)
+        with lock:
+            finished.append(name)
+        return job['input'].get('input_image', '') + f"{name}.png"
+
+    jobs = {
+        'image_1': {'input': {}},
+        'image_2': {'input': {}},
+        'video': {'input': {}, 'input_from': {'input_image': 'image_1'}},
+    }
+    results = DAGExecutor(run, max_workers=4).execute(jobs)
+
+    assert finished.index('video') > finished.index('image_1')
+    assert results['video'].output == 'image_1.pngvideo.png'
+    assert all(result.ok for result in results.values())
+
+
+def test_independent_jobs_run_concurrently():
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def run(name, job):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return name
+
+    DAGExecutor(run, max_workers=4).execute({f'image_{i}': {} for i in range(4)})
+    assert peak[0] > 1
+
+
+def test_failure_skips_every_dependent():
+    def run(name, job):
+        if name == 'image_1':
+            raise RuntimeError('model error')
+        return name
+
+    jobs = {
+        'image_1': {},
+        'image_2': {},
+        'video': {'input': {}, 'input_from': {'input_image': 'image_1'}},
+        'final': {'depends_on': ['video']},
+    }
+    results = DAGExecutor(run).execute(jobs)
+
+    assert results['image_1'].status == 'failed'
+    assert 'model error' in results['image_1'].error
+    assert results['image_2'].ok
+    assert results['video'].status == 'skipped'
+    assert results['video'].error == 'dependency failed: image_1'
+    assert results['final'].status == 'skipped'
+
+
+def test_empty_output_counts_as_failure():
+    results = DAGExecutor(lambda name, job: None).execute({'a': {}, 'b': {'depends_on': ['a']}})
+    assert results['a'].status == 'failed'
+    assert results['a'].error == 'no output'
+    assert results['b'].status == 'skipped'
+
+
+def test_missing_dependency_is_skipped():
+    results = DAGExecutor(lambda name, job: name).execute({'video': {'depends_on': ['nope']}})
+    assert results['video'].status == 'skipped'
+
+
+def test_on_complete_reports_every_job():
+    seen = []
+    DAGExecutor(lambda name, job: name, on_complete=lambda r: seen.append(r.name)).execute(
+        {'a': {}, 'b': {'depends_on': ['a']}})
+    assert sorted(seen) == ['a', 'b']
+
+
+def test_submit_job_backend():
+    def submit(name, job):
+        future = Future()
+        if name == 'bad':
+            future.set_exception(RuntimeError('rejected'))
+        else:
+            future.set_result(name.upper())
+        return future
+
+    results = DAGExecutor(submit_job=submit).execute(
+        {'a': {}, 'bad': {}, 'after_bad': {'depends_on': ['bad']}})
+    assert results['a'].output == 'A'
+    assert results['bad'].status == 'failed'
+    assert results['after_bad'].status == 'skipped'
+
+
+def test_resolve_inputs_leaves_original_untouched():
+    job = {'input': {'fps': 7}, 'input_from': {'input_image': 'image_1'}}
+    resolved = resolve_inputs(job, {'image_1': 'hero.png'})
+    assert resolved['input'] == {'fps': 7, 'input_image': 'hero.png'}
+    assert 'input_image' not in job['input']
+
+
+def test_stale_jobs_propagate_downstream():
+    jobs = {'image_1': {}, 'image_2': {}, 'video': {'depends_on': ['image_1']}}
+    built = {'image_1': 'old', 'image_2': 'same', 'video': 'same'}
+    fingerprints = {'image_1': 'new', 'image_2': 'same', 'video': 'same'}
+    assert stale_jobs(jobs, fingerprints, built) == {
+        'image_1': 'changed', 'video': 'upstream: image_1'}
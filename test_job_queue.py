@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite job queue: leases, fencing tokens and exactly-once claims
+"""
+
+import threading
+import time
+
+import pytest
+
+from job_queue import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = JobQueue(str(tmp_path / 'queue.db'), lease=30)
+    yield q
+    q.close()
+
+
+def test_enqueue_is_idempotent(queue):
+    first = queue.enqueue({'brief_type': 'product_launch'}, job_id='launch_1')
+    again = queue.enqueue({'brief_type': 'salem_aesthetic'}, job_id='launch_1')
+    assert again['seq'] == first['seq']
+    assert again['spec'] == first['spec']
+    assert queue.counts() == {'queued': 1}
+
+
+@pytest.mark.parametrize('job_id', ['../../etc', 'a/b', 'x' * 65, 'sp ace'])
+def test_enqueue_rejects_unsafe_ids(queue, job_id):
+    with pytest.raises(ValueError):
+        queue.enqueue({}, job_id=job_id)
+
+
+def test_claim_leases_a_job_once(queue):
+    queue.enqueue({}, job_id='only')
+    job = queue.claim('w1')
+    assert job['id'] == 'only'
+    assert job['status'] == 'running'
+    assert job['lease_token']
+    assert queue.claim('w2') is None
+
+
+def test_expired_lease_fences_out_the_stalled_worker(queue):
+    queue.enqueue({}, job_id='slow')
+    stalled = queue.claim('w1', lease=0.05)
+    time.sleep(0.1)
+
+    taken = queue.claim('w2')
+    assert taken['id'] == 'slow'
+    assert taken['attempts'] == 2
+    assert taken['lease_token'] != stalled['lease_token']
+
+    # The first worker wakes up: its token no longer holds the lease
+    assert not queue.heartbeat('slow', stalled['lease_token'])
+    assert not queue.finish('slow', stalled['lease_token'], 'succeeded', {'by': 'w1'})
+
+    assert queue.heartbeat('slow', taken['lease_token'])
+    assert queue.finish('slow', taken['lease_token'], 'succeeded', {'by': 'w2'})
+    assert queue.get('slow')['result'] == {'by': 'w2'}
+
+    # ...and a finished job can't be committed a second time
+    assert not queue.finish('slow', taken['lease_token'], 'failed', error='late')
+    assert queue.get('slow')['status'] == 'succeeded'
+
+
+def test_heartbeat_keeps_the_lease(queue):
+    queue.enqueue({}, job_id='long')
+    job = queue.claim('w1', lease=0.2)
+    for _ in range(3):
+        time.sleep(0.1)
+        assert queue.heartbeat('long', job['lease_token'], lease=0.2)
+        assert queue.claim('w2') is None
+
+
+def test_requeue_expired(queue):
+    queue.enqueue({}, job_id='orphan')
+    job = queue.claim('w1', lease=0.01)
+    time.sleep(0.05)
+    assert queue.requeue_expired() == 1
+    assert queue.get('orphan')['status'] == 'queued'
+    assert not queue.finish('orphan', job['lease_token'], 'succeeded', {'x': 1})
+
+
+def test_cancel_only_queued_jobs(queue):
+    queue.enqueue({}, job_id='a')
+    queue.enqueue({}, job_id='b')
+    running = queue.claim('w1')
+    assert not queue.cancel(running['id'])
+    other = 'b' if running['id'] == 'a' else 'a'
+    assert queue.cancel(other)
+    assert queue.claim('w2') is None
+
+
+def test_concurrent_workers_claim_each_job_exactly_once(tmp_path):
+    path = str(tmp_path / 'queue.db')
+    setup = JobQueue(path)
+    for i in range(60):
+        setup.enqueue({'quality': 'draft'}, job_id=f'job_{i}')
+
+    claimed, lock = [], threading.Lock()
+
+    def worker(n):
+        # One connection per worker, as separate processes would have
+        q = JobQueue(path)
+        try:
+            while True:
+                job = q.claim(f'w{n}')
+                if job is None:
+                    return
+                with lock:
+                    claimed.append(job['id'])
+                assert q.finish(job['id'], job['lease_token'], 'succeeded', {'n': n})
+        finally:
+            q.close()
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed) == sorted(f'job_{i}' for i in range(60))
+    assert setup.counts() == {'succeeded': 60}
+    setup.close()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for the streaming metadata export reader
+"""
+
+import io
+import json
+
+import pytest
+
+from metadata_export import _Cursor, iter_export, write_jsonl
+
+RAW = [
+    {'id': 'p1', 'model': 'black-forest-labs/flux-schnell', 'status': 'succeeded',
+     'input': {'prompt': 'neon "city", at night', 'guidance': 0.75, 'seed': -12},
+     'output': ['https://replicate.delivery/a.png'], 'metrics': {'predict_time': 1.5e-3}},
+    {'id': 'p2', 'model': 'stability-ai/sdxl', 'status': 'failed',
+     'input': {'prompt': 'café ✨ {braces} [brackets]'}, 'output': None,
+     'flags': [True, False, None]},
+    {'id': 'p3', 'model': 'black-forest-labs/flux-schnell', 'status': 'succeeded',
+     'input': {}, 'output': 'https://replicate.delivery/b.png'},
+]
+
+EXPORT = {
+    'export_info': {'total_predictions': 3, 'exported_at': '2025-09-29T12:00:00Z'},
+    'predictions_by_model': {
+        'black-forest-labs/flux-schnell': [{'id': 'p1'}, {'id': 'p3'}],
+        'stability-ai/sdxl': [{'id': 'p2'}],
+    },
+    'raw_predictions': RAW,
+}
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    """Read exports a few characters at a time, so every token straddles chunks"""
+    def use(size):
+        monkeypatch.setattr(_Cursor.__init__, '__defaults__', (size,))
+    return use
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 5, 7, 64 * 1024])
+def test_raw_predictions_survive_any_chunk_boundary(tmp_path, small_chunks, size):
+    path = tmp_path / 'export.json'
+    path.write_text(json.dumps(EXPORT, indent=2, ensure_ascii=False), encoding='utf-8')
+    small_chunks(size)
+    assert list(iter_export(str(path))) == RAW
+
+
+@pytest.mark.parametrize('size', [1, 4])
+def test_compact_json_across_chunks(tmp_path, small_chunks, size):
+    path = tmp_path / 'export.json'
+    path.write_text(json.dumps(EXPORT, separators=(',', ':')), encoding='utf-8')
+    small_chunks(size)
+    assert [r['id'] for r in iter_export(str(path))] == ['p1', 'p2', 'p3']
+
+
+@pytest.mark.parametrize('size', [1, 3])
+def test_summary_used_without_raw_predictions(tmp_path, small_chunks, size):
+    export = {k: v for k, v in EXPORT.items() if k != 'raw_predictions'}
+    path = tmp_path / 'export.json'
+    path.write_text(json.dumps(export, indent=1), encoding='utf-8')
+    small_chunks(size)
+    assert list(iter_export(str(path))) == [
+        {'model': 'black-forest-labs/flux-schnell', 'id': 'p1'},
+        {'model': 'black-forest-labs/flux-schnell', 'id': 'p3'},
+        {'model': 'stability-ai/sdxl', 'id': 'p2'},
+    ]
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('[0.75, -12, 1e-3, true, null]', [0.75, -12, 1e-3, True, None]),
+    ('[  12345678901234567890 ,"x"]', [12345678901234567890, 'x']),
+    ('[]', []),
+])
+def test_literals_split_across_chunks(text, expected):
+    for size in range(1, len(text) + 1):
+        cursor = _Cursor(io.StringIO(text), chunk_size=size)
+        values = [cursor.value() for _ in cursor.elements()]
+        assert values == expected, size
+
+
+def test_truncated_export_raises(tmp_path, small_chunks):
+    path = tmp_path / 'export.json'
+    path.write_text(json.dumps(EXPORT)[:-40], encoding='utf-8')
+    small_chunks(8)
+    with pytest.raises(ValueError):
+        list(iter_export(str(path)))
+
+
+def test_filters_by_model_and_status(tmp_path):
+    path = tmp_path / 'export.json'
+    path.write_text(json.dumps(EXPORT), encoding='utf-8')
+    assert [r['id'] for r in iter_export(str(path), models=['flux-schnell'])] == ['p1', 'p3']
+    assert [r['id'] for r in iter_export(str(path), statuses=['failed'])] == ['p2']
+    assert [r['id'] for r in iter_export(str(path), models=['stability-ai/sdxl'],
+                                         statuses=['succeeded'])] == []
+
+
+def test_jsonl_round_trip(tmp_path):
+    path = tmp_path / 'export.jsonl'
+    assert write_jsonl(RAW, str(path)) == 3
+    assert list(iter_export(str(path))) == RAW
+    # Appending an overlapping range skips ids already written
+    assert write_jsonl([RAW[0], {'id': 'p4'}], str(path), append=True) == 1
+    assert [r['id'] for r in iter_export(str(path))] == ['p1', 'p2', 'p3', 'p4']
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Tests for the sharded metrics registry and its Prometheus output
+"""
+
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from metrics import CONTENT_TYPE, Metrics, serve
+
+
+@pytest.fixture
+def registry():
+    return Metrics()
+
+
+def cells_for(histogram, **labels):
+    return histogram.series()[tuple(sorted(labels.items()))]
+
+
+def test_quantile_interpolates_within_a_bucket(registry):
+    latency = registry.histogram('latency_seconds', 'Latency', buckets=(0.5, 1, 2))
+    for value in (0.1, 0.7, 1.5, 9):
+        latency.observe(value, model='flux')
+    cells = cells_for(latency, model='flux')
+
+    assert cells[:-1] == [1, 1, 1, 1]
+    assert cells[-1] == pytest.approx(11.3)
+    assert latency.quantile(0.5, cells) == pytest.approx(1.0)
+    assert latency.quantile(0.25, cells) == pytest.approx(0.5)
+    assert latency.quantile(0.625, cells) == pytest.approx(1.5)
+    # Past the last finite bound, the bound is the best estimate
+    assert latency.quantile(0.99, cells) == 2.0
+
+
+def test_quantile_of_uniform_observations(registry):
+    latency = registry.histogram('uniform_seconds', 'Uniform', buckets=(1, 2, 3, 4))
+    for i in range(400):
+        latency.observe((i + 0.5) / 100)
+    cells = cells_for(latency)
+    assert latency.quantile(0.5, cells) == pytest.approx(2.0)
+    assert latency.quantile(0.95, cells) == pytest.approx(3.8)
+
+
+def test_quantile_of_nothing(registry):
+    latency = registry.histogram('empty_seconds', 'Empty', buckets=(1,))
+    assert latency.quantile(0.5, [0, 0, 0.0]) is None
+
+
+def test_bucket_bounds_are_inclusive(registry):
+    latency = registry.histogram('edge_seconds', 'Edges', buckets=(1, 2))
+    latency.observe(1)
+    latency.observe(2)
+    assert cells_for(latency)[:-1] == [1, 1, 0]
+
+
+def test_updates_from_many_threads_add_up(registry):
+    submitted = registry.counter('submitted_total', 'Submitted')
+    latency = registry.histogram('thread_seconds', 'Latency', buckets=(1,))
+
+    def work():
+        for _ in range(1000):
+            submitted.inc(model='flux')
+            latency.observe(0.5)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Finished threads' shards are folded into the retired totals
+    totals = registry.collect()
+    assert totals[('submitted_total', (('model', 'flux'),))] == 8000
+    assert registry._shards == []
+    submitted.inc(model='flux')
+    assert registry.collect()[('submitted_total', (('model', 'flux'),))] == 8001
+    assert cells_for(latency)[:-1] == [8000, 0]
+
+
+def test_gauge_moves_both_ways_across_threads(registry):
+    running = registry.gauge('running', 'Running')
+    running.inc()
+    thread = threading.Thread(target=running.dec)
+    thread.start()
+    thread.join()
+    assert registry.collect()[('running', ())] == 0
+
+
+def test_render_exposition_format(registry):
+    registry.counter('jobs_total', 'Jobs').inc(2, status='ok', model='a"b')
+    registry.histogram('wait_seconds', 'Wait', buckets=(1, 2.5)).observe(2)
+    registry.callback('queue_jobs', 'Jobs by status', lambda: {'queued': 3, 'running': 1},
+                      label='status')
+    registry.callback('broken', 'Raises', lambda: 1 / 0)
+    text = registry.render()
+
+    assert '# TYPE jobs_total counter' in text
+    assert 'jobs_total{model="a\\"b",status="ok"} 2' in text
+    assert 'wait_seconds_bucket{le="1"} 0' in text
+    assert 'wait_seconds_bucket{le="2.5"} 1' in text
+    assert 'wait_seconds_bucket{le="+Inf"} 1' in text
+    assert 'wait_seconds_sum 2' in text
+    assert 'wait_seconds_count 1' in text
+    assert 'queue_jobs{status="queued"} 3' in text
+    assert '# TYPE broken gauge' in text
+    assert not [line for line in text.splitlines() if line.startswith('broken')]
+
+
+def test_reregistering_returns_the_same_metric(registry):
+    assert registry.counter('x_total', 'X') is registry.counter('x_total', 'X')
+    with pytest.raises(ValueError):
+        registry.histogram('x_total', 'X')
+
+
+def test_write_replaces_the_file(registry, tmp_path):
+    registry.counter('written_total', 'Written').inc()
+    path = registry.write(str(tmp_path / 'pipeline.prom'))
+    assert 'written_total 1' in path.read_text()
+    assert [p.name for p in tmp_path.iterdir()] == ['pipeline.prom']
+
+
+def test_serve(registry):
+    registry.counter('served_total', 'Served').inc()
+    server = serve(registry, port=0)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{base}/metrics") as response:
+            assert response.headers['Content-Type'] == CONTENT_TYPE
+            assert 'served_total 1' in response.read().decode()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"{base}/other")
+    finally:
+        server.shutdown()
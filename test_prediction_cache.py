@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tests for the content-addressed prediction cache (against the local
+Replicate stand-in for stored bytes)
+"""
+
+import os
+
+import pytest
+
+import prediction_cache
+from http_client import PooledClient
+from prediction_cache import PredictionCache, cache_key
+from replicate_standin import ReplicateStandIn
+
+FLUX = 'black-forest-labs/flux-schnell'
+SDXL = 'stability-ai/sdxl:39ed52f2a78e934b3ba6e2a89f5b1c712de7dfea535525255b1aa35c5565e08b'
+
+
+class Clock:
+    """Stand-in for time.time inside prediction_cache"""
+
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(prediction_cache, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def standin():
+    server = ReplicateStandIn(file_size=1000).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def cache(tmp_path, standin, clock):
+    client = PooledClient(base_url=standin.base_url)
+    cache = PredictionCache(str(tmp_path / 'cache'), client=client)
+    yield cache
+    cache.flush()
+    client.close()
+
+
+def test_key_ignores_key_order_and_integral_floats():
+    assert cache_key(FLUX, {'prompt': 'a', 'steps': 4.0}) == cache_key(FLUX, {'steps': 4, 'prompt': 'a'})
+    assert cache_key(FLUX, {'prompt': 'a'}) != cache_key(SDXL, {'prompt': 'a'})
+
+
+def test_hit_keeps_the_url_and_stores_the_bytes(cache, standin):
+    url = f"{standin.base_url}/files/a.png"
+    assert cache.get(SDXL, {'prompt': 'a'}) is None
+    cache.put(SDXL, {'prompt': 'a'}, [url])
+    cache.flush()
+
+    entry = cache.get(SDXL, {'prompt': 'a'})
+    assert entry.output == [url]
+    [local] = entry.local_output()
+    with open(local, 'rb') as f:
+        assert f.read() == standin.file_bytes('a.png')
+    assert cache.stats['hits'] == 1 and cache.stats['misses'] == 1
+
+
+def test_entries_expire_after_max_age(cache, clock, standin):
+    cache.put(SDXL, {'prompt': 'a'}, [f"{standin.base_url}/files/a.png"])
+    cache.flush()
+    [blob] = cache.get(SDXL, {'prompt': 'a'}).local_output()
+
+    clock.now += cache.max_age + 1
+    assert cache.get(SDXL, {'prompt': 'a'}) is None
+    assert not os.path.exists(blob)
+
+
+def test_unversioned_refs_expire_sooner(cache, clock):
+    cache.put(FLUX, {'prompt': 'a'}, 'done')
+    cache.put(SDXL, {'prompt': 'a'}, 'done')
+    clock.now += cache.unversioned_max_age + 1
+    assert cache.get(FLUX, {'prompt': 'a'}) is None
+    assert cache.get(SDXL, {'prompt': 'a'}) is not None
+
+
+def test_entry_without_bytes_misses_once_its_url_expires(tmp_path, clock):
+    cache = PredictionCache(str(tmp_path / 'cache'), store_bytes=False)
+    cache.put(SDXL, {'prompt': 'a'}, ['https://replicate.delivery/a.png'])
+    clock.now += cache.url_ttl - 1
+    assert cache.get(SDXL, {'prompt': 'a'}) is not None
+    clock.now += 2
+    assert cache.get(SDXL, {'prompt': 'a'}) is None
+
+
+def test_eviction_drops_least_recently_used_first(tmp_path, standin, clock):
+    client = PooledClient(base_url=standin.base_url)
+    cache = PredictionCache(str(tmp_path / 'cache'), client=client, max_bytes=2500)
+    for name in ('a', 'b'):
+        cache.put(SDXL, {'prompt': name}, [f"{standin.base_url}/files/{name}.png"])
+        cache.flush()
+        clock.now += 1
+    cache.get(SDXL, {'prompt': 'a'})  # b is now the least recently used
+    clock.now += 1
+    cache.put(SDXL, {'prompt': 'c'}, [f"{standin.base_url}/files/c.png"])
+    cache.flush()
+    client.close()
+
+    assert cache.get(SDXL, {'prompt': 'b'}) is None
+    assert cache.get(SDXL, {'prompt': 'a'}) is not None
+    assert cache.get(SDXL, {'prompt': 'c'}) is not None
+    assert len(os.listdir(cache.blob_dir)) == 2
+
+
+def test_expiring_a_stale_read_keeps_a_fresh_put(cache, clock):
+    cache.put(SDXL, {'prompt': 'a'}, 'old')
+    stale = clock.now
+    clock.now += 10
+    cache.put(SDXL, {'prompt': 'a'}, 'new')  # Lands between the read and the delete
+    with cache._lock:
+        cache._delete(cache_key(SDXL, {'prompt': 'a'}), stale)
+    assert cache.get(SDXL, {'prompt': 'a'}).output == 'new'
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Tests for the non-blocking prediction engine, with a scripted API stub
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from replicate.exceptions import ReplicateError
+
+from prediction_engine import PredictionEngine, PredictionFailed
+
+
+class StubPredictions:
+    """predictions.async_get answering from a script of statuses and errors per ID"""
+
+    def __init__(self, script):
+        self.script = {pid: list(steps) for pid, steps in script.items()}
+        self.gets = {pid: 0 for pid in script}
+
+    async def async_create(self, version, input, **params):
+        return SimpleNamespace(id=input['id'], status='starting')
+
+    async def async_get(self, prediction_id):
+        self.gets[prediction_id] += 1
+        steps = self.script[prediction_id]
+        step = steps.pop(0) if len(steps) > 1 else steps[0]
+        if isinstance(step, Exception):
+            raise step
+        return SimpleNamespace(id=prediction_id, status=step,
+                               output='done' if step == 'succeeded' else None,
+                               error='boom' if step == 'failed' else None)
+
+
+def engine_for(script, **kwargs):
+    stub = StubPredictions(script)
+    engine = PredictionEngine(client=SimpleNamespace(predictions=stub), min_interval=0.01,
+                              max_interval=0.02, **kwargs)
+    return engine, stub
+
+
+def test_tracked_prediction_resolves():
+    engine, stub = engine_for({'p1': ['starting', 'processing', 'succeeded']})
+    with engine:
+        assert engine.track('p1').result(timeout=5) == 'done'
+    assert stub.gets['p1'] == 3
+    assert engine.in_flight == 0
+
+
+def test_failed_prediction_raises():
+    engine, _ = engine_for({'p1': ['processing', 'failed']})
+    with engine:
+        with pytest.raises(PredictionFailed, match='boom'):
+            engine.track('p1').result(timeout=5)
+
+
+@pytest.mark.parametrize('status', [401, 403, 404])
+def test_client_errors_fail_the_future(status):
+    engine, stub = engine_for({'gone': [ReplicateError(status=status, detail='nope')]})
+    with engine:
+        with pytest.raises(ReplicateError) as raised:
+            engine.track('gone').result(timeout=5)
+    assert raised.value.status == status
+    assert stub.gets['gone'] == 1
+    assert engine.in_flight == 0
+
+
+def test_transient_errors_are_retried():
+    engine, stub = engine_for({'p1': [
+        httpx.ConnectError('reset'), ReplicateError(status=503, detail='unavailable'),
+        ReplicateError(status=502), 'processing', 'succeeded']})
+    with engine:
+        assert engine.track('p1').result(timeout=5) == 'done'
+    assert stub.gets['p1'] == 5
+
+
+def test_rate_limited_poll_waits_for_retry_after():
+    engine, stub = engine_for({'p1': [
+        ReplicateError(status=429, detail='Request was throttled. Retry in 0.3 s'),
+        'succeeded']})
+    with engine:
+        started = time.monotonic()
+        assert engine.track('p1').result(timeout=5) == 'done'
+    assert time.monotonic() - started >= 0.3
+
+
+def test_transient_errors_are_bounded():
+    engine, stub = engine_for({'p1': [ReplicateError(status=500)]}, max_poll_errors=3)
+    with engine:
+        with pytest.raises(ReplicateError):
+            engine.track('p1').result(timeout=5)
+    assert stub.gets['p1'] == 4
+
+
+def test_one_failing_prediction_does_not_stall_others():
+    engine, _ = engine_for({'bad': [ReplicateError(status=404)],
+                            'good': ['processing', 'succeeded']})
+    with engine:
+        bad, good = engine.track('bad'), engine.track('good')
+        assert good.result(timeout=5) == 'done'
+        with pytest.raises(ReplicateError):
+            bad.result(timeout=5)
+
+
+def test_on_created_runs_off_the_loop():
+    engine, _ = engine_for({'p1': ['succeeded']})
+    threads = []
+    with engine:
+        future = engine.submit('owner/model:v1', {'id': 'p1'},
+                               on_created=lambda pid: threads.append((pid, threading.current_thread())))
+        assert future.result(timeout=5) == 'done'
+    assert threads[0][0] == 'p1'
+    assert threads[0][1].name != 'prediction-engine'
+
+
+def test_failing_on_created_fails_the_future():
+    engine, _ = engine_for({'p1': ['succeeded']})
+
+    def journal_full(prediction_id):
+        raise OSError(28, 'No space left on device')
+
+    with engine:
+        with pytest.raises(OSError, match='No space'):
+            engine.submit('owner/model:v1', {'id': 'p1'}, on_created=journal_full).result(timeout=5)
+    assert engine.in_flight == 0
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Tests for the streaming enhancement-to-generation pipeline
+"""
+
+import threading
+import time
+
+import pytest
+
+from prompt_pipeline import PromptPipeline
+
+
+def run_with_timeout(pipeline, prompts, timeout=5.0):
+    """Run the pipeline on a thread so a hang fails the test instead of stalling it"""
+    outcome = {}
+
+    def target():
+        try:
+            outcome['results'] = pipeline.run(prompts)
+        except Exception as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "pipeline hung"
+    return outcome
+
+
+def test_every_prompt_is_generated():
+    pipeline = PromptPipeline(lambda index, prompt: f"{prompt}.png", workers=2, queue_size=1)
+    outcome = run_with_timeout(pipeline, ((i, f"p{i}") for i in range(1, 6)))
+    results = outcome['results']
+    assert sorted(results) == [1, 2, 3, 4, 5]
+    assert results[3][0] == 'p3'
+    assert results[3][1].output == 'p3.png' and results[3][1].ok
+
+
+def test_generation_overlaps_the_stream():
+    def slow_stream():
+        for i in range(1, 4):
+            time.sleep(0.1)
+            yield i, f"p{i}"
+
+    def generate(index, prompt):
+        time.sleep(0.1)
+        return prompt
+
+    started = time.monotonic()
+    run_with_timeout(PromptPipeline(generate, workers=3), slow_stream())
+    assert time.monotonic() - started < 0.55  # Serial would take 0.6s
+
+
+def test_generate_errors_fail_only_their_prompt():
+    def generate(index, prompt):
+        if index == 2:
+            raise RuntimeError('model down')
+        return prompt
+
+    results = run_with_timeout(PromptPipeline(generate, workers=2),
+                               ((i, f"p{i}") for i in range(1, 4)))['results']
+    assert results[2][1].status == 'failed' and 'model down' in results[2][1].error
+    assert results[1][1].ok and results[3][1].ok
+
+
+def test_stream_error_is_raised():
+    def stream():
+        yield 1, 'p1'
+        raise ValueError('LLM stream broke')
+
+    outcome = run_with_timeout(PromptPipeline(lambda i, p: p), stream())
+    assert 'LLM stream broke' in str(outcome['error'])
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_failing_on_complete_stops_the_pipeline(workers):
+    def on_complete(result):
+        raise OSError('report failed')
+
+    pipeline = PromptPipeline(lambda i, p: p, workers=workers, queue_size=1,
+                              on_complete=on_complete)
+    outcome = run_with_timeout(pipeline, ((i, f"p{i}") for i in range(1, 50)))
+    assert isinstance(outcome['error'], OSError)
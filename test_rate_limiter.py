@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Tests for the token buckets and the rate governor
+"""
+
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+
+import pytest
+
+from rate_limiter import ModelLimit, RateGovernor, TokenBucket
+
+
+class Throttled(Exception):
+    status = 429
+
+    def __str__(self):
+        return "throttled, retry in 0.05s"
+
+
+def test_bucket_serves_a_burst_then_queues_in_order():
+    bucket = TokenBucket(rate=10.0, burst=3)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    waits = [bucket.reserve() for _ in range(3)]
+    assert waits == sorted(waits)
+    assert waits[0] == pytest.approx(0.1, abs=0.02)
+    assert waits[2] == pytest.approx(0.3, abs=0.02)
+
+
+def test_penalty_pauses_and_halves_once_per_window():
+    bucket = TokenBucket(rate=8.0, burst=5)
+    bucket.penalize(0.2)
+    bucket.penalize(0.2)  # Same congestion event
+    assert bucket.rate == 4.0
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.02)
+    bucket.recover()
+    assert bucket.rate == pytest.approx(4.8)
+
+
+def test_call_requeues_429s_until_success():
+    governor = RateGovernor(global_rate=None)
+    attempts = []
+
+    def flaky():
+        attempts.append(time.monotonic())
+        if len(attempts) < 3:
+            raise Throttled()
+        return 'ok'
+
+    assert governor.call('flux', flaky) == 'ok'
+    assert len(attempts) == 3
+    assert attempts[1] - attempts[0] >= 0.04  # Waited out the retry hint
+    assert governor.stats['throttled'] == 2
+    assert governor.in_flight == 0
+
+
+def test_call_gives_up_after_max_retries():
+    governor = RateGovernor(global_rate=None, max_retries=1)
+    with pytest.raises(Throttled):
+        governor.call('flux', lambda: (_ for _ in ()).throw(Throttled()))
+    assert governor.in_flight == 0
+
+
+def test_submit_never_blocks_on_a_saturated_model():
+    governor = RateGovernor({'flux': ModelLimit(max_in_flight=1)}, global_rate=None)
+    held = Future()
+    first = governor.submit('flux', lambda: held)
+
+    started = time.monotonic()
+    second = governor.submit('flux', lambda: _resolved('flux 2'))
+    other = governor.submit('audio', lambda: _resolved('audio'))
+    assert time.monotonic() - started < 0.05
+
+    assert other.result(timeout=1) == 'audio'
+    assert not second.done()  # Waits for flux's slot
+    held.set_result('flux 1')
+    assert first.result(timeout=1) == 'flux 1'
+    assert second.result(timeout=1) == 'flux 2'
+    assert governor.in_flight == 0
+
+
+def test_submit_requeues_a_429():
+    governor = RateGovernor(global_rate=None)
+    calls = []
+
+    def factory():
+        calls.append(1)
+        future = Future()
+        if len(calls) == 1:
+            future.set_exception(Throttled())
+        else:
+            future.set_result('ok')
+        return future
+
+    assert governor.submit('flux', factory).result(timeout=2) == 'ok'
+    assert len(calls) == 2
+    assert governor.stats['throttled'] == 1
+
+
+def test_cancelled_inner_future_cancels_the_submission():
+    governor = RateGovernor(global_rate=None)
+    inner = Future()
+    outer = governor.submit('flux', lambda: inner)
+    _wait_until(lambda: governor.in_flight == 1)
+
+    inner.cancel()
+    with pytest.raises(CancelledError):
+        outer.result(timeout=1)
+    assert governor.in_flight == 0
+
+
+
+def test_cancelled_submission_reaches_the_dispatched_future():
+    governor = RateGovernor(global_rate=None)
+    inner = Future()
+    outer = governor.submit('flux', lambda: inner)
+    _wait_until(lambda: governor.in_flight == 1)
+
+    outer.cancel()
+    assert inner.cancelled()
+    _wait_until(lambda: governor.in_flight == 0)
+
+
+def test_submission_cancelled_waiting_for_a_slot_is_never_dispatched():
+    governor = RateGovernor({'flux': ModelLimit(max_in_flight=1)}, global_rate=None)
+    held, calls = Future(), []
+    governor.submit('flux', lambda: held)
+    queued = governor.submit('flux', lambda: calls.append('queued') or _resolved('x'))
+    _wait_until(lambda: governor.in_flight == 1)
+
+    queued.cancel()
+    held.set_result('done')
+    assert governor.submit('flux', lambda: _resolved('next')).result(timeout=1) == 'next'
+    assert calls == [] and governor.stats['calls'] == 2
+
+
+def test_submission_cancelled_waiting_for_a_token_refunds_it():
+    governor = RateGovernor({'flux': ModelLimit(rate=2, burst=1)}, global_rate=None)
+    started = time.monotonic()
+    governor.submit('flux', lambda: _resolved('first')).result(timeout=1)
+    waiting = governor.submit('flux', lambda: _resolved('cancelled'))
+    time.sleep(0.05)  # Dispatched: sleeping for the next token
+
+    waiting.cancel()
+    # Takes the refunded token (0.5s after the first), not the one after it
+    assert governor.submit('flux', lambda: _resolved('next')).result(timeout=2) == 'next'
+    assert time.monotonic() - started < 0.8
+    assert governor.stats['calls'] == 2
+
+
+def test_idle_dispatchers_exit_and_restart():
+    governor = RateGovernor(global_rate=None, dispatcher_idle=0.05)  # Key unique to this test
+    assert governor.submit('sdxl', lambda: _resolved('a')).result(timeout=1) == 'a'
+    _wait_until(lambda: not _dispatchers('sdxl'))
+    assert governor.submit('sdxl', lambda: _resolved('b')).result(timeout=1) == 'b'
+
+
+def test_close_stops_dispatchers_and_cancels_queued_submissions():
+    governor = RateGovernor({'svd': ModelLimit(max_in_flight=1)}, global_rate=None)  # Unique key
+    held = Future()
+    first = governor.submit('svd', lambda: held)
+    _wait_until(lambda: governor.in_flight == 1)
+    queued = governor.submit('svd', lambda: _resolved('never'))
+
+    governor.close()
+    assert queued.cancelled()
+    held.set_result('done')
+    assert first.result(timeout=1) == 'done'
+    _wait_until(lambda: not _dispatchers('svd'))
+
+
+def _dispatchers(key):
+    return [t for t in threading.enumerate() if t.name == f'rate-limit-{key}']
+
+def _resolved(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def _wait_until(condition, timeout=1.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
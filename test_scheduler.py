@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Tests for priority classes and weighted fair share between queue clients
+"""
+
+import pytest
+
+from job_queue import JobQueue
+from scheduler import Scheduler, priority_class, static_cost
+
+
+def group(priority, client, oldest=0.0, shortest_seq=1, oldest_seq=2):
+    return {'priority': priority, 'client': client, 'oldest': oldest,
+            'shortest_seq': shortest_seq, 'oldest_seq': oldest_seq}
+
+
+def claim_order(queue, n):
+    # Finished as failed: only successes train the cost model, so every
+    # job keeps its static cost instead of the ~0s these take here
+    order = []
+    for _ in range(n):
+        job = queue.claim('w')
+        order.append(job['client'])
+        queue.finish(job['id'], job['lease_token'], 'failed', error='test')
+    return order
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = JobQueue(str(tmp_path / 'queue.db'))
+    yield q
+    q.close()
+
+
+def test_priority_class_defaults_to_quality():
+    assert priority_class({'quality': 'draft'}) == 0
+    assert priority_class({'quality': 'premium'}) == 2
+    assert priority_class({'quality': 'premium'}, 'draft') == 0
+    assert priority_class({}, 5) == 5
+    with pytest.raises(ValueError):
+        priority_class({}, 'urgent')
+
+
+def test_video_costs_more():
+    assert static_cost({'quality': 'draft', 'include_video': True}) > static_cost(
+        {'quality': 'draft'})
+
+
+def test_pick_prefers_lower_class_then_least_served():
+    scheduler = Scheduler(aging=0)
+    groups = [group(1, 'a'), group(1, 'b'), group(2, 'c')]
+    assert scheduler.pick(groups, {}, {'a': 50.0, 'b': 10.0}, now=0)['client'] == 'b'
+    groups.append(group(0, 'a'))
+    assert scheduler.pick(groups, {}, {'a': 50.0, 'b': 10.0}, now=0)['priority'] == 0
+
+
+def test_pick_shortest_job_until_aged():
+    scheduler = Scheduler(aging=100)
+    fresh = scheduler.pick([group(1, 'a', oldest=90)], {}, {}, now=100)
+    assert fresh['seq'] == 1  # shortest
+    aged = scheduler.pick([group(1, 'a', oldest=0)], {}, {}, now=100)
+    assert aged['seq'] == 2  # oldest
+
+
+def test_aging_lifts_a_waiting_class():
+    scheduler = Scheduler(aging=60)
+    groups = [group(2, 'premium', oldest=0), group(1, 'standard', oldest=170)]
+    # premium waited 180s: three classes of boost puts it ahead
+    assert scheduler.pick(groups, {}, {}, now=180)['client'] == 'premium'
+
+
+def test_class_limits():
+    scheduler = Scheduler(limits={'premium': 1})
+    groups = [group(2, 'a')]
+    assert scheduler.pick(groups, {2: 1}, {}, now=0) is None
+    assert scheduler.pick(groups, {2: 0}, {}, now=0)['client'] == 'a'
+
+
+def test_clients_alternate_despite_a_backlog(queue):
+    for i in range(10):
+        queue.enqueue({'quality': 'standard'}, job_id=f'bulk_{i}', client='bulk')
+    for i in range(3):
+        queue.enqueue({'quality': 'standard'}, job_id=f'small_{i}', client='small')
+    # The small client's jobs don't wait behind the whole backlog
+    assert claim_order(queue, 6) == ['bulk', 'small', 'bulk', 'small', 'bulk', 'small']
+
+
+def test_weights_share_in_proportion(tmp_path):
+    queue = JobQueue(str(tmp_path / 'queue.db'), scheduler=Scheduler(weights={'gold': 2}))
+    for i in range(20):
+        queue.enqueue({'quality': 'standard'}, job_id=f'gold_{i}', client='gold')
+        queue.enqueue({'quality': 'standard'}, job_id=f'free_{i}', client='free')
+    order = claim_order(queue, 12)
+    assert order.count('gold') == 8
+    assert order.count('free') == 4
+    queue.close()
+
+
+def test_returning_client_does_not_cash_in_idle_time(queue):
+    queue.enqueue({'quality': 'standard'}, job_id='early', client='early')
+    claim_order(queue, 1)
+    for i in range(6):
+        queue.enqueue({'quality': 'standard'}, job_id=f'busy_{i}', client='busy')
+    claim_order(queue, 4)
+
+    # 'early' was idle while 'busy' was served; it comes back level, so
+    # it shares from here on instead of running its whole backlog first
+    for i in range(4):
+        queue.enqueue({'quality': 'standard'}, job_id=f'early_{i}', client='early')
+    assert claim_order(queue, 4).count('early') == 2
+
+
+def test_drafts_jump_ahead_of_premium(queue):
+    for i in range(3):
+        queue.enqueue({'quality': 'premium'}, job_id=f'premium_{i}', client='a')
+    queue.enqueue({'quality': 'draft'}, job_id='draft', client='b')
+    assert queue.claim('w')['id'] == 'draft'
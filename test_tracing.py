@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests for campaign tracing: span nesting across threads, OTLP export and
+the waterfall (campaigns run against the local Replicate stand-in)
+"""
+
+import contextlib
+import contextvars
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from prediction_engine import PredictionEngine
+from tracing import NullTracer, Tracer, activate, load_trace, waterfall
+
+
+def test_spans_nest_and_inherit_campaign_tags():
+    tracer = Tracer()
+    with tracer.span('campaign', mode='soft_brutalism', product='Wave') as root:
+        with tracer.span('generate') as generate:
+            with tracer.span('job', job='image_1') as job:
+                pass
+    assert generate.parent_id == root.span_id and job.parent_id == generate.span_id
+    assert job.trace_id == root.trace_id
+    assert job.attributes == {'job': 'image_1', 'mode': 'soft_brutalism'}
+    assert len(tracer.spans(root.trace_id)) == 3
+
+
+def test_copied_context_carries_the_span_into_pool_threads():
+    tracer = Tracer()
+    with tracer.span('generate') as generate, ThreadPoolExecutor(max_workers=2) as pool:
+        def job(name):
+            with tracer.span('job', job=name) as span:
+                return span
+
+        copied = [pool.submit(contextvars.copy_context().run, job, f"image_{n}")
+                  for n in range(4)]
+        bare = pool.submit(job, 'orphan')
+    assert {f.result().parent_id for f in copied} == {generate.span_id}
+    assert bare.result().parent_id is None  # Without the copied context: a new trace
+
+
+def test_callback_threads_parent_explicitly_or_through_activate():
+    tracer = Tracer()
+    with tracer.span('job') as job:
+        pass
+    seen = {}
+
+    def callback():
+        seen['explicit'] = tracer.span('replicate.run', parent=job)
+        with activate(job):
+            seen['activated'] = tracer.span('output.fetch')
+
+    thread = threading.Thread(target=callback)
+    thread.start()
+    thread.join()
+    assert seen['explicit'].parent_id == job.span_id
+    assert seen['activated'].parent_id == job.span_id
+
+
+def test_export_round_trips_through_otlp(tmp_path):
+    tracer = Tracer()
+    with tracer.span('campaign') as root:
+        tracer.add('replicate.predict', root.start, root.start + 0.5, model='flux')
+        with pytest.raises(RuntimeError), tracer.span('job'):
+            raise RuntimeError('model down')
+
+    path = tracer.export(root.trace_id, tmp_path / 'trace.json', campaign='launch_1')
+    spans = {span['name']: span for span in load_trace(tmp_path)}
+    assert path == tmp_path / 'trace.json'
+    assert spans['replicate.predict']['parent'] == root.span_id
+    assert spans['replicate.predict']['end'] - spans['replicate.predict']['start'] == pytest.approx(0.5)
+    assert spans['job']['error'] == 'RuntimeError: model down'
+    assert all(span['attributes']['campaign'] == 'launch_1' for span in spans.values())
+    assert tracer.spans(root.trace_id) == []
+    assert 'replicate.predict' in waterfall(list(spans.values()))
+
+
+def test_null_tracer_records_nothing(tmp_path):
+    tracer = NullTracer()
+    with tracer.span('campaign') as root:
+        tracer.add('replicate.predict', 1.0, 2.0)
+    assert tracer.export(root.trace_id, tmp_path / 'trace.json') is None
+
+
+@pytest.fixture
+def director_options():
+    return {'tracer': Tracer()}
+
+
+def assert_jobs_nest_under_generate(director, campaign_id, call_name):
+    spans = load_trace(director.output_dir / campaign_id)
+    by_id = {span['id']: span for span in spans}
+    [root] = [span for span in spans if span['parent'] is None]
+    [generate] = [span for span in spans if span['name'] == 'generate']
+    jobs = [span for span in spans if span['name'] == 'job']
+
+    assert root['name'] == 'campaign' and generate['parent'] == root['id']
+    assert len(jobs) == 4
+    assert all(job['parent'] == generate['id'] for job in jobs)
+    assert all(job['attributes']['brief_type'] == 'product_launch' for job in jobs)
+    calls = [span for span in spans if span['name'] == call_name]
+    assert len(calls) == 4
+    assert all(by_id[call['parent']]['name'] == 'job' for call in calls)
+
+
+def test_concurrent_campaign_spans_nest_across_worker_threads(director):
+    with contextlib.redirect_stdout(io.StringIO()):
+        director.create_campaign(brief_type='product_launch', concurrent=True,
+                                 campaign_id='launch_1')
+    assert_jobs_nest_under_generate(director, 'launch_1', 'replicate.create')
+
+
+def test_engine_campaign_spans_nest_across_callbacks(director):
+    director.engine = PredictionEngine(client=director.client)
+    with director.engine, contextlib.redirect_stdout(io.StringIO()):
+        director.create_campaign(brief_type='product_launch', concurrent=True,
+                                 campaign_id='launch_1')
+    assert_jobs_nest_under_generate(director, 'launch_1', 'replicate.run')
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for the webhook receiver, alone and driving the prediction engine
+(against the local Replicate stand-in)
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import urllib.error
+import urllib.request
+from concurrent.futures import Future
+
+import pytest
+
+from http_client import PooledClient
+from prediction_engine import PredictionEngine
+from replicate_standin import ReplicateStandIn, post_webhook
+from webhook_receiver import WebhookReceiver, verify_signature
+
+SECRET = 'whsec_' + base64.b64encode(b'0123456789abcdef').decode()
+
+
+def signed(body: bytes, webhook_id='msg_1', timestamp='1727600000'):
+    key = base64.b64decode(SECRET.split('_', 1)[1])
+    digest = hmac.new(key, f"{webhook_id}.{timestamp}.".encode() + body, hashlib.sha256).digest()
+    return {'webhook-id': webhook_id, 'webhook-timestamp': timestamp,
+            'webhook-signature': 'v1,' + base64.b64encode(digest).decode()}
+
+
+def post(url, body: bytes, headers=None):
+    request = urllib.request.Request(url, data=body, method='POST',
+                                     headers={'Content-Type': 'application/json', **(headers or {})})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+@pytest.fixture
+def receiver():
+    receiver = WebhookReceiver().start()
+    yield receiver
+    receiver.stop()
+
+
+def test_registered_waiter_gets_the_payload(receiver):
+    waiter, seen = receiver.register('p1'), Future()
+    receiver.subscribe(seen.set_result)
+    post_webhook(receiver.url, {'id': 'p1', 'status': 'succeeded', 'output': 'a.png'})
+    assert waiter.result(timeout=5)['output'] == 'a.png'
+    assert seen.result(timeout=5)['id'] == 'p1'
+
+
+def test_unknown_path_and_bad_json_are_refused(receiver):
+    assert post(receiver.url.replace('/webhook', '/other'), b'{}') == 404
+    assert post(receiver.url, b'{not json') == 400
+    assert receiver.stats['received'] == 0
+
+
+def test_signatures_are_checked():
+    body = json.dumps({'id': 'p1', 'status': 'succeeded'}).encode()
+    assert verify_signature(SECRET, signed(body), body)
+    assert not verify_signature(SECRET, signed(body), body + b' ')
+
+    with WebhookReceiver(secret=SECRET) as receiver:
+        waiter = receiver.register('p1')
+        assert post(receiver.url, body) == 401
+        assert post(receiver.url, body, signed(body)) == 200
+        assert waiter.result(timeout=5)['status'] == 'succeeded'
+        assert receiver.stats == {'received': 1, 'rejected': 1}
+
+
+def test_engine_resolves_from_webhooks_without_polling(receiver):
+    standin = ReplicateStandIn(latency=(0.05, 0.1)).start()
+    client = PooledClient(base_url=standin.base_url)
+    engine = PredictionEngine(client=client, webhook=receiver, webhook_poll_interval=30)
+    try:
+        with engine:
+            futures = [engine.submit('stability-ai/sdxl:abc', {'prompt': f"p{n}"})
+                       for n in range(5)]
+            outputs = [future.result(timeout=10) for future in futures]
+    finally:
+        client.close()
+        standin.stop()
+    assert all(outputs)
+    assert standin.stats['webhooks'] == 5
+    assert standin.stats['gets'] == 0
+    assert engine.stats['webhooks'] + engine.stats['succeeded'] >= 5
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Tracing - Per-stage latency spans for campaign generation
+Spans nest through a context variable (executors copy it into their
+worker threads), are exported per campaign as OTLP/JSON, and render as a
+waterfall. The default NullTracer makes every span a shared no-op
+"""
+
+import argparse
+import contextlib
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+TRACE_FILE = 'trace.json'
+
+# Tags copied from a parent span to every child, so each span can be
+# filtered by campaign, mode or quality on its own
+INHERITED = ('campaign', 'mode', 'brief_type', 'quality')
+
+_current: contextvars.ContextVar = contextvars.ContextVar('span', default=None)
+
+
+class Span:
+    """One timed stage. Use as a context manager, or finish() it from a callback."""
+
+    __slots__ = ('tracer', 'name', 'trace_id', 'span_id', 'parent_id', 'start', 'end',
+                 'attributes', 'error', '_token')
+
+    def __init__(self, tracer: 'Tracer', name: str, trace_id: str, parent_id: Optional[str],
+                 attributes: Dict[str, Any], start: Optional[float] = None):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start = start or time.time()
+        self.end = None
+        self.attributes = attributes
+        self.error = None
+
+    def set(self, **attributes) -> 'Span':
+        self.attributes.update(attributes)
+        return self
+
+    def finish(self, error: Optional[BaseException] = None, end: Optional[float] = None):
+        if self.end is not None:
+            return
+        self.end = end or time.time()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"[:200]
+        self.tracer._finished(self)
+
+    def __enter__(self) -> 'Span':
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        self.finish(exc)
+
+
+class _NoopSpan:
+    """Shared stand-in for every span while tracing is off"""
+    trace_id = span_id = None
+
+    def set(self, **attributes):
+        return self
+
+    def finish(self, error=None, end=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class NullTracer:
+    """Tracing disabled: spans cost one call and record nothing"""
+    enabled = False
+
+    def span(self, name: str, parent=None, **attributes):
+        return _NOOP
+
+    def add(self, name: str, start: float, end: float, parent=None, **attributes):
+        pass
+
+    def export(self, trace_id, path, **attributes) -> Optional[Path]:
+        return None
+
+    def spans(self, trace_id) -> List[Span]:
+        return []
+
+    def discard(self, trace_id):
+        pass
+
+
+class Tracer:
+    """
+    Collects finished spans per trace until export(). A span's parent is
+    the span current in its context unless one is passed explicitly
+    (needed when a span ends on another thread, e.g. in a future callback).
+    """
+    enabled = True
+
+    def __init__(self):
+        self._traces: Dict[str, List[Span]] = {}
+        self._lock = threading.Lock()
+
+    def span(self, name: str, parent: Optional[Span] = None, **attributes) -> Span:
+        parent = parent or _current.get()
+        if parent is None or parent is _NOOP:
+            return Span(self, name, os.urandom(16).hex(), None, attributes)
+        for key in INHERITED:
+            if key in parent.attributes and key not in attributes:
+                attributes[key] = parent.attributes[key]
+        return Span(self, name, parent.trace_id, parent.span_id, attributes)
+
+    def add(self, name: str, start: float, end: float, parent: Optional[Span] = None,
+            **attributes):
+        """Record a span from timestamps taken elsewhere (e.g. Replicate's own)"""
+        if start and end and end >= start:
+            span = self.span(name, parent, **attributes)
+            span.start = start
+            span.finish(end=end)
+
+    def _finished(self, span: Span):
+        with self._lock:
+            self._traces.setdefault(span.trace_id, []).append(span)
+
+    def spans(self, trace_id: str) -> List[Span]:
+        with self._lock:
+            return list(self._traces.get(trace_id, []))
+
+    def export(self, trace_id: str, path: Path, **attributes) -> Optional[Path]:
+        """
+        Write a finished trace as one OTLP/JSON request and forget it.
+        attributes tag every span that doesn't already have them.
+        """
+        with self._lock:
+            spans = self._traces.pop(trace_id, [])
+        if not spans:
+            return None
+        for span in spans:
+            for key, value in attributes.items():
+                span.attributes.setdefault(key, value)
+        path = Path(path)
+        with open(path, 'w') as f:
+            json.dump(to_otlp(spans), f, separators=(',', ':'), default=str)
+            f.write('\n')
+        return path
+
+    def discard(self, trace_id: str):
+        """Forget a trace that won't be exported (e.g. its campaign raised)"""
+        with self._lock:
+            self._traces.pop(trace_id, None)
+
+
+@contextlib.contextmanager
+def activate(span):
+    """Make span current (without ending it) - for work finishing on another thread"""
+    token = _current.set(span)
+    try:
+        yield span
+    finally:
+        _current.reset(token)
+
+
+def default_tracer():
+    """Tracer when CREATIVE_TRACE is set, else the no-op NullTracer"""
+    return Tracer() if os.getenv('CREATIVE_TRACE') else NullTracer()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def to_otlp(spans: List[Span]) -> Dict[str, Any]:
+    """OTLP/JSON ExportTraceServiceRequest (as read by OTel collectors' file receivers)"""
+    return {'resourceSpans': [{
+        'resource': {'attributes': [
+            {'key': 'service.name', 'value': {'stringValue': 'creative-production-pipeline'}}]},
+        'scopeSpans': [{
+            'scope': {'name': 'creative_director'},
+            'spans': [{
+                'traceId': span.trace_id,
+                'spanId': span.span_id,
+                'parentSpanId': span.parent_id or '',
+                'name': span.name,
+                'kind': 1,
+                'startTimeUnixNano': str(int(span.start * 1e9)),
+                'endTimeUnixNano': str(int(span.end * 1e9)),
+                'attributes': [{'key': k, 'value': _otlp_value(v)}
+                               for k, v in span.attributes.items() if v is not None],
+                'status': ({'code': 2, 'message': span.error} if span.error else {'code': 1}),
+            } for span in sorted(spans, key=lambda s: s.start)],
+        }],
+    }]}
+
+
+def load_trace(path: Path) -> List[Dict[str, Any]]:
+    """Spans from an exported trace file (or a campaign directory holding one)"""
+    path = Path(path)
+    if path.is_dir():
+        path = path / TRACE_FILE
+    with open(path) as f:
+        request = json.load(f)
+    spans = []
+    for resource in request['resourceSpans']:
+        for scope in resource['scopeSpans']:
+            for span in scope['spans']:
+                attributes = {a['key']: next(iter(a['value'].values())) for a in span['attributes']}
+                spans.append({
+                    'id': span['spanId'], 'parent': span['parentSpanId'] or None,
+                    'name': span['name'], 'attributes': attributes,
+                    'start': int(span['startTimeUnixNano']) / 1e9,
+                    'end': int(span['endTimeUnixNano']) / 1e9,
+                    'error': span['status'].get('message'),
+                })
+    return spans
+
+
+def _label(span: Dict[str, Any]) -> str:
+    attributes = span['attributes']
+    detail = attributes.get('job') or attributes.get('model') or ''
+    if attributes.get('job') and attributes.get('model'):
+        detail += f" ({str(attributes['model']).split('/')[-1]})"
+    return f"{span['name']} {detail}".strip()
+
+
+def waterfall(spans: List[Dict[str, Any]], width: int = 48) -> str:
+    """Indented span tree with time bars, then total seconds per stage"""
+    if not spans:
+        return "(empty trace)"
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    ids = {span['id'] for span in spans}
+    for span in sorted(spans, key=lambda s: s['start']):
+        parent = span['parent'] if span['parent'] in ids else None
+        children.setdefault(parent, []).append(span)
+    origin = min(span['start'] for span in spans)
+    total = max(span['end'] for span in spans) - origin or 1e-9
+
+    lines = []
+
+    def render(span, depth):
+        offset = int((span['start'] - origin) / total * width)
+        length = max(1, int((span['end'] - span['start']) / total * width))
+        bar = ' ' * offset + '█' * min(length, width - offset)
+        label = ('  ' * depth + _label(span))[:40]
+        mark = ' ❌' if span['error'] else ''
+        lines.append(f"{span['start'] - origin:7.2f}s {span['end'] - span['start']:7.2f}s  "
+                     f"{label:<40} |{bar:<{width}}|{mark}")
+        for child in children.get(span['id'], []):
+            render(child, depth + 1)
+
+    for root in children.get(None, []):
+        render(root, 0)
+
+    stages: Dict[str, List[float]] = {}
+    for span in spans:
+        stages.setdefault(span['name'], []).append(span['end'] - span['start'])
+    lines.append('')
+    lines.append(f"{'stage':<24} {'count':>5} {'total':>9} {'mean':>8} {'max':>8}")
+    for name, durations in sorted(stages.items(), key=lambda item: -sum(item[1])):
+        lines.append(f"{name:<24} {len(durations):>5} {sum(durations):8.2f}s "
+                     f"{sum(durations) / len(durations):7.2f}s {max(durations):7.2f}s")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show a campaign's trace as a waterfall")
+    parser.add_argument('trace', help="Campaign directory or trace.json")
+    parser.add_argument('--width', type=int, default=48)
+    args = parser.parse_args()
+    print(waterfall(load_trace(args.trace), args.width))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Webhook Receiver - Embedded HTTP endpoint for Replicate completion events
+Resolves waiting futures the moment a prediction finishes, so the engine
+doesn't have to poll at high volume
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+
+def verify_signature(secret: str, headers: Dict[str, str], body: bytes) -> bool:
+    """Check Replicate's webhook-signature header (whsec_... signing secret)"""
+    webhook_id = headers.get('webhook-id', '')
+    timestamp = headers.get('webhook-timestamp', '')
+    signatures = headers.get('webhook-signature', '')
+    key = base64.b64decode(secret.split('_', 1)[-1])
+    signed = f"{webhook_id}.{timestamp}.".encode() + body
+    expected = base64.b64encode(hmac.new(key, signed, hashlib.sha256).digest()).decode()
+    return any(hmac.compare_digest(expected, sig.split(',', 1)[-1])
+               for sig in signatures.split())
+
+
+class _Server(ThreadingHTTPServer):
+    """Threaded server with a listen backlog sized for bursts"""
+    daemon_threads = True
+    request_queue_size = 256
+
+
+class WebhookReceiver:
+    """
+    Local HTTP server that accepts Replicate webhook POSTs.
+
+    `url` is what submissions register as their webhook; set public_url
+    when the receiver sits behind a tunnel or load balancer. Waiters from
+    `register(prediction_id)` and `subscribe` callbacks fire on every
+    completed payload.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 public_url: Optional[str] = None, secret: Optional[str] = None,
+                 path: str = '/webhook'):
+        self.host = host
+        self.port = port
+        self.public_url = public_url
+        self.secret = secret
+        self.path = path
+
+        self.stats = {'received': 0, 'rejected': 0}
+        self._waiters: Dict[str, Future] = {}
+        self._subscribers: List[Callable[[Dict[str, Any]], None]] = []
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        if self.public_url:
+            return self.public_url
+        return f"http://{self.host}:{self.port}{self.path}"
+
+    def start(self):
+        """Start serving in a background thread (idempotent)"""
+        with self._lock:
+            if self._server:
+                return self
+            self._server = _Server((self.host, self.port), self._handler())
+            self.port = self._server.server_address[1]
+            self._thread = threading.Thread(target=self._server.serve_forever,
+                                            name='webhook-receiver', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def register(self, prediction_id: str) -> Future:
+        """Future resolving to the completion payload for prediction_id"""
+        with self._lock:
+            return self._waiters.setdefault(prediction_id, Future())
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        """Call callback(payload) for every completion received"""
+        with self._lock:
+            if callback not in self._subscribers:
+                self._subscribers.append(callback)
+
+    def deliver(self, payload: Dict[str, Any]):
+        """Dispatch a completion payload to waiters and subscribers"""
+        self.stats['received'] += 1
+        with self._lock:
+            waiter = self._waiters.pop(payload.get('id'), None)
+            subscribers = list(self._subscribers)
+        if waiter and not waiter.done():
+            waiter.set_result(payload)
+        for callback in subscribers:
+            callback(payload)
+
+    def _handler(self):
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path.split('?')[0] != receiver.path:
+                    self.send_error(404)
+                    return
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if receiver.secret and not verify_signature(
+                        receiver.secret, {k.lower(): v for k, v in self.headers.items()}, body):
+                    receiver.stats['rejected'] += 1
+                    self.send_error(401)
+                    return
+                try:
+                    payload = json.loads(body)
+                except ValueError:
+                    self.send_error(400)
+                    return
+                self.send_response(200)
+                self.end_headers()
+                receiver.deliver(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler